@@ -0,0 +1,54 @@
+"""task result as jsonb with listing indexes
+
+Revision ID: 5d8a2e7b3c61
+Revises: 9f3a7c1e5b20
+Create Date: 2026-10-19 22:31:40.118254
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '5d8a2e7b3c61'
+down_revision: Union[str, Sequence[str], None] = '9f3a7c1e5b20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # reescribe todas las particiones: el JSON se parsea una vez aquí y no en cada lectura
+    op.alter_column(
+        'tasks', 'result',
+        existing_type=postgresql.JSON(astext_type=sa.Text()),
+        type_=postgresql.JSONB(astext_type=sa.Text()),
+        existing_nullable=True,
+        postgresql_using='result::jsonb',
+    )
+    # mismas expresiones que genera result_value() en app/models.py
+    op.create_index(
+        'ix_tasks_result_edge_pixels', 'tasks',
+        [sa.text("(CAST(result ->> 'edge_pixels' AS FLOAT))")], unique=False,
+    )
+    op.create_index(
+        'ix_tasks_result_contour_count', 'tasks',
+        [sa.text("(CAST(result ->> 'contour_count' AS INTEGER))")], unique=False,
+    )
+    op.create_index('ix_tasks_created_at_id', 'tasks', ['created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_created_at_id', table_name='tasks')
+    op.drop_index('ix_tasks_result_contour_count', table_name='tasks')
+    op.drop_index('ix_tasks_result_edge_pixels', table_name='tasks')
+    op.alter_column(
+        'tasks', 'result',
+        existing_type=postgresql.JSONB(astext_type=sa.Text()),
+        type_=postgresql.JSON(astext_type=sa.Text()),
+        existing_nullable=True,
+        postgresql_using='result::json',
+    )
@@ -0,0 +1,158 @@
+"""partition tasks by created_at
+
+Revision ID: 9f3a7c1e5b20
+Revises: 0b6e8c2f4d19
+Create Date: 2026-10-19 20:14:52.907311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+# revision identifiers, used by Alembic.
+revision: str = '9f3a7c1e5b20'
+down_revision: Union[str, Sequence[str], None] = '0b6e8c2f4d19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# meses por delante que se crean al migrar (después los mantiene la API)
+PARTITIONS_AHEAD = 3
+
+# columnas que se copian entre la tabla antigua y la particionada
+COLUMNS = (
+    "id, status, filename, content_hash, callback_url, media_type, progress, result, "
+    "created_at, updated_at, queued_at, started_at, finished_at, timings"
+)
+
+# Crea las particiones mensuales de `tasks` (tasks_AAAA_MM, límites en UTC) desde el mes de
+# `start_at` hasta `months_ahead` meses después del actual. Es idempotente y se serializa con
+# un advisory lock, así que varios procesos pueden llamarla a la vez.
+# Returns: número de particiones creadas
+ENSURE_PARTITIONS_FUNCTION = """
+CREATE OR REPLACE FUNCTION ensure_task_partitions(start_at timestamptz, months_ahead integer)
+RETURNS integer
+LANGUAGE plpgsql AS $$
+DECLARE
+    month_start date := date_trunc('month', coalesce(start_at, now()) AT TIME ZONE 'UTC')::date;
+    last_month date := (date_trunc('month', now() AT TIME ZONE 'UTC')
+                        + make_interval(months => months_ahead))::date;
+    partition_name text;
+    created integer := 0;
+BEGIN
+    PERFORM pg_advisory_xact_lock(hashtext('ensure_task_partitions'));
+    WHILE month_start <= last_month LOOP
+        partition_name := format('tasks_%s', to_char(month_start, 'YYYY_MM'));
+        IF to_regclass(partition_name) IS NULL THEN
+            EXECUTE format(
+                'CREATE TABLE %I PARTITION OF tasks FOR VALUES FROM (%L) TO (%L)',
+                partition_name,
+                month_start::timestamp AT TIME ZONE 'UTC',
+                (month_start + interval '1 month')::timestamp AT TIME ZONE 'UTC'
+            );
+            created := created + 1;
+        END IF;
+        month_start := (month_start + interval '1 month')::date;
+    END LOOP;
+    RETURN created;
+END;
+$$
+"""
+
+
+def _create_indexes() -> None:
+    # en la tabla particionada cada índice se crea en todas las particiones (actuales y futuras);
+    # la clave primaria (id, created_at) ya sirve para las búsquedas por ID
+    op.create_index(
+        'ix_tasks_status', 'tasks', ['status'], unique=False,
+        postgresql_where=sa.text("status IN ('PENDING', 'PROCESSING')"),
+    )
+    op.create_index('ix_tasks_content_hash', 'tasks', ['content_hash'], unique=False)
+    op.create_index('ix_tasks_finished_at', 'tasks', ['finished_at'], unique=False)
+    op.create_index(
+        'ix_tasks_pending_queued_at', 'tasks', ['queued_at'], unique=False,
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Apartar la tabla actual con sus índices para reutilizar los nombres
+    op.rename_table('tasks', 'tasks_unpartitioned')
+    op.execute("ALTER TABLE tasks_unpartitioned RENAME CONSTRAINT tasks_pkey TO tasks_unpartitioned_pkey")
+    op.drop_index('ix_tasks_id', table_name='tasks_unpartitioned')
+    op.drop_index('ix_tasks_status', table_name='tasks_unpartitioned')
+    op.drop_index('ix_tasks_content_hash', table_name='tasks_unpartitioned')
+    op.drop_index('ix_tasks_finished_at', table_name='tasks_unpartitioned')
+    op.drop_index('ix_tasks_pending_queued_at', table_name='tasks_unpartitioned')
+    # created_at es la clave de partición y no puede ser nula
+    op.execute("UPDATE tasks_unpartitioned SET created_at = coalesce(queued_at, now()) WHERE created_at IS NULL")
+
+    op.create_table('tasks',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('status', postgresql.ENUM('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', name='taskstatus', create_type=False), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('callback_url', sa.String(length=2048), nullable=True),
+    sa.Column('media_type', sa.String(length=16), server_default='image', nullable=False),
+    sa.Column('progress', sa.Float(), nullable=True),
+    sa.Column('result', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('queued_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('timings', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+    sa.PrimaryKeyConstraint('id', 'created_at'),
+    postgresql_partition_by='RANGE (created_at)'
+    )
+
+    # Particiones desde la tarea más antigua hasta PARTITIONS_AHEAD meses por delante
+    op.execute(ENSURE_PARTITIONS_FUNCTION)
+    op.execute(
+        f"SELECT ensure_task_partitions((SELECT min(created_at) FROM tasks_unpartitioned), {PARTITIONS_AHEAD})"
+    )
+    op.execute(f"INSERT INTO tasks ({COLUMNS}) SELECT {COLUMNS} FROM tasks_unpartitioned")
+    op.drop_table('tasks_unpartitioned')
+    _create_indexes()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.rename_table('tasks', 'tasks_partitioned')
+    op.drop_index('ix_tasks_status', table_name='tasks_partitioned')
+    op.drop_index('ix_tasks_content_hash', table_name='tasks_partitioned')
+    op.drop_index('ix_tasks_finished_at', table_name='tasks_partitioned')
+    op.drop_index('ix_tasks_pending_queued_at', table_name='tasks_partitioned')
+    op.execute("ALTER TABLE tasks_partitioned RENAME CONSTRAINT tasks_pkey TO tasks_partitioned_pkey")
+
+    op.create_table('tasks',
+    sa.Column('id', sa.UUID(), nullable=False),
+    sa.Column('status', postgresql.ENUM('PENDING', 'PROCESSING', 'COMPLETED', 'FAILED', name='taskstatus', create_type=False), nullable=False),
+    sa.Column('filename', sa.String(length=255), nullable=False),
+    sa.Column('content_hash', sa.String(length=64), nullable=True),
+    sa.Column('callback_url', sa.String(length=2048), nullable=True),
+    sa.Column('media_type', sa.String(length=16), server_default='image', nullable=False),
+    sa.Column('progress', sa.Float(), nullable=True),
+    sa.Column('result', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('queued_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('timings', postgresql.JSON(astext_type=sa.Text()), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(f"INSERT INTO tasks ({COLUMNS}) SELECT {COLUMNS} FROM tasks_partitioned")
+    op.drop_table('tasks_partitioned')
+    op.execute("DROP FUNCTION IF EXISTS ensure_task_partitions(timestamptz, integer)")
+
+    op.create_index(op.f('ix_tasks_id'), 'tasks', ['id'], unique=False)
+    op.create_index(op.f('ix_tasks_status'), 'tasks', ['status'], unique=False)
+    op.create_index(op.f('ix_tasks_content_hash'), 'tasks', ['content_hash'], unique=False)
+    op.create_index(op.f('ix_tasks_finished_at'), 'tasks', ['finished_at'], unique=False)
+    op.create_index(
+        'ix_tasks_pending_queued_at', 'tasks', ['queued_at'], unique=False,
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
@@ -0,0 +1,42 @@
+"""index remaining task listing filters
+
+Revision ID: c7e2b9d4f816
+Revises: a4c9e1f7d352
+Create Date: 2026-10-20 09:14:03.287415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c7e2b9d4f816'
+down_revision: Union[str, Sequence[str], None] = 'a4c9e1f7d352'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # mismas expresiones que genera result_value() en app/models.py
+    op.create_index(
+        'ix_tasks_result_edge_density', 'tasks',
+        [sa.text("(CAST(result ->> 'edge_density' AS FLOAT))")], unique=False,
+    )
+    op.create_index(
+        'ix_tasks_result_width', 'tasks',
+        [sa.text("(CAST(result ->> 'width' AS INTEGER))")], unique=False,
+    )
+    op.create_index(
+        'ix_tasks_result_height', 'tasks',
+        [sa.text("(CAST(result ->> 'height' AS INTEGER))")], unique=False,
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_result_height', table_name='tasks')
+    op.drop_index('ix_tasks_result_width', table_name='tasks')
+    op.drop_index('ix_tasks_result_edge_density', table_name='tasks')
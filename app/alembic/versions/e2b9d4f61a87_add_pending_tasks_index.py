@@ -0,0 +1,31 @@
+"""add pending tasks index
+
+Revision ID: e2b9d4f61a87
+Revises: c7e1b5d3a846
+Create Date: 2026-10-19 18:02:37.418906
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision: str = 'e2b9d4f61a87'
+down_revision: Union[str, Sequence[str], None] = 'c7e1b5d3a846'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # índice parcial para reclamar tareas PENDING con SKIP LOCKED (TASK_QUEUE_BACKEND=postgres)
+    op.create_index(
+        'ix_tasks_pending_queued_at', 'tasks', ['queued_at'], unique=False,
+        postgresql_where=sa.text("status = 'PENDING'"),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_pending_queued_at', table_name='tasks', postgresql_where=sa.text("status = 'PENDING'"))
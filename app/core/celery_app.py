@@ -1,5 +1,12 @@
 from celery import Celery
 from app.core.config import settings
+from app.core.serialization import celery_serializer
+
+# nombre de la tarea de procesamiento: la API la encola por nombre (send_task)
+# sin importar app.worker, que carga OpenCV y NumPy
+PROCESS_IMAGE_TASK = "process_image"
+# entrega de callbacks de fin de tarea (la programa el worker, una por endpoint)
+DELIVER_CALLBACKS_TASK = "deliver_callbacks"
 
 # instanciar Celery
 celery_app = Celery(
@@ -10,10 +17,14 @@ celery_app = Celery(
 )
 
 # configuración adicional
+# Los workers aceptan JSON y msgpack para poder cambiar CELERY_SERIALIZER sin vaciar la cola.
+# Nadie lee el valor de retorno de las tareas (el estado vive en PostgreSQL): no se escribe
+# en el backend de resultados, una escritura menos en Redis por tarea.
 celery_app.conf.update(
-    task_serializer="json",
-    accept_content=["json"],
+    task_serializer=celery_serializer(),
+    accept_content=["json", "msgpack"],
     result_serializer="json",
+    task_ignore_result=True,
     timezone="UTC",
     enable_utc=True,
     include=["app.worker"]  # Importar módulos con tareas
@@ -1,7 +1,10 @@
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from sqlalchemy import create_engine
 from sqlalchemy.orm import declarative_base, sessionmaker
+from fastapi import Depends
+import random
 from app.core.config import settings
+from app.core.metrics import instrument_engine
 
 # engine asíncrono, es el motor
 engine = create_async_engine(
@@ -24,12 +27,28 @@ engine_sync = create_engine(
     future=True,
 )
 
+# engines y session factories de las réplicas de lectura (vacío si no hay réplicas configuradas)
+replica_engines = [
+    create_async_engine(uri, echo=True, future=True)
+    for uri in settings.SQLALCHEMY_REPLICA_URIS
+]
+ReplicaSessionLocals = [
+    async_sessionmaker(replica_engine, class_=AsyncSession, expire_on_commit=False)
+    for replica_engine in replica_engines
+]
+
 # session factory síncrona para Celery workers
 SessionLocalSync = sessionmaker(
     bind=engine_sync,
     expire_on_commit=False
 )
 
+# medir la latencia de las consultas en ambos engines
+instrument_engine(engine.sync_engine, "async")
+instrument_engine(engine_sync, "sync")
+for replica_engine in replica_engines:
+    instrument_engine(replica_engine.sync_engine, "replica")
+
 # base para modelos ORM
 Base = declarative_base()
 
@@ -38,3 +57,13 @@ async def get_async_db():
     async with AsyncSessionLocal() as session:
         yield session
     await session.close()
+
+# dependencia para endpoints de solo lectura: sesión de una réplica elegida al azar, o la misma
+# sesión del primario si no hay réplicas. FastAPI reutiliza la sesión del primario dentro del
+# request, así que el endpoint puede pedir ambas para leer lo propio (no abre conexión si no se usa).
+async def get_async_read_db(primary: AsyncSession = Depends(get_async_db)):
+    if not ReplicaSessionLocals:
+        yield primary
+        return
+    async with random.choice(ReplicaSessionLocals)() as session:
+        yield session
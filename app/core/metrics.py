@@ -0,0 +1,126 @@
+import os
+import time
+from prometheus_client import (
+    CollectorRegistry,
+    Counter,
+    Histogram,
+    REGISTRY,
+    CONTENT_TYPE_LATEST,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+
+# Métricas Prometheus compartidas por la API y el worker.
+# Con varios procesos (uvicorn --workers o Celery prefork) hay que definir
+# PROMETHEUS_MULTIPROC_DIR para que las métricas de todos los procesos se agreguen.
+
+# buckets de latencia desde 1ms hasta ~1min
+LATENCY_BUCKETS = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25,
+    0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0,
+)
+
+# buckets de colas y tiempo total, hasta 1 hora
+QUEUE_BUCKETS = (
+    0.01, 0.05, 0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+    60.0, 120.0, 300.0, 600.0, 1800.0, 3600.0,
+)
+
+# buckets de tamaño desde 1KB hasta 256MB
+SIZE_BUCKETS = tuple(1024 * 4 ** i for i in range(10))
+
+UPLOAD_SIZE_BYTES = Histogram(
+    "vision_upload_size_bytes",
+    "Tamaño de las imágenes recibidas en /analyze",
+    buckets=SIZE_BUCKETS,
+)
+
+UPLOADS_DEDUPLICATED_TOTAL = Counter(
+    "vision_uploads_deduplicated_total",
+    "Subidas cuyo contenido ya estaba almacenado (no se vuelve a subir)",
+)
+
+STORAGE_OPERATION_SECONDS = Histogram(
+    "vision_storage_operation_seconds",
+    "Latencia de las operaciones contra el almacenamiento de objetos",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+PIPELINE_STAGE_SECONDS = Histogram(
+    "vision_pipeline_stage_seconds",
+    "Tiempo de cada etapa del pipeline de OpenCV",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+DB_QUERY_SECONDS = Histogram(
+    "vision_db_query_seconds",
+    "Latencia de las consultas a PostgreSQL",
+    ["engine"],
+    buckets=LATENCY_BUCKETS,
+)
+
+QUEUE_WAIT_SECONDS = Histogram(
+    "vision_queue_wait_seconds",
+    "Tiempo desde que se encola la tarea hasta que pasa a PROCESSING",
+    buckets=QUEUE_BUCKETS,
+)
+
+TASK_END_TO_END_SECONDS = Histogram(
+    "vision_task_end_to_end_seconds",
+    "Tiempo desde que se crea la tarea hasta que termina (COMPLETED o FAILED)",
+    ["status"],
+    buckets=QUEUE_BUCKETS,
+)
+
+TASKS_TOTAL = Counter(
+    "vision_tasks_total",
+    "Transiciones de estado de las tareas",
+    ["status"],
+)
+
+OUTBOX_DISPATCHED_TOTAL = Counter(
+    "vision_outbox_dispatched_total",
+    "Mensajes del outbox publicados en Celery",
+)
+
+CALLBACKS_TOTAL = Counter(
+    "vision_callbacks_total",
+    "Eventos de callback por resultado de la entrega (delivered, retried, dropped)",
+    ["outcome"],
+)
+
+
+# Registra listeners en un engine de SQLAlchemy para medir la latencia de cada consulta
+# Args:
+#      engine: engine síncrono (para el asíncrono usar engine.sync_engine)
+#      name: etiqueta del engine en la métrica
+def instrument_engine(engine, name: str) -> None:
+    histogram = DB_QUERY_SECONDS.labels(name)
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start_time", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start_time")
+        if starts:
+            histogram.observe(time.perf_counter() - starts.pop())
+
+
+# Registry a exportar: agrega todos los procesos si está activo el modo multiproceso
+def get_registry() -> CollectorRegistry:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+# Serializa las métricas en formato de texto de Prometheus
+# Returns: tuple[bytes, str]: cuerpo y content-type
+def render_metrics() -> tuple[bytes, str]:
+    return generate_latest(get_registry()), CONTENT_TYPE_LATEST
@@ -0,0 +1,31 @@
+import redis
+import redis.asyncio as aioredis
+from app.core.config import settings
+
+# clientes Redis compartidos (fuera del broker de Celery)
+_async_client: aioredis.Redis | None = None
+_sync_client: redis.Redis | None = None
+
+
+# Cliente asíncrono para la API, se crea una sola vez por proceso
+def get_async_redis() -> aioredis.Redis:
+    global _async_client
+    if _async_client is None:
+        _async_client = aioredis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=1,
+            socket_timeout=1,
+        )
+    return _async_client
+
+
+# Cliente síncrono para los workers, se crea una sola vez por proceso
+def get_sync_redis() -> redis.Redis:
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = redis.Redis.from_url(
+            settings.REDIS_URL,
+            socket_connect_timeout=1,
+            socket_timeout=1,
+        )
+    return _sync_client
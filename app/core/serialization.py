@@ -0,0 +1,43 @@
+from fastapi.datastructures import Default
+from fastapi.responses import JSONResponse
+from app.core.config import settings
+
+# Serialización de las respuestas de la API y de los mensajes de Celery.
+# orjson y msgpack son opcionales: si la opción está configurada pero la librería
+# no está instalada se usa JSON estándar y se avisa al arrancar.
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class ORJSONResponse(JSONResponse):
+    # Respuesta JSON renderizada con orjson
+    def render(self, content) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_NON_STR_KEYS)
+
+
+# Clase de respuesta por defecto de los routers según API_JSON_RESPONSE.
+# Con "pydantic" se deja la de FastAPI: las rutas con response_model se serializan
+# directamente a bytes con pydantic-core, sin pasar por un dict intermedio.
+def api_response_class():
+    if settings.API_JSON_RESPONSE == "orjson":
+        if orjson is not None:
+            return ORJSONResponse
+        print("API_JSON_RESPONSE=orjson pero orjson no está instalado; se usa JSON estándar")
+    return Default(JSONResponse)
+
+
+# Serializador de los mensajes de Celery según CELERY_SERIALIZER ("json" o "msgpack")
+def celery_serializer() -> str:
+    if settings.CELERY_SERIALIZER == "msgpack":
+        if msgpack is not None:
+            return "msgpack"
+        print("CELERY_SERIALIZER=msgpack pero msgpack no está instalado; se usa JSON")
+    return "json"
@@ -1,15 +1,43 @@
-from fastapi import FastAPI
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Response
 from app.core.config import settings
+from app.core.metrics import render_metrics
 from app.routers import vision
+from app.services.outbox import outbox_dispatcher
+from app.services.partitions import partition_maintainer
+from app.services.pg_queue import uses_pg_queue
+from app.services.sync_pipeline import shutdown_sync_pipeline
+
+
+# Al arrancar se inicia el dispatcher del outbox (salvo con la cola de PostgreSQL) y el
+# mantenimiento de las particiones de tasks; al apagar se detienen ambos y los procesos del modo síncrono
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.OUTBOX_DISPATCHER_ENABLED and not uses_pg_queue():
+        outbox_dispatcher.start()
+    if settings.TASK_PARTITION_MAINTENANCE_ENABLED:
+        partition_maintainer.start()
+    yield
+    await outbox_dispatcher.stop()
+    await partition_maintainer.stop()
+    shutdown_sync_pipeline()
+
 
 app = FastAPI(
     title=settings.PROJECT_NAME,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"   
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    lifespan=lifespan
 )
 
 @app.get("/health")
 async def health_check():
     return {"status": "ok"}
 
+# Métricas en formato Prometheus
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    body, content_type = render_metrics()
+    return Response(content=body, media_type=content_type)
+
 # Incluir los routers
 app.include_router(vision.router, prefix=settings.API_V1_STR)
\ No newline at end of file
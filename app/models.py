@@ -1,7 +1,12 @@
 from app.core.database import Base
-from sqlalchemy import Column, String, Enum, DateTime, func
-from sqlalchemy.dialects.postgresql import UUID, JSON
-from datetime import datetime
+from sqlalchemy import (
+    BigInteger, Column, String, Enum, DateTime, Float, Index, Integer, PrimaryKeyConstraint, and_, bindparam,
+    func, text
+)
+from sqlalchemy.dialects.postgresql import UUID, JSON, JSONB
+from datetime import datetime, timedelta, timezone
+import os
+import time
 import uuid
 import enum
 
@@ -13,18 +18,131 @@ class TaskStatus(str, enum.Enum):
     FAILED = "FAILED"
 
 
-# Modelo de tarea para procesamiento de imágenes
+# Tipos de entrada (las imágenes TIFF multipágina se detectan en el worker)
+MEDIA_TYPE_IMAGE = "image"
+MEDIA_TYPE_VIDEO = "video"
+
+
+# UUID versión 7 (RFC 9562): los 48 bits altos son el instante de creación en milisegundos,
+# así que el ID ordena por tiempo y dice en qué partición de `tasks` está la fila
+def uuid7() -> uuid.UUID:
+    timestamp_ms = time.time_ns() // 1_000_000
+    rand = int.from_bytes(os.urandom(10), "big")
+    value = (
+        (timestamp_ms & 0xFFFF_FFFF_FFFF) << 80
+        | 0x7 << 76
+        | (rand >> 68) << 64
+        | 0b10 << 62
+        | (rand & 0x3FFF_FFFF_FFFF_FFFF)
+    )
+    return uuid.UUID(int=value)
+
+
+# Instante codificado en un UUID v7 (None para otras versiones, p. ej. tareas antiguas con UUID v4)
+def uuid7_created_at(value: uuid.UUID) -> datetime | None:
+    if value.version != 7:
+        return None
+    return datetime.fromtimestamp((value.int >> 80) / 1000, tz=timezone.utc)
+
+
+# created_at por defecto: el instante del ID, para que la fila caiga en la partición que indica su ID
+def _created_at_from_id(context) -> datetime:
+    task_id = context.get_current_parameters().get("id")
+    created_at = uuid7_created_at(task_id) if isinstance(task_id, uuid.UUID) else None
+    return created_at or datetime.now(timezone.utc)
+
+
+# Modelo de tarea para procesamiento de imágenes.
+# En PostgreSQL la tabla está particionada por rango mensual de created_at (ver la migración
+# 9f3a7c1e5b20): la clave primaria incluye created_at y las particiones futuras se crean con
+# ensure_task_partitions(). Para el ORM la identidad sigue siendo solo el ID.
 class Task(Base):
     __tablename__ = 'tasks'
     
-    # ID como UUID (no enteros autoincrementales)
-    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4, index=True)
-    # estado de la tarea
-    status = Column(Enum(TaskStatus), nullable=False, default=TaskStatus.PENDING, index=True)
+    # ID como UUID v7 (no enteros autoincrementales)
+    id = Column(UUID(as_uuid=True), nullable=False, default=uuid7)
+    # estado de la tarea (índice parcial: solo los estados en curso, que son los que se consultan)
+    status = Column(Enum(TaskStatus), nullable=False, default=TaskStatus.PENDING)
     # nombre del archivo en MinIO
     filename = Column(String(255), nullable=False)
-    # resultado del procesamiento (JSON nullable)
-    result = Column(JSON, nullable=True)
-    # timestamps automáticos
+    # SHA-256 de la entrada: las tareas con el mismo contenido comparten el archivo en MinIO
+    content_hash = Column(String(64), nullable=True, index=True)
+    # URL a la que se notifica el resultado cuando la tarea termina (opcional)
+    callback_url = Column(String(2048), nullable=True)
+    # tipo de entrada: imagen o video
+    media_type = Column(String(16), nullable=False, default=MEDIA_TYPE_IMAGE, server_default=MEDIA_TYPE_IMAGE)
+    # parámetros de análisis: región de interés, tamaño máximo y umbrales de Canny
+    # (null = valores por defecto, ver app/services/analysis_params.py)
+    params = Column(JSONB().with_variant(JSON, "sqlite"), nullable=True)
+    # progreso del procesamiento entre 0 y 1 (videos y secuencias de frames)
+    progress = Column(Float, nullable=True)
+    # resultado del procesamiento: archivo de salida y estadísticas del análisis (JSONB nullable,
+    # JSON en SQLite)
+    result = Column(JSONB().with_variant(JSON, "sqlite"), nullable=True)
+    # timestamps automáticos (created_at es la clave de partición)
+    created_at = Column(DateTime(timezone=True), nullable=False, default=_created_at_from_id, server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+    # ciclo de vida: encolada, tomada por el worker y terminada
+    queued_at = Column(DateTime(timezone=True), nullable=True)
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True, index=True)
+    # desglose de tiempos por etapa (ms), dimensiones y tamaños (JSON nullable)
+    timings = Column(JSON, nullable=True)
+
+    __table_args__ = (
+        PrimaryKeyConstraint("id", "created_at"),
+        # índice parcial de la cola de PostgreSQL: solo las tareas PENDING, en orden de llegada
+        Index("ix_tasks_pending_queued_at", "queued_at", postgresql_where=text("status = 'PENDING'")),
+        Index("ix_tasks_status", "status", postgresql_where=text("status IN ('PENDING', 'PROCESSING')")),
+        # orden y cursor del listado de tareas (más recientes primero)
+        Index("ix_tasks_created_at_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+    __mapper_args__ = {"primary_key": [id]}
+
+
+# Valor de una clave del resultado de la tarea (p. ej. result_value("contour_count").as_integer()).
+# La clave va literal en el SQL: con un parámetro PostgreSQL no reconoce los índices de expresión.
+def result_value(key: str):
+    return Task.result[bindparam(None, key, type_=JSON.JSONStrIndexType, literal_execute=True)]
+
+
+# índices de expresión para los filtros por rango del listado de tareas (edge_pixels como FLOAT:
+# en videos es la suma de todos los frames y puede pasar del rango de INTEGER)
+Index("ix_tasks_result_edge_pixels", result_value("edge_pixels").as_float())
+Index("ix_tasks_result_contour_count", result_value("contour_count").as_integer())
+Index("ix_tasks_result_edge_density", result_value("edge_density").as_float())
+Index("ix_tasks_result_width", result_value("width").as_integer())
+Index("ix_tasks_result_height", result_value("height").as_integer())
+
+
+# margen alrededor del instante del ID: cubre filas cuyo created_at puso el servidor
+TASK_ID_TIME_MARGIN = timedelta(days=1)
+
+
+# Condición para buscar una tarea por ID. Con un UUID v7 añade el rango de created_at
+# que corresponde al ID, así PostgreSQL solo consulta la partición (o las dos) que lo contienen.
+def task_by_id(task_id: uuid.UUID):
+    condition = Task.id == task_id
+    created_at = uuid7_created_at(task_id)
+    if created_at is None:
+        return condition
+    return and_(
+        condition,
+        Task.created_at >= created_at - TASK_ID_TIME_MARGIN,
+        Task.created_at < created_at + TASK_ID_TIME_MARGIN,
+    )
+
+
+# Mensaje pendiente de publicar en Celery (outbox transaccional).
+# Se escribe en la misma transacción que la tarea y el dispatcher lo borra al publicarlo.
+class OutboxMessage(Base):
+    __tablename__ = 'task_outbox'
+
+    # en SQLite (benchmarks) solo INTEGER PRIMARY KEY es autoincremental
+    id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+    # nombre de la tarea de Celery y sus argumentos
+    task_name = Column(String(64), nullable=False)
+    args = Column(JSON, nullable=False, default=list)
+    kwargs = Column(JSON, nullable=False, default=dict)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
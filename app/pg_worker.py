@@ -0,0 +1,8 @@
+from app.worker import run_pg_queue, start_metrics_exporter, warm_up_worker_process
+
+# Worker de la cola de PostgreSQL (TASK_QUEUE_BACKEND=postgres): python -m app.pg_worker
+# Cada proceso procesa un lote a la vez; se escala arrancando más procesos o réplicas.
+if __name__ == "__main__":
+    start_metrics_exporter()
+    warm_up_worker_process()
+    run_pg_queue()
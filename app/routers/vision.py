@@ -1,68 +1,287 @@
-from app.core.database import get_async_db
-from app.services.storage import MinioService, MinioServiceError
-from app.models import Task, TaskStatus
-from app.schemas import TaskResponse
-from app.worker import process_image
-from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from app.core.database import get_async_db, get_async_read_db
+from app.core.celery_app import PROCESS_IMAGE_TASK
+from app.services.storage import LocalStorageService, MinioServiceError, StorageService, get_storage
+from app.services.admission import AdmissionController, AdmissionRejected, admission_controller
+from app.services.progress import ProgressSubscription, read_progress
+from app.services.spool import Spool, get_spool
+from app.services.image_probe import ImageInfo, InvalidImageError, probe_image
+from app.services.analysis_params import AnalysisParams, build_params
+from app.services.sync_pipeline import (
+    SyncPipeline,
+    SyncPipelineTimeout,
+    SyncPipelineUnavailable,
+    get_sync_pipeline,
+)
+from app.services.callbacks import validate_callback_url
+from app.services.outbox import add_to_outbox, outbox_dispatcher
+from app.services.pg_queue import notify_task_queued, uses_pg_queue
+from app.services.scaling import ScalingMonitor, scaling_monitor
+from app.services.content_store import (
+    content_key,
+    hash_bytes,
+    hash_file,
+    lock_content,
+    release_content,
+    store_content,
+)
+from app.core.config import settings
+from app.core.serialization import api_response_class
+from app.core.metrics import UPLOAD_SIZE_BYTES, UPLOADS_DEDUPLICATED_TOTAL, TASKS_TOTAL
+from app.models import Task, TaskStatus, MEDIA_TYPE_IMAGE, MEDIA_TYPE_VIDEO, result_value, task_by_id, uuid7
+from app.schemas import ScalingResponse, TaskListResponse, TaskResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, status, UploadFile, File, Form
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy import select, tuple_
 from uuid import UUID
-import uuid
+import asyncio
 import io
-from starlette.responses import StreamingResponse
+import json
+import time
+from datetime import datetime, timezone
+from starlette.responses import FileResponse, Response, StreamingResponse
+from typing import Literal
 
 router = APIRouter(
     prefix="/vision",
-    tags=["vision"]
+    tags=["vision"],
+    default_response_class=api_response_class()
 )
 
 
-# Dependencia para MinioService
-def get_minio_service() -> MinioService:
-    return MinioService()
+# Estados en los que una tarea ya no cambia
+TERMINAL_STATUSES = {TaskStatus.COMPLETED.value, TaskStatus.FAILED.value}
+
+
+# Dependencia para el almacenamiento (backend según STORAGE_BACKEND, uno por proceso)
+def get_minio_service() -> StorageService:
+    return get_storage()
+
+# Dependencia para el spool local de traspaso al worker (None si está desactivado)
+def get_spool_service() -> Spool | None:
+    return get_spool()
+
+# Copia la entrada al spool local si hay un worker en este nodo (SPOOL_LOCAL_WORKER); si falla,
+# el worker la descargará de MinIO. Antes se barren los archivos vencidos (como máximo una vez
+# por minuto): las entradas que toma un worker de otro nodo nunca se liberan desde aquí.
+def _spool_input(spool: Spool | None, write, size: int | None) -> bool:
+    if spool is None or not settings.SPOOL_LOCAL_WORKER or not spool.accepts(size):
+        return False
+    try:
+        spool.sweep()
+        write(spool)
+        return True
+    except MinioServiceError as e:
+        print(f"No se pudo copiar la entrada al spool local: {str(e)}")
+        return False
+
+# Extensión con la que se guarda cada formato detectado en la cabecera
+IMAGE_EXTENSIONS = {"jpeg": "jpg", "png": "png", "webp": "webp", "gif": "gif", "bmp": "bmp", "tiff": "tiff"}
 
-# Endpoint para analizar una imagen de forma asíncrona.
-# 1. Valida que el archivo sea una imagen
-# 2. Sube el archivo a MinIO
-# 3. Crea una tarea en la base de datos
-# 4. Encola la tarea para procesamiento
-# 5. Retorna la tarea creada
+# Rechaza archivos que superan el tamaño máximo (0 desactiva el límite)
+def _check_upload_size(size: int | None, limit: int) -> None:
+    if limit and size is not None and size > limit:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"El archivo supera el tamaño máximo de {limit} bytes"
+        )
+
+# Valida una imagen leyendo solo su cabecera (formato y dimensiones, sin decodificarla)
+def _validate_image(content: bytes) -> ImageInfo:
+    try:
+        info = probe_image(content)
+    except InvalidImageError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"El archivo no es una imagen válida: {str(e)}"
+        )
+    if settings.MAX_IMAGE_PIXELS and info.pixels > settings.MAX_IMAGE_PIXELS:
+        raise HTTPException(
+            status_code=status.HTTP_413_CONTENT_TOO_LARGE,
+            detail=f"La imagen de {info.width}x{info.height} supera el máximo de {settings.MAX_IMAGE_PIXELS} píxeles"
+        )
+    return info
+
+# Dependencia para el pool del modo síncrono
+def get_sync_pipeline_service() -> SyncPipeline:
+    return get_sync_pipeline()
+
+# Procesa la imagen en el pool síncrono y devuelve el PNG en la respuesta.
+# Devuelve None si el pool está lleno o caído: la imagen sigue el camino asíncrono.
+async def _process_sync(pipeline: SyncPipeline, content: bytes, params: AnalysisParams) -> Response | None:
+    try:
+        png, timings = await pipeline.process(content, params)
+    except SyncPipelineUnavailable as e:
+        print(f"Modo síncrono no disponible, se encola la imagen: {str(e)}")
+        return None
+    except SyncPipelineTimeout as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+
+    # tiempos por etapa en formato Server-Timing (visibles en las herramientas del navegador)
+    server_timing = ", ".join(
+        f"{key[:-3]};dur={value}" for key, value in timings.items() if key.endswith("_ms")
+    )
+    return Response(
+        content=png,
+        media_type="image/png",
+        headers={"Server-Timing": server_timing, "X-Processing-Mode": "sync"}
+    )
+
+# Dependencia para el control de admisión
+def get_admission_controller() -> AdmissionController:
+    return admission_controller
+
+# Endpoint para analizar una imagen (o un video / TIFF multipágina) de forma asíncrona.
+# 1. Valida que el archivo sea una imagen o un video
+# 2. Valida tamaño, formato y dimensiones en el servidor (400/413), leyendo solo la cabecera
+#    Con mode=sync, una imagen de hasta SYNC_MAX_PIXELS se procesa en el pool de la API y el
+#    PNG se devuelve directamente (200); si no cabe o el pool está lleno, sigue el camino normal.
+# 3. Verifica que el sistema pueda admitir más trabajo (429/503 con Retry-After)
+# 4. Sube el archivo a MinIO con su hash como nombre (si ya existe no se vuelve a subir); el
+#    contenido queda bloqueado hasta el commit para que un borrado simultáneo no lo elimine
+# 5. Crea una tarea en la base de datos
+# 6. Encola la tarea para procesamiento en la misma transacción (outbox o NOTIFY, según TASK_QUEUE_BACKEND)
+# 7. Retorna la tarea creada
+# Con callback_url (campo del formulario), al terminar la tarea se envía su resultado por POST.
+# Campos opcionales de análisis: región de interés (roi_x, roi_y, roi_width, roi_height, en
+# píxeles de la imagen original), tamaño máximo del resultado (max_width, max_height, se reduce
+# manteniendo la proporción) y umbrales de Canny (canny_low, canny_high). Se guardan en la tarea.
 @router.post("/analyze", response_model=TaskResponse, status_code=status.HTTP_202_ACCEPTED)
 async def analyze_image(file: UploadFile = File(...),
-
+    mode: Literal["async", "sync"] = Query("async"),
+    callback_url: str | None = Form(None),
+    roi_x: int | None = Form(None, ge=0),
+    roi_y: int | None = Form(None, ge=0),
+    roi_width: int | None = Form(None, ge=1),
+    roi_height: int | None = Form(None, ge=1),
+    max_width: int | None = Form(None, ge=1),
+    max_height: int | None = Form(None, ge=1),
+    canny_low: int | None = Form(None, ge=0),
+    canny_high: int | None = Form(None, ge=0),
     db: AsyncSession = Depends(get_async_db),
-    minio_service: MinioService = Depends(get_minio_service)):
+    minio_service: StorageService = Depends(get_minio_service),
+    admission: AdmissionController = Depends(get_admission_controller),
+    spool: Spool | None = Depends(get_spool_service),
+    sync_pipeline: SyncPipeline = Depends(get_sync_pipeline_service)):
     
-    # Validar que el archivo es una imagen
-    if not file.content_type or not file.content_type.startswith("image/"):
+    # Validar que el archivo es una imagen o un video
+    if not file.content_type or not file.content_type.startswith(("image/", "video/")):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
-            detail="El archivo debe ser una imagen"
+            detail="El archivo debe ser una imagen o un video"
         )
+    media_type = MEDIA_TYPE_VIDEO if file.content_type.startswith("video/") else MEDIA_TYPE_IMAGE
+    
+    # URL opcional a la que se notifica el resultado cuando la tarea termina
+    if callback_url:
+        try:
+            await asyncio.to_thread(validate_callback_url, callback_url)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     
     try:
-        # Leer el contenido del archivo
+        params = build_params(roi_x, roi_y, roi_width, roi_height, max_width, max_height, canny_low, canny_high)
+    except ValueError as e:
+        raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
+    
+    # Validar el contenido antes de que ocupe almacenamiento, cola o worker
+    if media_type == MEDIA_TYPE_VIDEO:
+        _check_upload_size(file.size, settings.MAX_VIDEO_UPLOAD_BYTES)
+        file_extension = file.filename.split(".")[-1] if file.filename and "." in file.filename else "mp4"
+    else:
+        _check_upload_size(file.size, settings.MAX_UPLOAD_BYTES)
         file_content = await file.read()
+        _check_upload_size(len(file_content), settings.MAX_UPLOAD_BYTES)
+        # la extensión sale del formato real, no del nombre enviado por el cliente
+        image_info = _validate_image(file_content)
+        file_extension = IMAGE_EXTENSIONS[image_info.format]
+        try:
+            params.check_bounds(image_info.width, image_info.height)
+        except ValueError as e:
+            raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
         
-        # Generar un nombre único para el archivo
-        file_extension = file.filename.split(".")[-1] if "." in file.filename else "jpg"
-        unique_filename = f"{uuid.uuid4()}.{file_extension}"
-        
-        # Subir a MinIO
-        stored_filename = minio_service.upload_file(file_content, unique_filename)
+        # Camino rápido: imágenes pequeñas procesadas en la propia API, sin cola
+        if (mode == "sync" and settings.SYNC_PROCESSING_ENABLED
+                and image_info.pixels <= settings.SYNC_MAX_PIXELS):
+            response = await _process_sync(sync_pipeline, file_content, params)
+            if response is not None:
+                return response
+    
+    # Rechazar antes de subir a MinIO si la cola está saturada
+    try:
+        await admission.check(db)
+    except AdmissionRejected as e:
+        raise HTTPException(
+            status_code=e.status_code,
+            detail=e.detail,
+            headers={"Retry-After": str(e.retry_after)}
+        )
+    
+    try:
+        if media_type == MEDIA_TYPE_VIDEO:
+            # Los videos se suben por bloques desde el archivo temporal, sin leerlos completos.
+            # Leer y subir gigabytes es bloqueante: el hash, la subida y la copia al spool se
+            # hacen fuera del event loop
+            if file.size is not None:
+                UPLOAD_SIZE_BYTES.observe(file.size)
+            content_hash = await asyncio.to_thread(hash_file, file.file)
+            stored_filename = content_key(content_hash, file_extension)
+            await lock_content(db, content_hash)
+            uploaded = await asyncio.to_thread(
+                store_content,
+                minio_service, stored_filename, lambda key: minio_service.upload_from_file(file.file, key)
+            )
+            # Copia local para un worker en el mismo nodo (releyendo el archivo temporal)
+            def write_video(target: Spool):
+                file.file.seek(0)
+                target.upload_from_file(file.file, stored_filename)
+            spooled = await asyncio.to_thread(_spool_input, spool, write_video, file.size)
+        else:
+            UPLOAD_SIZE_BYTES.observe(len(file_content))
+            
+            # Subir a MinIO (el nombre es el hash del contenido). El HEAD y el PUT son bloqueantes
+            # y se hacen con el contenido bloqueado: fuera del event loop, como en los videos
+            content_hash = hash_bytes(file_content)
+            stored_filename = content_key(content_hash, file_extension)
+            await lock_content(db, content_hash)
+            uploaded = await asyncio.to_thread(
+                store_content,
+                minio_service, stored_filename, lambda key: minio_service.upload_file(file_content, key)
+            )
+            spooled = _spool_input(
+                spool, lambda target: target.upload_file(file_content, stored_filename), len(file_content)
+            )
+        if not uploaded:
+            UPLOADS_DEDUPLICATED_TOTAL.inc()
         
-        # Crear la tarea en la base de datos
+        # Crear la tarea en la base de datos (con su ID ya asignado para el mensaje del outbox)
         task = Task(
+            id=uuid7(),
             status=TaskStatus.PENDING,
-            filename=stored_filename
+            filename=stored_filename,
+            content_hash=content_hash,
+            callback_url=callback_url or None,
+            media_type=media_type,
+            params=params.to_json(),
+            queued_at=datetime.now(timezone.utc)
         )
         
+        # Encolar la tarea para procesamiento (por nombre: la API no importa el worker) a través
+        # del outbox: el mensaje se confirma en la misma transacción que la tarea y el
+        # dispatcher lo publica en Celery. spooled indica que la entrada también está en el
+        # spool local de este nodo.
+        # Con la cola de PostgreSQL la propia fila PENDING es el mensaje: solo se avisa a los workers.
         db.add(task)
+        if uses_pg_queue():
+            await notify_task_queued(db)
+        else:
+            add_to_outbox(db, PROCESS_IMAGE_TASK, args=[str(task.id)], kwargs={"spooled": spooled})
         await db.commit()
         await db.refresh(task)
-        
-        # Encolar la tarea para procesamiento
-        process_image.delay(str(task.id))
+        outbox_dispatcher.notify()
+        TASKS_TOTAL.labels(TaskStatus.PENDING.value).inc()
         
         # Retornar la tarea creada
         return task
@@ -79,15 +298,127 @@ async def analyze_image(file: UploadFile = File(...),
             detail=f"Error al procesar la solicitud: {str(e)}"
         )
 
-# Endpoint para consultar el estado de una tarea por su ID.
+# Segundos desde la última escritura de la tarea (creación o último cambio)
+def _seconds_since_write(task: Task) -> float | None:
+    written_at = task.updated_at or task.created_at
+    if not isinstance(written_at, datetime):
+        return None
+    if written_at.tzinfo is None:
+        written_at = written_at.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - written_at).total_seconds()
+
+# Lee una tarea con la sesión de lectura (réplica si hay réplicas configuradas).
+# Vuelve al primario si la réplica no responde, si la tarea no está (recién creada) o si
+# su estado no está en `settled` y se escribió hace menos de REPLICA_MAX_LAG_SECONDS:
+# así quien acaba de crear una tarea o de verla avanzar no lee un estado anterior.
+async def _read_task(db: AsyncSession, primary: AsyncSession, task_id: UUID,
+                     settled=TERMINAL_STATUSES) -> Task | None:
+    task = None
+    try:
+        result = await db.execute(select(Task).where(task_by_id(task_id)))
+        task = result.scalar_one_or_none()
+    except (DBAPIError, OSError) as e:
+        if db is primary:
+            raise
+        print(f"Réplica de lectura no disponible, se lee del primario: {str(e)}")
+
+    # sin réplicas las dos sesiones son la misma
+    if db is primary:
+        return task
+    if task is not None:
+        if task.status.value in settled:
+            return task
+        elapsed = _seconds_since_write(task)
+        if elapsed is not None and elapsed >= settings.REPLICA_MAX_LAG_SECONDS:
+            return task
+
+    result = await primary.execute(select(Task).where(task_by_id(task_id)))
+    return result.scalar_one_or_none()
+
+# Condiciones de rango (límites inclusivos) sobre una expresión
+def _range(expression, low, high) -> list:
+    conditions = []
+    if low is not None:
+        conditions.append(expression >= low)
+    if high is not None:
+        conditions.append(expression <= high)
+    return conditions
+
+# Los timestamps sin zona horaria se interpretan en UTC
+def _as_utc(value: datetime | None) -> datetime | None:
+    if value is not None and value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value
+
+# Endpoint de listado de tareas, de la más reciente a la más antigua (réplica de lectura si la hay).
+# Los filtros sobre el análisis (píxeles de borde, densidad, contornos, dimensiones) se aplican
+# en la base de datos sobre el resultado JSONB; las tareas sin ese dato quedan fuera.
+# El rango de created_at limita las particiones consultadas. La paginación es por cursor:
+# `before` es el next_before de la página anterior.
+@router.get("/tasks", response_model=TaskListResponse)
+async def list_tasks(
+    task_status: TaskStatus | None = Query(None, alias="status"),
+    created_after: datetime | None = Query(None),
+    created_before: datetime | None = Query(None),
+    min_edge_pixels: int | None = Query(None, ge=0),
+    max_edge_pixels: int | None = Query(None, ge=0),
+    min_edge_density: float | None = Query(None, ge=0, le=1),
+    max_edge_density: float | None = Query(None, ge=0, le=1),
+    min_contours: int | None = Query(None, ge=0),
+    max_contours: int | None = Query(None, ge=0),
+    min_width: int | None = Query(None, ge=0),
+    max_width: int | None = Query(None, ge=0),
+    min_height: int | None = Query(None, ge=0),
+    max_height: int | None = Query(None, ge=0),
+    before: UUID | None = Query(None),
+    limit: int = Query(settings.TASK_LIST_DEFAULT_LIMIT, ge=1, le=settings.TASK_LIST_MAX_LIMIT),
+    db: AsyncSession = Depends(get_async_read_db)):
+
+    conditions = []
+    if task_status is not None:
+        conditions.append(Task.status == task_status)
+    if created_after is not None:
+        conditions.append(Task.created_at >= _as_utc(created_after))
+    if created_before is not None:
+        conditions.append(Task.created_at < _as_utc(created_before))
+    conditions += _range(result_value("edge_pixels").as_float(), min_edge_pixels, max_edge_pixels)
+    conditions += _range(result_value("edge_density").as_float(), min_edge_density, max_edge_density)
+    conditions += _range(result_value("contour_count").as_integer(), min_contours, max_contours)
+    conditions += _range(result_value("width").as_integer(), min_width, max_width)
+    conditions += _range(result_value("height").as_integer(), min_height, max_height)
+
+    if before is not None:
+        cursor = await db.execute(select(Task.created_at).where(task_by_id(before)))
+        cursor_created_at = cursor.scalar_one_or_none()
+        if cursor_created_at is None:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Cursor no válido: la tarea {before} no existe"
+            )
+        conditions.append(tuple_(Task.created_at, Task.id) < tuple_(cursor_created_at, before))
+
+    # se pide una fila más para saber si hay otra página
+    result = await db.execute(
+        select(Task)
+        .where(*conditions)
+        .order_by(Task.created_at.desc(), Task.id.desc())
+        .limit(limit + 1)
+    )
+    tasks = result.scalars().all()
+
+    return TaskListResponse(
+        items=[TaskResponse.model_validate(task) for task in tasks[:limit]],
+        next_before=tasks[limit - 1].id if len(tasks) > limit else None,
+    )
+
+# Endpoint para consultar el estado de una tarea por su ID (réplica de lectura si la hay).
 @router.get("/tasks/{task_id}", response_model=TaskResponse)
-async def get_task(task_id: UUID, db: AsyncSession = Depends(get_async_db)):
+async def get_task(task_id: UUID,
+    db: AsyncSession = Depends(get_async_read_db),
+    primary: AsyncSession = Depends(get_async_db)):
     
     # Buscar la tarea en la base de datos
-    result = await db.execute(
-        select(Task).where(Task.id == task_id)
-    )
-    task = result.scalar_one_or_none()
+    task = await _read_task(db, primary, task_id)
     
     # Si no existe, retornar 404
     if not task:
@@ -96,19 +427,102 @@ async def get_task(task_id: UUID, db: AsyncSession = Depends(get_async_db)):
             detail=f"Tarea con ID {task_id} no encontrada"
         )
     
-    return task
+    response = TaskResponse.model_validate(task)
+
+    # Mientras la tarea está en curso, el progreso más reciente está en Redis
+    # (la base de datos solo se actualiza cada PROGRESS_DB_INTERVAL_SECONDS)
+    if task.status in (TaskStatus.PENDING, TaskStatus.PROCESSING):
+        live = await read_progress(task.id)
+        if live:
+            response.progress = live.get("progress", response.progress)
+            # Redis guarda la fecha como texto ISO 8601; el esquema espera un datetime
+            updated_at = live.get("updated_at")
+            response.progress_updated_at = datetime.fromisoformat(updated_at) if updated_at else None
+
+    return response
+
+# Formatea un evento Server-Sent Events
+def _sse_event(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+# Endpoint de eventos de progreso (Server-Sent Events).
+# 1. Se suscribe al canal de progreso de la tarea
+# 2. Envía el estado actual de la tarea (evento "status")
+# 3. Retransmite cada actualización del worker (evento "progress") con keep-alives periódicos
+# 4. Cierra el stream cuando la tarea termina o tras PROGRESS_STREAM_MAX_SECONDS
+# Si Redis no está disponible solo se envía el estado actual.
+@router.get("/tasks/{task_id}/events")
+async def stream_task_events(task_id: UUID,
+    db: AsyncSession = Depends(get_async_read_db),
+    primary: AsyncSession = Depends(get_async_db)):
+
+    # Suscribirse antes de leer la base de datos para no perder eventos intermedios
+    subscription: ProgressSubscription | None = ProgressSubscription(task_id)
+    try:
+        await subscription.__aenter__()
+    except Exception as e:
+        print(f"No se pudo suscribir al progreso de la tarea {task_id}: {str(e)}")
+        subscription = None
+
+    try:
+        task = await _read_task(db, primary, task_id)
+
+        if not task:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Tarea con ID {task_id} no encontrada"
+            )
+    except BaseException:
+        if subscription is not None:
+            await subscription.__aexit__(None, None, None)
+        raise
 
-# Endpoint para descargar el archivo procesado de una tarea completada.
+    snapshot = TaskResponse.model_validate(task).model_dump(mode="json")
+
+    async def events():
+        try:
+            yield _sse_event("status", snapshot)
+            if snapshot["status"] in TERMINAL_STATUSES or subscription is None:
+                return
+
+            started = last_sent = time.monotonic()
+            while time.monotonic() - started < settings.PROGRESS_STREAM_MAX_SECONDS:
+                try:
+                    event = await subscription.next_event(timeout=1.0)
+                except Exception as e:
+                    print(f"Stream de progreso interrumpido para la tarea {task_id}: {str(e)}")
+                    return
+
+                if event is None:
+                    if time.monotonic() - last_sent >= settings.PROGRESS_STREAM_HEARTBEAT_SECONDS:
+                        last_sent = time.monotonic()
+                        yield ": keep-alive\n\n"
+                    continue
+
+                last_sent = time.monotonic()
+                yield _sse_event("progress", event)
+                if event.get("status") in TERMINAL_STATUSES:
+                    return
+        finally:
+            if subscription is not None:
+                await subscription.__aexit__(None, None, None)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+# Endpoint para descargar el archivo procesado de una tarea completada (réplica de lectura si la hay).
 @router.get("/tasks/{task_id}/result")
 async def download_processed_file(task_id: UUID,
-    db: AsyncSession = Depends(get_async_db),
-    minio_service: MinioService = Depends(get_minio_service)):
+    db: AsyncSession = Depends(get_async_read_db),
+    primary: AsyncSession = Depends(get_async_db),
+    minio_service: StorageService = Depends(get_minio_service),
+    spool: Spool | None = Depends(get_spool_service)):
 
-    # Buscar la tarea en la base de datos
-    result = await db.execute(
-        select(Task).where(Task.id == task_id)
-    )
-    task = result.scalar_one_or_none()
+    # Buscar la tarea en la base de datos (una tarea recién completada puede no estar aún en la réplica)
+    task = await _read_task(db, primary, task_id, settled={TaskStatus.COMPLETED.value})
 
     # Si no existe, retornar 404
     if not task:
@@ -131,6 +545,29 @@ async def download_processed_file(task_id: UUID,
             detail="No se encontró el archivo procesado en el resultado de la tarea"
         )
     
+    # Con almacenamiento local el archivo se sirve directamente desde disco
+    # (si ya no está, 404 antes de empezar la respuesta y no un error a mitad del envío)
+    if isinstance(minio_service, LocalStorageService):
+        if not minio_service.exists(processed_filename):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"El archivo procesado '{processed_filename}' no existe"
+            )
+        return FileResponse(
+            minio_service.path(processed_filename),
+            media_type="application/octet-stream",
+            filename=processed_filename
+        )
+
+    # Si el worker corrió en este nodo, el resultado está en el spool local
+    spooled_path = spool.find(processed_filename) if spool is not None else None
+    if spooled_path is not None:
+        return FileResponse(
+            spooled_path,
+            media_type="application/octet-stream",
+            filename=processed_filename
+        )
+
     # Descargar el archivo procesado desde MinIO
     file_data = minio_service.get_file(processed_filename)
     
@@ -138,4 +575,54 @@ async def download_processed_file(task_id: UUID,
         io.BytesIO(file_data),
         media_type="application/octet-stream",
         headers={"Content-Disposition": f"attachment; filename={processed_filename}"}
-    )
\ No newline at end of file
+    )
+# Endpoint para eliminar una tarea terminada.
+# La entrada y su resultado se comparten entre tareas con el mismo contenido: solo se
+# eliminan del almacenamiento cuando ya no queda ninguna tarea que los referencie.
+@router.delete("/tasks/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def delete_task(task_id: UUID,
+    db: AsyncSession = Depends(get_async_db),
+    minio_service: StorageService = Depends(get_minio_service)):
+
+    result = await db.execute(
+        select(Task).where(task_by_id(task_id))
+    )
+    task = result.scalar_one_or_none()
+
+    if not task:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Tarea con ID {task_id} no encontrada"
+        )
+
+    # Una tarea en cola o en curso todavía necesita su entrada
+    if task.status not in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="La tarea todavía no ha terminado"
+        )
+
+    await db.delete(task)
+    await db.commit()
+
+    # La fila ya no cuenta como referencia; un fallo aquí deja objetos huérfanos, no tareas rotas.
+    # El recuento y el borrado se hacen con el contenido bloqueado (hasta el commit), así que una
+    # subida simultánea del mismo contenido o se cuenta como referencia o vuelve a subir el objeto.
+    try:
+        await release_content(db, minio_service, task)
+    except MinioServiceError as e:
+        print(f"No se pudieron eliminar los archivos de la tarea {task_id}: {str(e)}")
+    finally:
+        await db.commit()
+
+# Dependencia para las señales de autoescalado
+def get_scaling_monitor() -> ScalingMonitor:
+    return scaling_monitor
+
+# Endpoint de señales para el autoescalado de los workers: profundidad de la cola, tareas
+# PENDING/PROCESSING, tareas terminadas por worker en la ventana reciente y tiempo estimado
+# para vaciar el trabajo aceptado (null si hay trabajo pero ningún worker ha terminado tareas).
+@router.get("/scaling", response_model=ScalingResponse)
+async def get_scaling_signals(db: AsyncSession = Depends(get_async_read_db),
+    monitor: ScalingMonitor = Depends(get_scaling_monitor)):
+    return await monitor.snapshot(db)
@@ -9,7 +9,44 @@ class TaskResponse(BaseModel):
     id: UUID
     status: str
     filename: str
+    media_type: str | None = None
+    params: dict | None = None
+    progress: float | None = None
+    progress_updated_at: datetime | None = None
     result: dict | None
     created_at: datetime
+    queued_at: datetime | None = None
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    timings: dict | None = None
+    callback_url: str | None = None
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class TaskListResponse(BaseModel):
+    # Página del listado de tareas (la siguiente se pide con before=next_before)
+
+    items: list[TaskResponse]
+    next_before: UUID | None = None
+
+
+class WorkerThroughput(BaseModel):
+    # Tareas terminadas por un worker en la ventana de medición
+
+    worker: str
+    finished: int
+    throughput_per_second: float
+
+
+class ScalingResponse(BaseModel):
+    # Señales para el autoescalado de los workers
+
+    queue_depth: int | None
+    pending: int
+    processing: int
+    window_seconds: int
+    finished_in_window: int
+    throughput_per_second: float
+    workers: list[WorkerThroughput]
+    estimated_drain_seconds: float | None
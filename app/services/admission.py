@@ -0,0 +1,104 @@
+import time
+from fastapi import status
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.redis_client import get_async_redis
+from app.models import Task, TaskStatus
+from app.services.pg_queue import uses_pg_queue
+
+
+class AdmissionRejected(Exception):
+    # Excepción cuando el sistema está sobrecargado y no admite más trabajo
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.detail = detail
+        self.retry_after = retry_after
+
+
+class AdmissionController:
+    # Control de admisión para /analyze.
+    # Compara la profundidad de la cola de Celery en Redis y las tareas en curso
+    # (PENDING + PROCESSING) contra los límites configurados, antes de subir nada a MinIO.
+
+    def __init__(self, redis_client=None,
+                 max_queue_depth: int | None = None,
+                 max_in_flight: int | None = None,
+                 retry_after: int | None = None,
+                 cache_seconds: float | None = None):
+        self._redis = redis_client
+        self.max_queue_depth = settings.ADMISSION_MAX_QUEUE_DEPTH if max_queue_depth is None else max_queue_depth
+        self.max_in_flight = settings.ADMISSION_MAX_IN_FLIGHT if max_in_flight is None else max_in_flight
+        self.retry_after = settings.ADMISSION_RETRY_AFTER_SECONDS if retry_after is None else retry_after
+        self.cache_seconds = settings.ADMISSION_CACHE_SECONDS if cache_seconds is None else cache_seconds
+        # última medición: (timestamp, profundidad de cola, tareas en curso)
+        self._snapshot: tuple[float, int, int] | None = None
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_async_redis()
+        return self._redis
+
+    # Número de mensajes esperando en la cola de Celery
+    # (con la cola de PostgreSQL, tareas PENDING en la tabla)
+    async def queue_depth(self, db: AsyncSession | None = None) -> int:
+        if db is not None and uses_pg_queue():
+            result = await db.execute(
+                select(func.count()).select_from(Task).where(Task.status == TaskStatus.PENDING)
+            )
+            return int(result.scalar_one())
+        return int(await self.redis.llen(settings.CELERY_QUEUE_NAME))
+
+    # Número de tareas aceptadas que aún no terminan
+    async def in_flight(self, db: AsyncSession) -> int:
+        result = await db.execute(
+            select(func.count()).select_from(Task).where(
+                Task.status.in_([TaskStatus.PENDING, TaskStatus.PROCESSING])
+            )
+        )
+        return int(result.scalar_one())
+
+    # Devuelve (profundidad de cola, tareas en curso), reutilizando la medición reciente
+    async def measure(self, db: AsyncSession) -> tuple[int, int]:
+        now = time.monotonic()
+        if self._snapshot and now - self._snapshot[0] < self.cache_seconds:
+            return self._snapshot[1], self._snapshot[2]
+
+        depth = await self.queue_depth(db) if self.max_queue_depth > 0 else 0
+        in_flight = await self.in_flight(db) if self.max_in_flight > 0 else 0
+        self._snapshot = (now, depth, in_flight)
+        return depth, in_flight
+
+    # Verifica si se puede admitir una nueva tarea
+    # Raises: AdmissionRejected: Si la cola o las tareas en curso superan el límite
+    async def check(self, db: AsyncSession) -> None:
+        if self.max_queue_depth <= 0 and self.max_in_flight <= 0:
+            return
+
+        try:
+            depth, in_flight = await self.measure(db)
+        except Exception as e:
+            # Si no se puede medir, se admite la tarea (fail-open) para no
+            # convertir una caída de Redis en una caída de la API
+            print(f"No se pudo evaluar el control de admisión: {str(e)}")
+            return
+
+        if self.max_queue_depth > 0 and depth >= self.max_queue_depth:
+            raise AdmissionRejected(
+                status.HTTP_503_SERVICE_UNAVAILABLE,
+                f"El sistema está sobrecargado ({depth} tareas en cola), intenta más tarde",
+                self.retry_after,
+            )
+
+        if self.max_in_flight > 0 and in_flight >= self.max_in_flight:
+            raise AdmissionRejected(
+                status.HTTP_429_TOO_MANY_REQUESTS,
+                f"Demasiadas tareas en curso ({in_flight}), intenta más tarde",
+                self.retry_after,
+            )
+
+
+# instancia compartida por proceso (la medición se cachea entre requests)
+admission_controller = AdmissionController()
@@ -0,0 +1,118 @@
+import hashlib
+import json
+from dataclasses import dataclass
+
+# Parámetros de análisis de una tarea: región de interés, tamaño máximo del resultado y umbrales
+# de Canny. Se envían en /analyze, se guardan en tasks.params (null = valores por defecto) y el
+# worker recorta y reduce la imagen antes de los pasos costosos, así que el trabajo y los bytes
+# de salida dependen de lo que se pide y no del tamaño de la entrada.
+# No usa OpenCV: la API valida los parámetros sin cargarlo.
+
+# umbrales de Canny por defecto
+DEFAULT_CANNY_LOW = 100
+DEFAULT_CANNY_HIGH = 200
+
+
+@dataclass(frozen=True)
+class AnalysisParams:
+    # región de interés (x, y, ancho, alto) en píxeles de la imagen original
+    roi: tuple[int, int, int, int] | None = None
+    # tamaño máximo del resultado: la región se reduce manteniendo la proporción (nunca se amplía)
+    max_width: int | None = None
+    max_height: int | None = None
+    canny_low: int = DEFAULT_CANNY_LOW
+    canny_high: int = DEFAULT_CANNY_HIGH
+
+    @property
+    def is_default(self) -> bool:
+        return self == AnalysisParams()
+
+    # True si hay que recortar o reducir la imagen antes de detectar bordes
+    @property
+    def changes_region(self) -> bool:
+        return self.roi is not None or self.max_width is not None or self.max_height is not None
+
+    # Valor para la columna tasks.params: solo lo que difiere de los valores por defecto
+    def to_json(self) -> dict | None:
+        data = {}
+        if self.roi is not None:
+            data["roi"] = list(self.roi)
+        if self.max_width is not None:
+            data["max_width"] = self.max_width
+        if self.max_height is not None:
+            data["max_height"] = self.max_height
+        if self.canny_low != DEFAULT_CANNY_LOW:
+            data["canny_low"] = self.canny_low
+        if self.canny_high != DEFAULT_CANNY_HIGH:
+            data["canny_high"] = self.canny_high
+        return data or None
+
+    # Parámetros de una tarea a partir de tasks.params (cualquier otro valor = por defecto)
+    @classmethod
+    def from_json(cls, data) -> "AnalysisParams":
+        if not isinstance(data, dict):
+            return cls()
+        roi = data.get("roi")
+        return cls(
+            roi=tuple(roi) if roi else None,
+            max_width=data.get("max_width"),
+            max_height=data.get("max_height"),
+            canny_low=data.get("canny_low", DEFAULT_CANNY_LOW),
+            canny_high=data.get("canny_high", DEFAULT_CANNY_HIGH),
+        )
+
+    # Clave corta para el nombre del resultado: las tareas con el mismo contenido y distintos
+    # parámetros no comparten archivo procesado
+    def key(self) -> str:
+        encoded = json.dumps(self.to_json(), sort_keys=True, separators=(",", ":")).encode()
+        return hashlib.sha256(encoded).hexdigest()[:12]
+
+    # Tamaño (ancho, alto) de la región que se analiza en una imagen de width x height
+    def region_size(self, width: int, height: int) -> tuple[int, int]:
+        if self.roi is None:
+            return width, height
+        x, y, roi_width, roi_height = self.roi
+        return max(0, min(roi_width, width - x)), max(0, min(roi_height, height - y))
+
+    # Tamaño (ancho, alto) del resultado para una región de width x height
+    def output_size(self, width: int, height: int) -> tuple[int, int]:
+        scale = 1.0
+        if self.max_width is not None:
+            scale = min(scale, self.max_width / width)
+        if self.max_height is not None:
+            scale = min(scale, self.max_height / height)
+        return max(1, round(width * scale)), max(1, round(height * scale))
+
+    # Raises: ValueError: Si la región de interés no cabe en una imagen de width x height
+    def check_bounds(self, width: int, height: int) -> None:
+        if self.roi is None:
+            return
+        x, y, roi_width, roi_height = self.roi
+        if x + roi_width > width or y + roi_height > height:
+            raise ValueError(
+                f"La región de interés {x},{y} {roi_width}x{roi_height} no cabe en la imagen de {width}x{height}"
+            )
+
+
+# Construye los parámetros a partir de los campos de /analyze (None = valor por defecto)
+# Raises: ValueError: Si la región de interés está incompleta o los umbrales no son válidos
+def build_params(roi_x: int | None = None, roi_y: int | None = None,
+                 roi_width: int | None = None, roi_height: int | None = None,
+                 max_width: int | None = None, max_height: int | None = None,
+                 canny_low: int | None = None, canny_high: int | None = None) -> AnalysisParams:
+    roi_fields = (roi_x, roi_y, roi_width, roi_height)
+    if any(value is not None for value in roi_fields) and any(value is None for value in roi_fields):
+        raise ValueError("La región de interés necesita roi_x, roi_y, roi_width y roi_height")
+
+    low = DEFAULT_CANNY_LOW if canny_low is None else canny_low
+    high = DEFAULT_CANNY_HIGH if canny_high is None else canny_high
+    if low > high:
+        raise ValueError("canny_low no puede ser mayor que canny_high")
+
+    return AnalysisParams(
+        roi=roi_fields if roi_x is not None else None,
+        max_width=max_width,
+        max_height=max_height,
+        canny_low=low,
+        canny_high=high,
+    )
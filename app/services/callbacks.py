@@ -0,0 +1,186 @@
+import hashlib
+import ipaddress
+import json
+import socket
+import httpx
+from urllib.parse import urlsplit
+from app.core.celery_app import celery_app, DELIVER_CALLBACKS_TASK
+from app.core.config import settings
+from app.core.redis_client import get_sync_redis
+
+# Notificaciones de fin de tarea por webhook.
+# Cuando una tarea termina (COMPLETED o FAILED) el worker deja el evento en una lista de
+# Redis por endpoint y programa una única tarea `deliver_callbacks` para ese endpoint, que
+# envía los eventos acumulados en un solo POST: {"events": [...]}. Los envíos fallidos se
+# reintentan con backoff; la entrega es al menos una vez y sin orden garantizado.
+
+CALLBACK_QUEUE_PREFIX = "task-callbacks:"
+CALLBACK_SCHEDULED_PREFIX = "task-callbacks-scheduled:"
+
+
+class CallbackDeliveryError(Exception):
+    # Error al enviar un lote; retryable indica si tiene sentido reintentarlo
+    def __init__(self, message: str, retryable: bool = True):
+        super().__init__(message)
+        self.retryable = retryable
+
+
+class CallbackDestinationError(ValueError):
+    # El destino del callback no está permitido (red interna o host fuera de la lista)
+    pass
+
+
+def _allowed_hosts() -> set[str]:
+    if not settings.CALLBACK_ALLOWED_HOSTS:
+        return set()
+    return {host.strip().lower() for host in settings.CALLBACK_ALLOWED_HOSTS.split(",") if host.strip()}
+
+
+# True si la dirección es pública (no loopback, privada, link-local, reservada, multicast...)
+def _is_public_address(address: str) -> bool:
+    ip = ipaddress.ip_address(address)
+    if ip.version == 6 and ip.ipv4_mapped is not None:
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+# Comprueba que el destino de un callback esté permitido (evita SSRF hacia la red interna):
+# con CALLBACK_ALLOWED_HOSTS solo se aceptan esos hosts; si no, todas las direcciones a las que
+# resuelve el host deben ser públicas. Se comprueba al aceptar la tarea y antes de cada envío
+# (el DNS puede cambiar entre ambos); las redirecciones no se siguen.
+# Raises: CallbackDestinationError: Si el destino no está permitido
+#         OSError: Si el host no se puede resolver
+def check_callback_destination(url: str) -> None:
+    parts = urlsplit(url)
+    host = (parts.hostname or "").lower()
+    allowed_hosts = _allowed_hosts()
+    if allowed_hosts:
+        if host not in allowed_hosts:
+            raise CallbackDestinationError(f"El host de callback '{host}' no está permitido")
+        return
+    if settings.CALLBACK_ALLOW_PRIVATE_NETWORKS:
+        return
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    addresses = {info[4][0] for info in socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)}
+    if not addresses or not all(_is_public_address(address) for address in addresses):
+        raise CallbackDestinationError(f"El host de callback '{host}' resuelve a una red interna")
+
+
+# Comprueba que la URL de callback sea http(s) absoluta y su destino esté permitido.
+# Resuelve el host: desde código asíncrono se llama en un hilo.
+# Raises: ValueError: Si la URL no es válida o el destino no está permitido
+def validate_callback_url(url: str) -> str:
+    parts = urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("La URL de callback debe ser http(s) absoluta")
+    if len(url) > 2048:
+        raise ValueError("La URL de callback supera los 2048 caracteres")
+    try:
+        check_callback_destination(url)
+    except OSError as e:
+        raise ValueError(f"No se pudo resolver el host de callback: {str(e)}") from e
+    return url
+
+
+def _endpoint_id(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()[:32]
+
+
+def queue_key(url: str) -> str:
+    return f"{CALLBACK_QUEUE_PREFIX}{_endpoint_id(url)}"
+
+
+def scheduled_key(url: str) -> str:
+    return f"{CALLBACK_SCHEDULED_PREFIX}{_endpoint_id(url)}"
+
+
+# Evento que recibe el endpoint por cada tarea terminada
+def callback_event(task) -> dict:
+    status = getattr(task.status, "value", task.status)
+    return {
+        "task_id": str(task.id),
+        "status": status,
+        "result": task.result,
+        "finished_at": task.finished_at.isoformat() if task.finished_at else None,
+    }
+
+
+# Programa la entrega para el endpoint salvo que ya haya una pendiente
+def _schedule(url: str, client, countdown: float) -> None:
+    if client.set(scheduled_key(url), 1, nx=True, ex=settings.CALLBACK_SCHEDULE_TTL_SECONDS):
+        celery_app.send_task(DELIVER_CALLBACKS_TASK, args=[url], countdown=countdown)
+
+
+# Encola el evento de una tarea terminada. Los errores no se propagan: la tarea ya terminó
+# y el resultado sigue disponible con GET /tasks/{task_id}.
+# Returns: bool: True si el evento quedó encolado
+def enqueue_callback(task, redis_client=None) -> bool:
+    url = task.callback_url
+    if not url:
+        return False
+    try:
+        client = redis_client or get_sync_redis()
+        pipe = client.pipeline(transaction=False)
+        pipe.rpush(queue_key(url), json.dumps(callback_event(task)))
+        pipe.expire(queue_key(url), settings.CALLBACK_QUEUE_TTL_SECONDS)
+        pipe.execute()
+        # el retraso deja que se acumulen los eventos de otras tareas del mismo endpoint
+        _schedule(url, client, settings.CALLBACK_BATCH_DELAY_SECONDS)
+        return True
+    except Exception as e:
+        print(f"No se pudo encolar el callback de la tarea {task.id}: {str(e)}")
+        return False
+
+
+# Saca de la cola hasta CALLBACK_BATCH_SIZE eventos del endpoint
+def take_batch(url: str, client) -> list[dict]:
+    raw = client.lpop(queue_key(url), settings.CALLBACK_BATCH_SIZE) or []
+    return [json.loads(item) for item in raw]
+
+
+# Libera la programación del endpoint y vuelve a programarla si quedan eventos
+def finish_batch(url: str, client) -> None:
+    client.delete(scheduled_key(url))
+    if client.llen(queue_key(url)):
+        _schedule(url, client, 0)
+
+
+# cliente HTTP del proceso: mantiene las conexiones abiertas entre entregas
+_http_client: httpx.Client | None = None
+
+
+def get_http_client() -> httpx.Client:
+    global _http_client
+    if _http_client is None:
+        _http_client = httpx.Client(
+            timeout=settings.CALLBACK_TIMEOUT_SECONDS,
+            limits=httpx.Limits(
+                max_connections=settings.CALLBACK_MAX_CONNECTIONS,
+                max_keepalive_connections=settings.CALLBACK_MAX_CONNECTIONS,
+            ),
+            headers={"User-Agent": f"{settings.PROJECT_NAME} callbacks"},
+        )
+    return _http_client
+
+
+# Envía un lote de eventos al endpoint
+# Raises: CallbackDeliveryError: Si el destino ya no está permitido o el endpoint no responde 2xx
+#         (los errores de DNS, 429 y 5xx se pueden reintentar)
+def post_batch(url: str, events: list[dict], http_client: httpx.Client | None = None) -> None:
+    client = http_client or get_http_client()
+    try:
+        check_callback_destination(url)
+    except CallbackDestinationError as e:
+        raise CallbackDeliveryError(str(e), retryable=False) from e
+    except OSError as e:
+        raise CallbackDeliveryError(f"No se pudo resolver '{url}': {str(e)}") from e
+    try:
+        response = client.post(url, json={"events": events})
+    except httpx.HTTPError as e:
+        raise CallbackDeliveryError(f"Error de conexión con '{url}': {str(e)}") from e
+    if response.is_success:
+        return
+    retryable = response.status_code == 429 or response.status_code >= 500
+    raise CallbackDeliveryError(
+        f"El endpoint '{url}' respondió {response.status_code}", retryable=retryable
+    )
@@ -0,0 +1,105 @@
+import hashlib
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models import Task, TaskStatus, result_value
+from app.services.storage import StorageService
+
+# Almacenamiento de entradas direccionado por contenido.
+# Cada entrada se guarda con su SHA-256 como nombre (`<hash>.<extensión>`), así que subir
+# los mismos bytes otra vez solo cuesta una comprobación de existencia en lugar de un PUT.
+# No hay un contador aparte: las referencias son las filas de `tasks` con ese content_hash,
+# y el objeto (y su resultado procesado) se elimina cuando se borra la última tarea.
+# Los resultados con parámetros de análisis propios (ROI, tamaño, umbrales) llevan la clave de
+# los parámetros en el nombre y se eliminan cuando ninguna otra tarea los usa.
+
+HASH_CHUNK_BYTES = 1024 * 1024
+
+
+def hash_bytes(content) -> str:
+    return hashlib.sha256(content).hexdigest()
+
+
+# Calcula el hash de un archivo abierto por bloques y lo deja de nuevo al principio
+def hash_file(fileobj) -> str:
+    digest = hashlib.sha256()
+    fileobj.seek(0)
+    for chunk in iter(lambda: fileobj.read(HASH_CHUNK_BYTES), b""):
+        digest.update(chunk)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def content_key(content_hash: str, extension: str) -> str:
+    return f"{content_hash}.{extension}"
+
+
+# Bloquea un contenido hasta el final de la transacción (pg_advisory_xact_lock). Serializa la
+# comprobación de existencia + alta de una tarea con el recuento + borrado de sus objetos: sin él,
+# un borrado simultáneo puede eliminar un objeto que una tarea nueva acaba de reutilizar.
+# Solo en PostgreSQL (en SQLite, usado en benchmarks con un único proceso, no se bloquea).
+async def lock_content(db: AsyncSession, content_hash: str) -> None:
+    if db.bind is None or db.bind.dialect.name != "postgresql":
+        return
+    await db.execute(select(func.pg_advisory_xact_lock(func.hashtext(content_hash))))
+
+
+# Guarda la entrada salvo que ya exista un objeto con el mismo contenido.
+# Se llama con el contenido bloqueado (lock_content) y la tarea se confirma en la misma transacción.
+# Args:
+#      storage: backend de almacenamiento
+#      key: nombre direccionado por contenido
+#      write: función que sube el contenido con ese nombre
+# Returns:
+#       bool: True si se subió, False si ya estaba almacenada
+# Raises:
+#       MinioServiceError: Si falla la comprobación o la subida
+def store_content(storage: StorageService, key: str, write) -> bool:
+    if storage.exists(key):
+        return False
+    write(key)
+    return True
+
+
+# Número de tareas que referencian un contenido
+async def count_references(db: AsyncSession, content_hash: str) -> int:
+    result = await db.execute(
+        select(func.count()).select_from(Task).where(Task.content_hash == content_hash)
+    )
+    return result.scalar_one()
+
+
+# Número de tareas del mismo contenido que usan un resultado procesado o que aún pueden
+# escribirlo (pendientes o en curso, con cualquier parámetro)
+async def count_output_references(db: AsyncSession, content_hash: str, processed_file: str) -> int:
+    result = await db.execute(
+        select(func.count()).select_from(Task).where(
+            Task.content_hash == content_hash,
+            (result_value("processed_file").as_string() == processed_file)
+            | Task.status.in_([TaskStatus.PENDING, TaskStatus.PROCESSING]),
+        )
+    )
+    return result.scalar_one()
+
+
+# Libera los objetos de una tarea ya eliminada de la base de datos.
+# Las tareas sin content_hash (anteriores a la deduplicación) tienen objetos propios;
+# las demás solo eliminan la entrada si ninguna otra tarea referencia el mismo contenido,
+# y el resultado si ninguna otra tarea lo usa. El contenido queda bloqueado hasta que
+# quien llama confirma la transacción.
+# Returns: list[str]: nombres de los objetos eliminados
+async def release_content(db: AsyncSession, storage: StorageService, task: Task) -> list[str]:
+    processed_file = task.result.get("processed_file") if task.result else None
+    if task.content_hash:
+        await lock_content(db, task.content_hash)
+    if task.content_hash and await count_references(db, task.content_hash) > 0:
+        if processed_file and await count_output_references(db, task.content_hash, processed_file) == 0:
+            storage.delete_file(processed_file)
+            return [processed_file]
+        return []
+
+    names = [task.filename]
+    if processed_file:
+        names.append(processed_file)
+    for name in names:
+        storage.delete_file(name)
+    return names
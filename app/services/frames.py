@@ -0,0 +1,177 @@
+import queue
+import threading
+import zipfile
+from typing import Callable, Iterator
+import numpy as np
+import cv2
+
+
+class FrameSequenceError(Exception):
+    # Excepción para videos o secuencias de frames que no se pueden leer o escribir
+    pass
+
+
+# Extensiones tratadas como secuencias de páginas (TIFF multipágina)
+MULTIPAGE_EXTENSIONS = {"tif", "tiff"}
+
+
+# Itera los frames de un video de forma incremental (un frame en memoria a la vez)
+# Args: path: ruta local del video
+# Returns: (total de frames estimado o None, fps, iterador de frames BGR)
+# Raises: FrameSequenceError: Si el video no se puede abrir
+def open_video(path: str) -> tuple[int | None, float, Iterator[np.ndarray]]:
+    capture = cv2.VideoCapture(path)
+    if not capture.isOpened():
+        raise FrameSequenceError("No se pudo abrir el video")
+
+    total = int(capture.get(cv2.CAP_PROP_FRAME_COUNT)) or None
+    fps = capture.get(cv2.CAP_PROP_FPS) or 25.0
+
+    def frames():
+        try:
+            while True:
+                ok, frame = capture.read()
+                if not ok:
+                    break
+                yield frame
+        finally:
+            capture.release()
+
+    return total, fps, frames()
+
+
+# Número de páginas de un TIFF (0 si no se puede leer)
+def count_pages(path: str) -> int:
+    try:
+        return int(cv2.imcount(path))
+    except cv2.error:
+        return 0
+
+
+# Itera las páginas de un TIFF multipágina en bloques de `chunk` páginas
+# Args: path: ruta local del TIFF
+# Returns: (total de páginas, iterador de páginas BGR)
+# Raises: FrameSequenceError: Si el archivo no tiene páginas legibles
+def open_multipage(path: str, chunk: int = 8) -> tuple[int, Iterator[np.ndarray]]:
+    total = count_pages(path)
+    if total <= 0:
+        raise FrameSequenceError("No se pudo leer el archivo multipágina")
+
+    def frames():
+        for start in range(0, total, chunk):
+            ok, pages = cv2.imreadmulti(path, start=start, count=min(chunk, total - start), flags=cv2.IMREAD_COLOR)
+            if not ok:
+                raise FrameSequenceError(f"No se pudo decodificar la página {start}")
+            yield from pages
+
+    return total, frames()
+
+
+class VideoFrameSink:
+    # Escribe frames en escala de grises como un video MP4.
+    # El VideoWriter se crea con el primer frame, cuando se conoce el tamaño.
+
+    extension = "mp4"
+
+    def __init__(self, path: str, fps: float):
+        self.path = path
+        self.fps = fps
+        self._writer = None
+
+    def write(self, frame: np.ndarray) -> None:
+        if self._writer is None:
+            height, width = frame.shape[:2]
+            self._writer = cv2.VideoWriter(
+                self.path, cv2.VideoWriter_fourcc(*"mp4v"), self.fps, (width, height), isColor=frame.ndim == 3
+            )
+            if not self._writer.isOpened():
+                raise FrameSequenceError("No se pudo crear el video de salida")
+        self._writer.write(frame)
+
+    def close(self) -> None:
+        if self._writer is not None:
+            self._writer.release()
+
+
+class ZipFrameSink:
+    # Escribe cada frame como PNG dentro de un archivo ZIP (sin recomprimir los PNG)
+
+    extension = "zip"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._archive = zipfile.ZipFile(path, "w", compression=zipfile.ZIP_STORED)
+        self._index = 0
+
+    def write(self, frame: np.ndarray) -> None:
+        success, buffer = cv2.imencode(".png", frame)
+        if not success:
+            raise FrameSequenceError(f"No se pudo codificar el frame {self._index}")
+        self._archive.writestr(f"frame_{self._index:06d}.png", memoryview(buffer).cast("B"))
+        self._index += 1
+
+    def close(self) -> None:
+        self._archive.close()
+
+
+# Ejecuta el pipeline acotado: un hilo decodifica frames hacia una cola de tamaño
+# `depth` mientras el hilo actual los procesa y escribe. OpenCV libera el GIL, así que
+# la decodificación y el procesamiento se solapan sin cargar todo el video en memoria.
+# Args:
+#      frames: iterador de frames de entrada
+#      process: función frame -> frame procesado
+#      sink: destino con write(frame) y close()
+#      depth: máximo de frames decodificados esperando en la cola
+#      on_progress: callback (frames procesados) opcional
+# Returns: int: número de frames procesados
+def run_frame_pipeline(frames: Iterator[np.ndarray],
+                       process: Callable[[np.ndarray], np.ndarray],
+                       sink,
+                       depth: int = 8,
+                       on_progress: Callable[[int], None] | None = None) -> int:
+    pending: queue.Queue = queue.Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+    done = object()
+    errors: list[BaseException] = []
+
+    def put(item) -> bool:
+        # espera espacio en la cola sin bloquearse si el consumidor ya terminó
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def decode():
+        try:
+            for frame in frames:
+                if not put(frame):
+                    return
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            put(done)
+
+    reader = threading.Thread(target=decode, name="frame-decoder", daemon=True)
+    reader.start()
+
+    processed = 0
+    try:
+        while True:
+            frame = pending.get()
+            if frame is done:
+                break
+            sink.write(process(frame))
+            processed += 1
+            if on_progress is not None:
+                on_progress(processed)
+    finally:
+        stop.set()
+        reader.join()
+        sink.close()
+
+    if errors:
+        raise errors[0]
+    return processed
@@ -0,0 +1,162 @@
+import struct
+from dataclasses import dataclass
+
+# Lectura rápida del formato y las dimensiones de una imagen a partir de su cabecera,
+# sin decodificar los píxeles (no usa OpenCV, así que la API no necesita cargarlo).
+# Soporta los formatos que decodifica el worker: JPEG, PNG, WebP, GIF, BMP y TIFF.
+
+
+class InvalidImageError(Exception):
+    # Excepción para archivos que no son una imagen reconocible o tienen la cabecera dañada
+    pass
+
+
+@dataclass(frozen=True)
+class ImageInfo:
+    format: str
+    width: int
+    height: int
+
+    @property
+    def pixels(self) -> int:
+        return self.width * self.height
+
+
+# Marcadores JPEG de inicio de frame (SOF) que contienen las dimensiones
+_JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Marcadores JPEG sin campo de longitud
+_JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+
+
+def _probe_jpeg(data: memoryview) -> tuple[int, int]:
+    position = 2
+    while position + 4 <= len(data):
+        if data[position] != 0xFF:
+            raise InvalidImageError("Cabecera JPEG dañada")
+        marker = data[position + 1]
+        if marker == 0xFF:
+            # byte de relleno entre segmentos
+            position += 1
+            continue
+        if marker in _JPEG_STANDALONE_MARKERS:
+            position += 2
+            continue
+        if marker in (0xD9, 0xDA):
+            # fin de imagen o inicio de los datos comprimidos sin haber visto un SOF
+            break
+        length = struct.unpack_from(">H", data, position + 2)[0]
+        if marker in _JPEG_SOF_MARKERS:
+            if position + 9 > len(data):
+                break
+            height, width = struct.unpack_from(">HH", data, position + 5)
+            return width, height
+        position += 2 + length
+    raise InvalidImageError("No se encontraron las dimensiones del JPEG")
+
+
+def _probe_png(data: memoryview) -> tuple[int, int]:
+    if len(data) < 24 or bytes(data[12:16]) != b"IHDR":
+        raise InvalidImageError("Cabecera PNG dañada")
+    return struct.unpack_from(">II", data, 16)
+
+
+def _probe_gif(data: memoryview) -> tuple[int, int]:
+    if len(data) < 10:
+        raise InvalidImageError("Cabecera GIF dañada")
+    return struct.unpack_from("<HH", data, 6)
+
+
+def _probe_webp(data: memoryview) -> tuple[int, int]:
+    if len(data) < 30:
+        raise InvalidImageError("Cabecera WebP dañada")
+    chunk = bytes(data[12:16])
+    if chunk == b"VP8 ":
+        if bytes(data[23:26]) != b"\x9d\x01\x2a":
+            raise InvalidImageError("Cabecera WebP (VP8) dañada")
+        width, height = struct.unpack_from("<HH", data, 26)
+        return width & 0x3FFF, height & 0x3FFF
+    if chunk == b"VP8L":
+        if data[20] != 0x2F:
+            raise InvalidImageError("Cabecera WebP (VP8L) dañada")
+        bits = struct.unpack_from("<I", data, 21)[0]
+        return (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1
+    if chunk == b"VP8X":
+        width = int.from_bytes(data[24:27], "little") + 1
+        height = int.from_bytes(data[27:30], "little") + 1
+        return width, height
+    raise InvalidImageError("Formato WebP no soportado")
+
+
+def _probe_bmp(data: memoryview) -> tuple[int, int]:
+    if len(data) < 26:
+        raise InvalidImageError("Cabecera BMP dañada")
+    header_size = struct.unpack_from("<I", data, 14)[0]
+    if header_size == 12:
+        return struct.unpack_from("<HH", data, 18)
+    width, height = struct.unpack_from("<ii", data, 18)
+    # una altura negativa indica filas de arriba hacia abajo
+    return abs(width), abs(height)
+
+
+# Tipos de campo TIFF con los que se codifican ancho y alto: SHORT y LONG
+_TIFF_FIELD_FORMATS = {3: "H", 4: "I"}
+
+
+def _probe_tiff(data: memoryview) -> tuple[int, int]:
+    order = "<" if bytes(data[:2]) == b"II" else ">"
+    if len(data) < 8 or struct.unpack_from(f"{order}H", data, 2)[0] != 42:
+        raise InvalidImageError("Cabecera TIFF dañada o BigTIFF no soportado")
+    offset = struct.unpack_from(f"{order}I", data, 4)[0]
+    if offset + 2 > len(data):
+        raise InvalidImageError("Cabecera TIFF dañada")
+
+    count = struct.unpack_from(f"{order}H", data, offset)[0]
+    dimensions = {}
+    for index in range(count):
+        entry = offset + 2 + index * 12
+        if entry + 12 > len(data):
+            break
+        tag, field_type = struct.unpack_from(f"{order}HH", data, entry)
+        if tag in (256, 257) and field_type in _TIFF_FIELD_FORMATS:
+            dimensions[tag] = struct.unpack_from(f"{order}{_TIFF_FIELD_FORMATS[field_type]}", data, entry + 8)[0]
+    if 256 not in dimensions or 257 not in dimensions:
+        raise InvalidImageError("No se encontraron las dimensiones del TIFF")
+    return dimensions[256], dimensions[257]
+
+
+# Firmas de cada formato: (prefijo, formato, función de lectura)
+_SIGNATURES = [
+    (b"\xff\xd8\xff", "jpeg", _probe_jpeg),
+    (b"\x89PNG\r\n\x1a\n", "png", _probe_png),
+    (b"GIF87a", "gif", _probe_gif),
+    (b"GIF89a", "gif", _probe_gif),
+    (b"BM", "bmp", _probe_bmp),
+    (b"II*\x00", "tiff", _probe_tiff),
+    (b"MM\x00*", "tiff", _probe_tiff),
+]
+
+
+# Identifica el formato y las dimensiones de una imagen leyendo solo su cabecera
+# Args: data: contenido del archivo (bytes o cualquier objeto con protocolo de buffer)
+# Returns: ImageInfo: formato, ancho y alto
+# Raises: InvalidImageError: Si el formato no está soportado o la cabecera está dañada
+def probe_image(data) -> ImageInfo:
+    view = memoryview(data).cast("B")
+    if len(view) >= 12 and bytes(view[:4]) == b"RIFF" and bytes(view[8:12]) == b"WEBP":
+        detected = ("webp", _probe_webp)
+    else:
+        detected = next(
+            ((fmt, probe) for signature, fmt, probe in _SIGNATURES if bytes(view[:len(signature)]) == signature),
+            None,
+        )
+    if detected is None:
+        raise InvalidImageError("Formato de imagen no soportado")
+
+    fmt, probe = detected
+    try:
+        width, height = probe(view)
+    except struct.error as e:
+        raise InvalidImageError(f"Cabecera {fmt.upper()} truncada") from e
+    if width <= 0 or height <= 0:
+        raise InvalidImageError("La imagen tiene dimensiones inválidas")
+    return ImageInfo(fmt, int(width), int(height))
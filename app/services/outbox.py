@@ -0,0 +1,116 @@
+import asyncio
+from sqlalchemy import delete, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.metrics import OUTBOX_DISPATCHED_TOTAL
+from app.models import OutboxMessage
+
+# Outbox transaccional para encolar tareas en Celery.
+# /analyze no publica en el broker: guarda el mensaje en `task_outbox` en la misma
+# transacción que la tarea, así que una tarea confirmada siempre tiene su mensaje y la
+# latencia del request no depende de Redis. El dispatcher (un bucle en cada proceso de la
+# API) drena la tabla en lotes y los publica en Celery con una sola conexión al broker.
+# Varios dispatchers pueden correr a la vez: cada uno bloquea su lote con SKIP LOCKED.
+# La entrega es al menos una vez: si la publicación se corta a mitad de un lote, el lote
+# completo se vuelve a publicar (process_image ignora las tareas ya terminadas).
+
+
+# Añade a la sesión el mensaje que encola una tarea de Celery al confirmarse la transacción
+def add_to_outbox(db: AsyncSession, task_name: str, args: list, kwargs: dict | None = None) -> OutboxMessage:
+    message = OutboxMessage(task_name=task_name, args=args, kwargs=kwargs or {})
+    db.add(message)
+    return message
+
+
+# Publica un lote en Celery reutilizando un único productor (una conexión al broker)
+def publish_batch(messages: list[tuple[str, list, dict]]) -> None:
+    with celery_app.producer_or_acquire() as producer:
+        for task_name, args, kwargs in messages:
+            celery_app.send_task(task_name, args=args, kwargs=kwargs, producer=producer)
+
+
+class OutboxDispatcher:
+    # Drena `task_outbox` en lotes de hasta OUTBOX_BATCH_SIZE mensajes.
+    # Se despierta al confirmarse una tarea en este proceso (notify) y, en cualquier caso,
+    # cada OUTBOX_POLL_INTERVAL_SECONDS para recoger mensajes de procesos caídos.
+
+    def __init__(self, session_factory=None,
+                 batch_size: int | None = None,
+                 poll_interval: float | None = None):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.batch_size = settings.OUTBOX_BATCH_SIZE if batch_size is None else batch_size
+        self.poll_interval = settings.OUTBOX_POLL_INTERVAL_SECONDS if poll_interval is None else poll_interval
+        self._wakeup: asyncio.Event | None = None
+        self._runner: asyncio.Task | None = None
+
+    # Avisa de que hay mensajes nuevos (no hace nada si el dispatcher no está corriendo)
+    def notify(self) -> None:
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    # Publica un lote y lo borra de la tabla en la misma transacción
+    # Returns: int: número de mensajes publicados
+    async def drain_once(self) -> int:
+        async with self.session_factory() as db:
+            async with db.begin():
+                result = await db.execute(
+                    select(OutboxMessage)
+                    .order_by(OutboxMessage.id)
+                    .limit(self.batch_size)
+                    .with_for_update(skip_locked=True)
+                )
+                messages = result.scalars().all()
+                if not messages:
+                    return 0
+                # el envío al broker es bloqueante: se hace fuera del event loop
+                await asyncio.to_thread(
+                    publish_batch, [(m.task_name, m.args, m.kwargs) for m in messages]
+                )
+                await db.execute(
+                    delete(OutboxMessage).where(OutboxMessage.id.in_([m.id for m in messages]))
+                )
+        OUTBOX_DISPATCHED_TOTAL.inc(len(messages))
+        return len(messages)
+
+    # Drena hasta vaciar la tabla
+    async def drain(self) -> int:
+        total = 0
+        while count := await self.drain_once():
+            total += count
+            if count < self.batch_size:
+                break
+        return total
+
+    async def run(self) -> None:
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await self.drain()
+            except Exception as e:
+                # broker o base de datos caídos: los mensajes siguen en la tabla
+                print(f"No se pudo despachar el outbox: {str(e)}")
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    def start(self) -> None:
+        if self._runner is None:
+            self._runner = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+            self._wakeup = None
+
+
+# dispatcher del proceso de la API
+outbox_dispatcher = OutboxDispatcher()
@@ -0,0 +1,58 @@
+import asyncio
+from sqlalchemy import func, select
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+
+# Mantenimiento de las particiones mensuales de `tasks` en PostgreSQL.
+# La tabla está particionada por rango de created_at (tasks_AAAA_MM) y PostgreSQL no crea
+# particiones al insertar: cada proceso de la API llama a ensure_task_partitions() al arrancar
+# y cada TASK_PARTITION_CHECK_INTERVAL_SECONDS para tener siempre TASK_PARTITIONS_AHEAD meses
+# creados por delante. La función es idempotente y se serializa en la base de datos.
+
+
+class PartitionMaintainer:
+
+    def __init__(self, session_factory=None,
+                 months_ahead: int | None = None,
+                 interval: float | None = None):
+        self.session_factory = session_factory or AsyncSessionLocal
+        self.months_ahead = settings.TASK_PARTITIONS_AHEAD if months_ahead is None else months_ahead
+        self.interval = settings.TASK_PARTITION_CHECK_INTERVAL_SECONDS if interval is None else interval
+        self._runner: asyncio.Task | None = None
+
+    # Crea las particiones que falten desde el mes actual
+    # Returns: int: número de particiones creadas
+    async def ensure(self) -> int:
+        async with self.session_factory() as db:
+            result = await db.execute(select(func.ensure_task_partitions(func.now(), self.months_ahead)))
+            created = int(result.scalar_one())
+            await db.commit()
+        if created:
+            print(f"Creadas {created} particiones de la tabla tasks")
+        return created
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self.ensure()
+            except Exception as e:
+                # quedan meses creados por delante: se reintenta en la siguiente vuelta
+                print(f"No se pudieron crear las particiones de tasks: {str(e)}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._runner is None:
+            self._runner = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            self._runner.cancel()
+            try:
+                await self._runner
+            except asyncio.CancelledError:
+                pass
+            self._runner = None
+
+
+# mantenimiento del proceso de la API
+partition_maintainer = PartitionMaintainer()
@@ -0,0 +1,130 @@
+import select as io_select
+from datetime import datetime, timedelta, timezone
+from uuid import UUID
+from sqlalchemy import func, or_, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models import Task, TaskStatus
+
+# Cola de tareas sobre PostgreSQL (TASK_QUEUE_BACKEND=postgres), alternativa a Celery/Redis.
+# La tabla `tasks` ya es la máquina de estados: la API confirma la tarea PENDING junto con un
+# NOTIFY y los workers (python -m app.pg_worker) reclaman lotes con FOR UPDATE SKIP LOCKED,
+# pasándolos a PROCESSING en la misma sentencia. Un NOTIFY perdido solo retrasa la tarea hasta
+# el siguiente sondeo (PG_QUEUE_POLL_INTERVAL_SECONDS). Las tareas PROCESSING sin actividad
+# durante PG_QUEUE_STALE_SECONDS (worker caído) vuelven a PENDING.
+
+# Backends de cola admitidos en TASK_QUEUE_BACKEND
+QUEUE_BACKEND_CELERY = "celery"
+QUEUE_BACKEND_POSTGRES = "postgres"
+
+
+def uses_pg_queue() -> bool:
+    return settings.TASK_QUEUE_BACKEND == QUEUE_BACKEND_POSTGRES
+
+
+# Avisa a los workers de que hay una tarea nueva. NOTIFY es transaccional:
+# solo se entrega si la transacción de la tarea se confirma.
+async def notify_task_queued(db: AsyncSession) -> None:
+    await db.execute(select(func.pg_notify(settings.PG_QUEUE_CHANNEL, "")))
+
+
+# Tareas PENDING disponibles (las que esperan un reintento tienen queued_at en el futuro).
+# Se seleccionan con su created_at para que el UPDATE use la clave primaria de cada partición.
+def _available_tasks(limit: int):
+    return (
+        select(Task.id, Task.created_at)
+        .where(Task.status == TaskStatus.PENDING)
+        .where(or_(Task.queued_at.is_(None), Task.queued_at <= func.now()))
+        .order_by(Task.queued_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+
+
+# Sentencia que reclama un lote: lo bloquea con SKIP LOCKED y lo pasa a PROCESSING
+def claim_statement(limit: int):
+    return (
+        update(Task)
+        .where(tuple_(Task.id, Task.created_at).in_(_available_tasks(limit)))
+        .values(status=TaskStatus.PROCESSING, started_at=func.now())
+        .returning(Task.id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+# Reclama hasta `limit` tareas para este worker
+# Returns: list[UUID]: IDs de las tareas reclamadas (ya en PROCESSING)
+def claim_batch(db, limit: int) -> list[UUID]:
+    task_ids = list(db.execute(claim_statement(limit)).scalars())
+    db.commit()
+    return task_ids
+
+
+# Devuelve a PENDING las tareas PROCESSING sin actividad desde hace `stale_seconds`.
+# Cada recuperación cuenta como un reintento; agotados los reintentos la tarea queda FAILED.
+# Returns: list[Task]: tareas recuperadas o marcadas como fallidas
+def reclaim_stale(db, stale_seconds: float, max_retries: int) -> list[Task]:
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=stale_seconds)
+    tasks = db.execute(
+        select(Task)
+        .where(Task.status == TaskStatus.PROCESSING)
+        .where(func.coalesce(Task.updated_at, Task.started_at) < cutoff)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+
+    now = datetime.now(timezone.utc)
+    for task in tasks:
+        attempt = (task.result or {}).get("retries", 0) + 1
+        error = f"Worker sin actividad durante {stale_seconds:.0f} s"
+        if attempt > max_retries:
+            task.status = TaskStatus.FAILED
+            task.result = {"error": error, "retries": attempt - 1}
+            task.finished_at = now
+        else:
+            task.status = TaskStatus.PENDING
+            task.result = {"error": error, "retries": attempt}
+            task.queued_at = now
+    db.commit()
+    return tasks
+
+
+class TaskNotifications:
+    # LISTEN sobre PG_QUEUE_CHANNEL con una conexión dedicada (fuera del pool) en autocommit
+
+    def __init__(self, engine, channel: str | None = None):
+        self.engine = engine
+        self.channel = channel or settings.PG_QUEUE_CHANNEL
+        self._connection = None
+
+    @property
+    def listening(self) -> bool:
+        return self._connection is not None
+
+    def listen(self) -> None:
+        self.close()
+        connection = self.engine.raw_connection()
+        connection.driver_connection.autocommit = True
+        with connection.driver_connection.cursor() as cursor:
+            cursor.execute(f'LISTEN "{self.channel}"')
+        self._connection = connection
+
+    # Espera una notificación como máximo `timeout` segundos
+    # Returns: bool: True si llegó alguna notificación
+    def wait(self, timeout: float) -> bool:
+        connection = self._connection.driver_connection
+        if not connection.notifies:
+            readable, _, _ = io_select.select([connection], [], [], timeout)
+            if not readable:
+                return False
+            connection.poll()
+        received = bool(connection.notifies)
+        connection.notifies.clear()
+        return received
+
+    def close(self) -> None:
+        if self._connection is not None:
+            try:
+                self._connection.invalidate()
+            except Exception:
+                pass
+            self._connection = None
@@ -0,0 +1,124 @@
+import json
+import time
+from datetime import datetime, timezone
+from app.core.config import settings
+from app.core.redis_client import get_async_redis, get_sync_redis
+
+# Progreso de tareas en curso publicado a través de Redis.
+# El worker escribe el último estado en una clave con TTL y lo publica en un canal;
+# la API lo lee para completar TaskResponse y lo retransmite como Server-Sent Events.
+# PostgreSQL solo recibe el progreso cada PROGRESS_DB_INTERVAL_SECONDS.
+
+PROGRESS_KEY_PREFIX = "task-progress:"
+
+
+def progress_key(task_id: str) -> str:
+    return f"{PROGRESS_KEY_PREFIX}{task_id}"
+
+
+class ProgressReporter:
+    # Publica el progreso de una tarea desde el worker.
+    # Las actualizaciones a Redis se limitan a una cada PROGRESS_UPDATE_INTERVAL_SECONDS
+    # y la escritura en la base de datos (opcional) a una cada PROGRESS_DB_INTERVAL_SECONDS.
+
+    def __init__(self, task_id: str, db=None, task=None, redis_client=None):
+        self.task_id = str(task_id)
+        self.db = db
+        self.task = task
+        self._redis = redis_client
+        self.progress = 0.0
+        self._last_publish = 0.0
+        self._last_db_write = time.monotonic()
+        self._redis_failed = False
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_sync_redis()
+        return self._redis
+
+    # Reporta el progreso (0 a 1). Con force=True se publica sin esperar el intervalo.
+    def report(self, progress: float, status: str | None = None, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_publish < settings.PROGRESS_UPDATE_INTERVAL_SECONDS:
+            return
+        self._last_publish = now
+        progress = round(max(0.0, min(progress, 1.0)), 4)
+        self.progress = progress
+        self._publish(progress, status)
+
+        if self.db is not None and self.task is not None and not force:
+            if now - self._last_db_write >= settings.PROGRESS_DB_INTERVAL_SECONDS:
+                self._last_db_write = now
+                self.task.progress = progress
+                self.db.commit()
+
+    # Reporta el progreso como fracción de frames procesados
+    def frames(self, processed: int, total: int | None) -> None:
+        if total:
+            self.report(min(processed / total, 0.99))
+
+    def _publish(self, progress: float, status: str | None) -> None:
+        if not settings.PROGRESS_REDIS_ENABLED or self._redis_failed:
+            return
+        payload = {
+            "task_id": self.task_id,
+            "progress": progress,
+            "updated_at": datetime.now(timezone.utc).isoformat(),
+        }
+        if status:
+            payload["status"] = status
+        message = json.dumps(payload)
+        try:
+            pipe = self.redis.pipeline(transaction=False)
+            pipe.set(progress_key(self.task_id), message, ex=settings.PROGRESS_TTL_SECONDS)
+            pipe.publish(progress_key(self.task_id), message)
+            pipe.execute()
+        except Exception as e:
+            # el progreso es informativo: si Redis falla no se interrumpe la tarea
+            self._redis_failed = True
+            print(f"No se pudo publicar el progreso de la tarea {self.task_id}: {str(e)}")
+
+
+class ProgressSubscription:
+    # Suscripción al canal de progreso de una tarea (usada por el stream SSE).
+    # Se suscribe al entrar, antes de que el llamador lea el estado en la base de datos,
+    # para no perder eventos publicados entre la lectura y la suscripción.
+
+    def __init__(self, task_id: str, redis_client=None):
+        self.task_id = str(task_id)
+        self._redis = redis_client
+        self._pubsub = None
+
+    async def __aenter__(self):
+        client = self._redis or get_async_redis()
+        self._pubsub = client.pubsub()
+        await self._pubsub.subscribe(progress_key(self.task_id))
+        return self
+
+    async def __aexit__(self, *exc):
+        try:
+            await self._pubsub.unsubscribe()
+            await self._pubsub.aclose()
+        except Exception:
+            pass
+
+    # Espera el siguiente evento hasta `timeout` segundos (None si no llega ninguno)
+    async def next_event(self, timeout: float = 1.0) -> dict | None:
+        message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+        if not message or message.get("type") != "message":
+            return None
+        return json.loads(message["data"])
+
+
+# Lee el último progreso publicado de una tarea (None si no hay o Redis no responde)
+async def read_progress(task_id: str, redis_client=None) -> dict | None:
+    if not settings.PROGRESS_REDIS_ENABLED:
+        return None
+    try:
+        client = redis_client or get_async_redis()
+        raw = await client.get(progress_key(str(task_id)))
+    except Exception as e:
+        print(f"No se pudo leer el progreso de la tarea {task_id}: {str(e)}")
+        return None
+    return json.loads(raw) if raw else None
@@ -0,0 +1,105 @@
+import time
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.models import Task, TaskStatus
+from app.services.admission import AdmissionController, admission_controller
+
+# Señales para el autoescalado horizontal de los workers.
+# Escalar por CPU reacciona tarde a una cola que crece y reduce workers con trabajo pendiente;
+# GET /scaling reporta la cola, las tareas en curso, el ritmo reciente por worker y el tiempo
+# estimado para vaciar el trabajo aceptado, que es lo que debe seguir el autoscaler.
+
+# etiqueta de las tareas terminadas sin worker registrado en timings
+UNKNOWN_WORKER = "unknown"
+
+
+class ScalingMonitor:
+    # Calcula las señales de escalado a partir de la cola (Redis o PostgreSQL, la misma medición
+    # que el control de admisión) y de las tareas terminadas en los últimos SCALING_WINDOW_SECONDS.
+    # La medición se reutiliza SCALING_CACHE_SECONDS para que los sondeos del autoscaler no
+    # se conviertan en carga sobre la base de datos.
+
+    def __init__(self, admission: AdmissionController | None = None,
+                 window_seconds: int | None = None,
+                 cache_seconds: float | None = None):
+        self.admission = admission or admission_controller
+        self.window_seconds = settings.SCALING_WINDOW_SECONDS if window_seconds is None else window_seconds
+        self.cache_seconds = settings.SCALING_CACHE_SECONDS if cache_seconds is None else cache_seconds
+        # última medición: (timestamp, señales)
+        self._snapshot: tuple[float, dict] | None = None
+
+    # Número de tareas PENDING y PROCESSING
+    async def task_counts(self, db: AsyncSession) -> dict[str, int]:
+        result = await db.execute(
+            select(Task.status, func.count())
+            .where(Task.status.in_([TaskStatus.PENDING, TaskStatus.PROCESSING]))
+            .group_by(Task.status)
+        )
+        counts = {TaskStatus.PENDING.value: 0, TaskStatus.PROCESSING.value: 0}
+        for task_status, count in result.all():
+            counts[getattr(task_status, "value", task_status)] = int(count)
+        return counts
+
+    # Tareas terminadas (COMPLETED o FAILED) en la ventana, por worker
+    async def finished_by_worker(self, db: AsyncSession) -> dict[str, int]:
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=self.window_seconds)
+        worker = Task.timings["worker"].as_string()
+        result = await db.execute(
+            select(worker, func.count())
+            .where(Task.finished_at >= cutoff)
+            .group_by(worker)
+        )
+        return {name or UNKNOWN_WORKER: int(count) for name, count in result.all()}
+
+    # Mide todas las señales
+    async def measure(self, db: AsyncSession) -> dict:
+        try:
+            queue_depth = await self.admission.queue_depth(db)
+        except Exception as e:
+            # sin broker se siguen reportando las señales de la base de datos
+            print(f"No se pudo medir la cola: {str(e)}")
+            queue_depth = None
+
+        counts = await self.task_counts(db)
+        finished = await self.finished_by_worker(db)
+
+        finished_total = sum(finished.values())
+        throughput = finished_total / self.window_seconds
+        backlog = counts[TaskStatus.PENDING.value] + counts[TaskStatus.PROCESSING.value]
+        if backlog == 0:
+            drain_seconds = 0.0
+        elif throughput > 0:
+            drain_seconds = round(backlog / throughput, 1)
+        else:
+            # trabajo pendiente y ninguna tarea terminada en la ventana: no hay estimación posible
+            drain_seconds = None
+
+        return {
+            "queue_depth": queue_depth,
+            "pending": counts[TaskStatus.PENDING.value],
+            "processing": counts[TaskStatus.PROCESSING.value],
+            "window_seconds": self.window_seconds,
+            "finished_in_window": finished_total,
+            "throughput_per_second": round(throughput, 4),
+            "workers": [
+                {"worker": name, "finished": count, "throughput_per_second": round(count / self.window_seconds, 4)}
+                for name, count in sorted(finished.items())
+            ],
+            "estimated_drain_seconds": drain_seconds,
+        }
+
+    # Devuelve las señales, reutilizando la medición reciente
+    async def snapshot(self, db: AsyncSession) -> dict:
+        now = time.monotonic()
+        if self._snapshot and now - self._snapshot[0] < self.cache_seconds:
+            return self._snapshot[1]
+
+        signals = await self.measure(db)
+        self._snapshot = (now, signals)
+        return signals
+
+
+# instancia compartida por proceso (la medición se cachea entre requests)
+scaling_monitor = ScalingMonitor()
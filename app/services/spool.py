@@ -0,0 +1,74 @@
+import os
+import time
+from app.core.config import settings
+from app.services.storage import LocalStorageService, MinioServiceError
+
+# Spool local para el traspaso API -> worker cuando ambos corren en el mismo nodo.
+# La API deja una copia de la entrada en SPOOL_DIR (idealmente en /dev/shm, memoria compartida)
+# y lo indica al encolar la tarea; si el worker que la recibe ve el archivo, lo lee de ahí
+# en lugar de descargarlo de MinIO. El worker deja también el resultado para que la API lo
+# sirva sin pasar por MinIO. MinIO sigue recibiendo ambas copias: es la fuente de verdad
+# para workers remotos y para los reintentos.
+
+
+class Spool(LocalStorageService):
+    # Directorio de traspaso local. Las entradas se borran al terminar la tarea y
+    # cualquier archivo más antiguo que SPOOL_MAX_AGE_SECONDS se elimina en los barridos.
+
+    def __init__(self, root: str, max_age_seconds: int, max_file_bytes: int):
+        super().__init__(root)
+        self.max_age_seconds = max_age_seconds
+        self.max_file_bytes = max_file_bytes
+        self._last_sweep = 0.0
+
+    # Indica si un archivo de `size` bytes cabe en el spool
+    def accepts(self, size: int | None) -> bool:
+        return size is not None and 0 < size <= self.max_file_bytes
+
+    # Ruta del archivo si está en el spool de este nodo (None si no está)
+    def find(self, file_name: str) -> str | None:
+        try:
+            path = self.path(file_name)
+        except MinioServiceError:
+            return None
+        return path if os.path.isfile(path) else None
+
+    def discard(self, file_name: str) -> None:
+        path = self.find(file_name)
+        if path is not None:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    # Elimina los archivos vencidos, como máximo una vez por minuto
+    def sweep(self, force: bool = False) -> int:
+        now = time.time()
+        if not force and now - self._last_sweep < 60:
+            return 0
+        self._last_sweep = now
+
+        removed = 0
+        for entry in os.scandir(self.root):
+            try:
+                if entry.is_file() and now - entry.stat().st_mtime > self.max_age_seconds:
+                    os.unlink(entry.path)
+                    removed += 1
+            except FileNotFoundError:
+                continue
+        return removed
+
+
+# spool del proceso (None si está desactivado)
+_spool: Spool | None = None
+
+
+# Devuelve el spool del proceso, o None si SPOOL_DIR no está configurado o si el
+# almacenamiento ya es local (el traspaso no evitaría ninguna copia)
+def get_spool() -> Spool | None:
+    global _spool
+    if not settings.SPOOL_DIR or settings.STORAGE_BACKEND.lower() == "local":
+        return None
+    if _spool is None:
+        _spool = Spool(settings.SPOOL_DIR, settings.SPOOL_MAX_AGE_SECONDS, settings.SPOOL_MAX_FILE_BYTES)
+    return _spool
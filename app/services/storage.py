@@ -1,19 +1,153 @@
-import boto3
-from botocore.exceptions import ClientError, BotoCoreError
+import io
+import mmap
+from abc import ABC, abstractmethod
+import os
+import shutil
+import tempfile
+import threading
+from botocore.exceptions import ClientError, BotoCoreError, HTTPClientError
+from botocore.exceptions import ConnectionError as BotoConnectionError
 from app.core.config import settings
+from app.core.metrics import STORAGE_OPERATION_SECONDS
 
 
 class MinioServiceError(Exception):
-    # Excepción personalizada para errores del servicio MinIO
+    # Excepción personalizada para errores del servicio MinIO (común a todos los backends de almacenamiento)
     pass
 
 
-class MinioService:
+class TransientStorageError(MinioServiceError):
+    # Error de MinIO que puede resolverse reintentando (503, throttling, conexión caída, timeouts)
+    pass
+
+
+# Códigos de error S3 que indican un fallo temporal del servidor
+TRANSIENT_ERROR_CODES = {
+    "InternalError",
+    "ServiceUnavailable",
+    "SlowDown",
+    "RequestTimeout",
+    "RequestTimeTooSkewed",
+    "Throttling",
+    "ThrottlingException",
+}
+
+
+# Clase de excepción a lanzar para un error de boto3: transitorio o permanente
+def _error_class(error: Exception) -> type[MinioServiceError]:
+    if isinstance(error, (BotoConnectionError, HTTPClientError)):
+        return TransientStorageError
+    if isinstance(error, ClientError):
+        code = error.response.get('Error', {}).get('Code', '')
+        status_code = error.response.get('ResponseMetadata', {}).get('HTTPStatusCode') or 0
+        if code in TRANSIENT_ERROR_CODES or status_code >= 500:
+            return TransientStorageError
+    return MinioServiceError
+
+
+class ReusableBuffer:
+    # Buffer de lectura preasignado que se reutiliza entre descargas.
+    # Crece hasta el objeto más grande visto (sin superar max_bytes) y evita
+    # asignar un `bytes` nuevo por cada imagen.
+
+    def __init__(self, max_bytes: int = 0):
+        self.max_bytes = max_bytes
+        self._buffer = bytearray()
+
+    # Devuelve una vista escribible de al menos `size` bytes
+    def view(self, size: int) -> memoryview:
+        if size > len(self._buffer):
+            if self.max_bytes and size > self.max_bytes:
+                # objeto demasiado grande para retenerlo: se usa un buffer de un solo uso
+                return memoryview(bytearray(size))
+            # no se redimensiona en sitio: puede haber vistas del buffer anterior aún vivas
+            self._buffer = bytearray(size)
+        return memoryview(self._buffer)[:size]
+
+
+class MemoryviewReader(io.RawIOBase):
+    # Stream de solo lectura sobre un buffer existente (bytes, memoryview o array de NumPy),
+    # para que boto3 lo suba por bloques sin copiar el objeto completo.
+
+    def __init__(self, data):
+        self._view = memoryview(data).cast("B")
+        self._position = 0
+
+    def __len__(self) -> int:
+        return len(self._view)
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = len(self._view) + offset
+        else:
+            raise ValueError(f"whence inválido: {whence}")
+        self._position = max(0, min(self._position, len(self._view)))
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        size = min(len(buffer), len(self._view) - self._position)
+        buffer[:size] = self._view[self._position:self._position + size]
+        self._position += size
+        return size
+
+
+class StorageService(ABC):
+    # Interfaz común de los backends de almacenamiento (MinIO/S3, disco local, memoria).
+    # La API y el worker solo usan estos métodos; el backend se elige con STORAGE_BACKEND.
+
+    # Guarda `file_content` (bytes u objeto con protocolo de buffer) como `file_name`
+    @abstractmethod
+    def upload_file(self, file_content, file_name: str) -> str:
+        ...
+
+    # Devuelve el contenido de `file_name` (bytes o una vista sin copia)
+    @abstractmethod
+    def get_file(self, file_name: str, buffer: ReusableBuffer | None = None) -> bytes | memoryview:
+        ...
+
+    # Copia `file_name` a un archivo binario abierto para escritura
+    @abstractmethod
+    def download_to_file(self, file_name: str, fileobj) -> None:
+        ...
+
+    # Guarda el contenido de un archivo binario abierto para lectura como `file_name`
+    @abstractmethod
+    def upload_from_file(self, fileobj, file_name: str) -> str:
+        ...
+
+    # Indica si `file_name` ya está almacenado (sin descargarlo)
+    @abstractmethod
+    def exists(self, file_name: str) -> bool:
+        ...
+
+    # Elimina `file_name`; no falla si no existe
+    @abstractmethod
+    def delete_file(self, file_name: str) -> None:
+        ...
+
+
+class MinioService(StorageService):
     # Servicio para interactuar con MinIO usando boto3
     
     # Constructor: Inicializa el cliente de boto3 (s3) y verifica que el bucket exista
     # Raises: MinioServiceError: Si hay un error al conectar o si el bucket no existe
     def __init__(self):
+        # boto3 se importa al crear el primer cliente: la API arranca sin cargarlo
+        import boto3
+
         try:
             # Inicializar cliente boto3 para MinIO
             self.client = boto3.client(
@@ -29,8 +163,11 @@ class MinioService:
             # Verificar que el bucket existe
             self._verify_bucket_exists()
             
+        except MinioServiceError:
+            # error ya clasificado al verificar el bucket
+            raise
         except (ClientError, BotoCoreError) as e:
-            raise MinioServiceError(
+            raise _error_class(e)(
                 f"Error al inicializar el cliente MinIO: {str(e)}"
             ) from e
         except Exception as e:
@@ -52,39 +189,49 @@ class MinioService:
                     "Asegúrate de que la infraestructura esté configurada correctamente."
                 ) from e
             else:
-                raise MinioServiceError(
+                raise _error_class(e)(
                     f"Error al verificar el bucket '{self.bucket_name}': {str(e)}"
                 ) from e
         except BotoCoreError as e:
-            raise MinioServiceError(
+            raise _error_class(e)(
                 f"Error de conexión al verificar el bucket: {str(e)}"
             ) from e
     
     # Sube un archivo al bucket de MinIO
     # Args:
-    #      file_content: Contenido del archivo en bytes
+    #      file_content: Contenido del archivo en bytes, o cualquier objeto con protocolo
+    #                    de buffer (memoryview, array de NumPy) que se sube sin copiarlo
     #      file_name: Nombre con el que se guardará el archivo
     # Returns:
     #       str: Nombre del archivo guardado en el bucket
     # Raises:
     #       MinioServiceError: Si hay un error al subir el archivo
-    def upload_file(self, file_content: bytes, file_name: str) -> str:
+    def upload_file(self, file_content, file_name: str) -> str:
         try:
-            self.client.put_object(
-                Bucket=self.bucket_name,
-                Key=file_name,
-                Body=file_content
-            )
+            if isinstance(file_content, (bytes, bytearray)):
+                body = file_content
+            else:
+                body = MemoryviewReader(file_content)
+            with STORAGE_OPERATION_SECONDS.labels("put").time():
+                self.client.put_object(
+                    Bucket=self.bucket_name,
+                    Key=file_name,
+                    Body=body,
+                    ContentLength=len(body)
+                )
             return file_name
             
         except ClientError as e:
-            raise MinioServiceError(
+            raise _error_class(e)(
                 f"Error al subir el archivo '{file_name}' a MinIO: {str(e)}"
             ) from e
         except BotoCoreError as e:
-            raise MinioServiceError(
+            raise _error_class(e)(
                 f"Error de conexión al subir el archivo '{file_name}': {str(e)}"
             ) from e
+        except MinioServiceError:
+            # ya clasificado (p. ej. TransientStorageError de una descarga incompleta): se conserva
+            raise
         except Exception as e:
             raise MinioServiceError(
                 f"Error inesperado al subir el archivo '{file_name}': {str(e)}"
@@ -93,18 +240,23 @@ class MinioService:
     # Descarga un archivo del bucket de MinIO
     # Args:
     #      file_name: Nombre del archivo a descargar
+    #      buffer: Buffer reutilizable opcional; si se indica, el objeto se lee dentro
+    #              de él y se devuelve una vista (válida hasta la siguiente descarga)
     # Returns:
-    #       bytes: Contenido del archivo
+    #       bytes | memoryview: Contenido del archivo
     # Raises:
     #       MinioServiceError: Si hay un error al descargar el archivo
-    def get_file(self, file_name: str) -> bytes:
+    def get_file(self, file_name: str, buffer: ReusableBuffer | None = None) -> bytes | memoryview:
         try:
-            response = self.client.get_object(
-                Bucket=self.bucket_name,
-                Key=file_name
-            )
-            # Los datos están en la clave 'Body', debemos leerlos
-            return response['Body'].read()
+            with STORAGE_OPERATION_SECONDS.labels("get").time():
+                response = self.client.get_object(
+                    Bucket=self.bucket_name,
+                    Key=file_name
+                )
+                # Los datos están en la clave 'Body', debemos leerlos
+                if buffer is None:
+                    return response['Body'].read()
+                return self._read_into(response['Body'], response['ContentLength'], buffer)
             
         except ClientError as e:
             error_code = e.response.get('Error', {}).get('Code', '')
@@ -113,14 +265,294 @@ class MinioService:
                     f"El archivo '{file_name}' no existe en el bucket"
                 ) from e
             else:
-                raise MinioServiceError(
+                raise _error_class(e)(
                     f"Error al descargar el archivo '{file_name}' de MinIO: {str(e)}"
                 ) from e
         except BotoCoreError as e:
-            raise MinioServiceError(
+            raise _error_class(e)(
                 f"Error de conexión al descargar el archivo '{file_name}': {str(e)}"
             ) from e
+        except MinioServiceError:
+            # ya clasificado (p. ej. TransientStorageError de una descarga incompleta): se conserva
+            raise
         except Exception as e:
             raise MinioServiceError(
                 f"Error inesperado al descargar el archivo '{file_name}': {str(e)}"
             ) from e
+
+    # Lee el cuerpo de la respuesta dentro del buffer reutilizable
+    @staticmethod
+    def _read_into(body, size: int, buffer: ReusableBuffer) -> memoryview:
+        view = buffer.view(size)
+        received = 0
+        while received < size:
+            count = body.readinto(view[received:])
+            if not count:
+                raise TransientStorageError(
+                    f"Descarga incompleta: {received} de {size} bytes"
+                )
+            received += count
+        return view
+
+    # Descarga un archivo del bucket directamente a un archivo local, por bloques
+    # (para videos y archivos grandes que no deben cargarse completos en memoria)
+    # Args:
+    #      file_name: Nombre del archivo a descargar
+    #      fileobj: Archivo binario abierto para escritura
+    # Raises:
+    #       MinioServiceError: Si hay un error al descargar el archivo
+    def download_to_file(self, file_name: str, fileobj) -> None:
+        try:
+            with STORAGE_OPERATION_SECONDS.labels("get").time():
+                self.client.download_fileobj(self.bucket_name, file_name, fileobj)
+        except ClientError as e:
+            raise _error_class(e)(
+                f"Error al descargar el archivo '{file_name}' de MinIO: {str(e)}"
+            ) from e
+        except BotoCoreError as e:
+            raise _error_class(e)(
+                f"Error de conexión al descargar el archivo '{file_name}': {str(e)}"
+            ) from e
+
+    # Sube un archivo local al bucket por bloques (multipart para archivos grandes)
+    # Args:
+    #      fileobj: Archivo binario abierto para lectura
+    #      file_name: Nombre con el que se guardará el archivo
+    # Returns:
+    #       str: Nombre del archivo guardado en el bucket
+    # Raises:
+    #       MinioServiceError: Si hay un error al subir el archivo
+    def upload_from_file(self, fileobj, file_name: str) -> str:
+        try:
+            with STORAGE_OPERATION_SECONDS.labels("put").time():
+                self.client.upload_fileobj(fileobj, self.bucket_name, file_name)
+            return file_name
+        except ClientError as e:
+            raise _error_class(e)(
+                f"Error al subir el archivo '{file_name}' a MinIO: {str(e)}"
+            ) from e
+        except BotoCoreError as e:
+            raise _error_class(e)(
+                f"Error de conexión al subir el archivo '{file_name}': {str(e)}"
+            ) from e
+
+
+    # Comprueba si un objeto existe en el bucket con una petición HEAD
+    # Raises: MinioServiceError: Si hay un error distinto de "no existe"
+    def exists(self, file_name: str) -> bool:
+        try:
+            with STORAGE_OPERATION_SECONDS.labels("head").time():
+                self.client.head_object(Bucket=self.bucket_name, Key=file_name)
+            return True
+        except ClientError as e:
+            error_code = e.response.get('Error', {}).get('Code', '')
+            if error_code in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise _error_class(e)(
+                f"Error al consultar el archivo '{file_name}' en MinIO: {str(e)}"
+            ) from e
+        except BotoCoreError as e:
+            raise _error_class(e)(
+                f"Error de conexión al consultar el archivo '{file_name}': {str(e)}"
+            ) from e
+
+    # Elimina un objeto del bucket (S3 no falla si el objeto no existe)
+    def delete_file(self, file_name: str) -> None:
+        try:
+            with STORAGE_OPERATION_SECONDS.labels("delete").time():
+                self.client.delete_object(Bucket=self.bucket_name, Key=file_name)
+        except ClientError as e:
+            raise _error_class(e)(
+                f"Error al eliminar el archivo '{file_name}' de MinIO: {str(e)}"
+            ) from e
+        except BotoCoreError as e:
+            raise _error_class(e)(
+                f"Error de conexión al eliminar el archivo '{file_name}': {str(e)}"
+            ) from e
+
+
+# tamaño de bloque para copias entre archivos (sendfile o copia en espacio de usuario)
+COPY_CHUNK_BYTES = 8 * 1024 * 1024
+
+
+# Copia el resto de `source` en `target`. Si ambos son archivos reales usa os.sendfile
+# (la copia se hace en el kernel, sin pasar por memoria de Python).
+def _copy_stream(source, target) -> None:
+    try:
+        source_fd, target_fd = source.fileno(), target.fileno()
+    except (AttributeError, OSError, io.UnsupportedOperation):
+        shutil.copyfileobj(source, target, COPY_CHUNK_BYTES)
+        return
+
+    target.flush()
+    offset = source.tell()
+    try:
+        while True:
+            sent = os.sendfile(target_fd, source_fd, offset, COPY_CHUNK_BYTES)
+            if sent == 0:
+                break
+            offset += sent
+    except OSError:
+        # sistemas sin sendfile entre archivos: copia por bloques desde donde quedó
+        source.seek(offset)
+        shutil.copyfileobj(source, target, COPY_CHUNK_BYTES)
+        return
+    source.seek(offset)
+
+
+class LocalStorageService(StorageService):
+    # Almacenamiento en un directorio local (o volumen compartido entre API y worker).
+    # Evita el salto HTTP al object store en despliegues de un solo nodo:
+    #   - get_file mapea el archivo en memoria (mmap) y devuelve una vista sin copia
+    #   - download_to_file / upload_from_file copian con os.sendfile
+    #   - la API sirve los resultados con FileResponse directamente desde disco
+    # Las escrituras van a un archivo temporal que se renombra, para no exponer archivos a medias.
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        try:
+            os.makedirs(self.root, exist_ok=True)
+        except OSError as e:
+            raise MinioServiceError(
+                f"No se pudo crear el directorio de almacenamiento '{self.root}': {str(e)}"
+            ) from e
+
+    # Ruta absoluta de un archivo; rechaza nombres que salgan del directorio raíz
+    def path(self, file_name: str) -> str:
+        if not file_name or os.path.basename(file_name) != file_name or file_name in (".", ".."):
+            raise MinioServiceError(f"Nombre de archivo inválido: '{file_name}'")
+        return os.path.join(self.root, file_name)
+
+    # Abre un archivo temporal en el directorio raíz y lo publica con os.replace al terminar
+    def _write(self, file_name: str, write) -> str:
+        target = self.path(file_name)
+        fd, temp_path = tempfile.mkstemp(dir=self.root, prefix=".upload-")
+        try:
+            with STORAGE_OPERATION_SECONDS.labels("put").time():
+                with os.fdopen(fd, "wb") as f:
+                    write(f)
+                os.replace(temp_path, target)
+        except OSError as e:
+            os.unlink(temp_path)
+            raise MinioServiceError(
+                f"Error al guardar el archivo '{file_name}': {str(e)}"
+            ) from e
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return file_name
+
+    def upload_file(self, file_content, file_name: str) -> str:
+        view = memoryview(file_content).cast("B")
+        return self._write(file_name, lambda f: f.write(view))
+
+    def upload_from_file(self, fileobj, file_name: str) -> str:
+        return self._write(file_name, lambda f: _copy_stream(fileobj, f))
+
+    # El buffer reutilizable no se usa: el mmap ya evita copiar el archivo
+    def get_file(self, file_name: str, buffer: ReusableBuffer | None = None) -> bytes | memoryview:
+        path = self.path(file_name)
+        try:
+            with STORAGE_OPERATION_SECONDS.labels("get").time():
+                with open(path, "rb") as f:
+                    if os.fstat(f.fileno()).st_size == 0:
+                        return b""
+                    # el mapeo sigue vivo tras cerrar el archivo, mientras exista la vista
+                    return memoryview(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+        except FileNotFoundError as e:
+            raise MinioServiceError(
+                f"El archivo '{file_name}' no existe en el almacenamiento local"
+            ) from e
+        except OSError as e:
+            raise MinioServiceError(
+                f"Error al leer el archivo '{file_name}': {str(e)}"
+            ) from e
+
+    def download_to_file(self, file_name: str, fileobj) -> None:
+        path = self.path(file_name)
+        try:
+            with STORAGE_OPERATION_SECONDS.labels("get").time():
+                with open(path, "rb") as f:
+                    _copy_stream(f, fileobj)
+        except FileNotFoundError as e:
+            raise MinioServiceError(
+                f"El archivo '{file_name}' no existe en el almacenamiento local"
+            ) from e
+        except OSError as e:
+            raise MinioServiceError(
+                f"Error al copiar el archivo '{file_name}': {str(e)}"
+            ) from e
+
+    def exists(self, file_name: str) -> bool:
+        return os.path.isfile(self.path(file_name))
+
+    def delete_file(self, file_name: str) -> None:
+        try:
+            os.unlink(self.path(file_name))
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            raise MinioServiceError(
+                f"Error al eliminar el archivo '{file_name}': {str(e)}"
+            ) from e
+
+
+class MemoryStorageService(StorageService):
+    # Almacenamiento en memoria del proceso, para tests y benchmarks sin MinIO.
+    # Solo es útil cuando la API y el worker corren en el mismo proceso.
+
+    def __init__(self):
+        self._objects: dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def upload_file(self, file_content, file_name: str) -> str:
+        data = bytes(memoryview(file_content).cast("B"))
+        with self._lock:
+            self._objects[file_name] = data
+        return file_name
+
+    def upload_from_file(self, fileobj, file_name: str) -> str:
+        return self.upload_file(fileobj.read(), file_name)
+
+    def get_file(self, file_name: str, buffer: ReusableBuffer | None = None) -> bytes | memoryview:
+        with self._lock:
+            data = self._objects.get(file_name)
+        if data is None:
+            raise MinioServiceError(f"El archivo '{file_name}' no existe en el almacenamiento en memoria")
+        return data
+
+    def download_to_file(self, file_name: str, fileobj) -> None:
+        fileobj.write(self.get_file(file_name))
+
+    def exists(self, file_name: str) -> bool:
+        with self._lock:
+            return file_name in self._objects
+
+    def delete_file(self, file_name: str) -> None:
+        with self._lock:
+            self._objects.pop(file_name, None)
+
+
+# Crea el backend configurado en STORAGE_BACKEND ("minio", "local" o "memory")
+# Raises: MinioServiceError: Si el backend no existe o no se puede inicializar
+def create_storage() -> StorageService:
+    backend = settings.STORAGE_BACKEND.lower()
+    if backend in ("minio", "s3"):
+        return MinioService()
+    if backend == "local":
+        return LocalStorageService(settings.STORAGE_LOCAL_PATH)
+    if backend == "memory":
+        return MemoryStorageService()
+    raise MinioServiceError(f"Backend de almacenamiento desconocido: '{settings.STORAGE_BACKEND}'")
+
+
+# backend del proceso: se crea una vez y se reutiliza (los clientes boto3 son thread-safe)
+_storage: StorageService | None = None
+
+
+# Devuelve el backend de almacenamiento del proceso, creándolo si aún no existe
+def get_storage() -> StorageService:
+    global _storage
+    if _storage is None:
+        _storage = create_storage()
+    return _storage
@@ -0,0 +1,123 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from app.core.config import settings
+from app.services.analysis_params import AnalysisParams
+
+# Modo síncrono de /analyze para imágenes pequeñas: el mismo pipeline de OpenCV que usa
+# el worker (`_detect_edges`) se ejecuta en un pool acotado de procesos dentro de la API
+# y el PNG se devuelve en la respuesta, sin MinIO, base de datos ni cola.
+# Los procesos del pool se crean con "spawn" (el proceso de la API tiene hilos y un event
+# loop que no deben heredarse con fork) y son los únicos que cargan OpenCV: el proceso
+# principal de la API sigue sin importarlo.
+
+
+class SyncPipelineUnavailable(Exception):
+    # El pool no puede aceptar la imagen ahora (lleno o caído): se procesa por la cola
+    pass
+
+
+class SyncPipelineTimeout(Exception):
+    # La imagen no se procesó dentro de SYNC_TIMEOUT_SECONDS
+    pass
+
+
+# Inicializa cada proceso del pool: un hilo de OpenCV por proceso (el paralelismo lo da
+# el pool) y calentamiento para que la primera petición no pague la carga de códecs
+def _init_process() -> None:
+    import cv2
+    from app.worker import _warm_up_opencv
+
+    cv2.setNumThreads(1)
+    _warm_up_opencv(settings.WORKER_WARMUP_IMAGE_SIZE)
+
+
+# Se ejecuta en el proceso del pool
+# Returns: tuple[bytes, dict]: PNG de bordes y tiempos por etapa
+def _run_pipeline(image_data: bytes, params: AnalysisParams | None = None) -> tuple[bytes, dict]:
+    from app.worker import StageTimer, _detect_edges
+
+    timer = StageTimer()
+    buffer = _detect_edges(image_data, timer, params=params)
+    return buffer.tobytes(), timer.timings
+
+
+class SyncPipeline:
+    # Pool de procesos con un límite de imágenes en curso o en espera
+    # (SYNC_MAX_PENDING); por encima de él la petición vuelve al camino asíncrono.
+
+    def __init__(self, workers: int, max_pending: int, timeout: float):
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = asyncio.Semaphore(max_pending)
+        self._executor: ProcessPoolExecutor | None = None
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process,
+            )
+        return self._executor
+
+    # Procesa una imagen y devuelve (PNG, tiempos)
+    # Raises:
+    #       SyncPipelineUnavailable: Si el pool está lleno o se cayó
+    #       SyncPipelineTimeout: Si se supera SYNC_TIMEOUT_SECONDS
+    #       ValueError: Si la imagen no se puede decodificar o la región de interés queda fuera
+    async def process(self, image_data: bytes, params: AnalysisParams | None = None) -> tuple[bytes, dict]:
+        if self._slots.locked():
+            raise SyncPipelineUnavailable("El pool síncrono está lleno")
+        await self._slots.acquire()
+        loop = asyncio.get_running_loop()
+        try:
+            future = loop.run_in_executor(self.executor, _run_pipeline, image_data, params)
+        except BaseException:
+            self._slots.release()
+            raise
+        # El hueco se libera cuando el proceso termina, no cuando la petición deja de esperar:
+        # tras un timeout la imagen sigue ocupando el pool y debe seguir contando en SYNC_MAX_PENDING
+        future.add_done_callback(self._release)
+        try:
+            # shield: el timeout abandona la espera sin cancelar (ni liberar) el trabajo en curso
+            return await asyncio.wait_for(asyncio.shield(future), self.timeout)
+        except asyncio.TimeoutError as e:
+            raise SyncPipelineTimeout(
+                f"La imagen no se procesó en {self.timeout} segundos"
+            ) from e
+        except BrokenProcessPool as e:
+            # un proceso murió (p. ej. por memoria): se recrea el pool en la siguiente petición
+            self.shutdown()
+            raise SyncPipelineUnavailable("El pool síncrono se detuvo") from e
+
+    # Libera el hueco de una imagen terminada; el resultado de una imagen abandonada se descarta
+    def _release(self, future: asyncio.Future) -> None:
+        self._slots.release()
+        if not future.cancelled():
+            future.exception()
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# pool del proceso de la API (se crea en la primera petición síncrona)
+_pipeline: SyncPipeline | None = None
+
+
+def get_sync_pipeline() -> SyncPipeline:
+    global _pipeline
+    if _pipeline is None:
+        _pipeline = SyncPipeline(
+            settings.SYNC_POOL_SIZE, settings.SYNC_MAX_PENDING, settings.SYNC_TIMEOUT_SECONDS
+        )
+    return _pipeline
+
+
+def shutdown_sync_pipeline() -> None:
+    if _pipeline is not None:
+        _pipeline.shutdown()
@@ -1,7 +1,18 @@
+import os
+from pathlib import Path
 import pytest
+from dotenv import dotenv_values
 from httpx import AsyncClient, ASGITransport
+
+# Los tests no dependen de un .env local: las variables obligatorias salen de .env.example
+# (sin pisar las que ya estén definidas en el entorno)
+for key, value in dotenv_values(Path(__file__).resolve().parents[2] / ".env.example").items():
+    if value is not None:
+        os.environ.setdefault(key, value)
+
 from app.main import app
 from app.core.config import settings
+from app.services import spool, storage
 
 @pytest.fixture
 async def client():
@@ -17,3 +28,13 @@ async def client():
 def test_settings():
     # fixture de configuración
     return settings
+
+
+@pytest.fixture(autouse=True)
+def reset_storage():
+    # el almacenamiento y el spool se cachean por proceso: cada test parte sin ellos
+    storage._storage = None
+    spool._spool = None
+    yield
+    storage._storage = None
+    spool._spool = None
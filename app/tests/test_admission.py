@@ -0,0 +1,120 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import Mock, AsyncMock
+from io import BytesIO
+from app.main import app
+from app.services.admission import AdmissionController, AdmissionRejected
+
+
+def make_db(in_flight: int):
+    # Sesión mock que responde al conteo de tareas en curso
+    mock_db = AsyncMock()
+    mock_result = Mock()
+    mock_result.scalar_one.return_value = in_flight
+    mock_db.execute.return_value = mock_result
+    return mock_db
+
+
+def make_redis(depth: int):
+    # Cliente Redis mock que responde a LLEN
+    mock_redis = AsyncMock()
+    mock_redis.llen.return_value = depth
+    return mock_redis
+
+
+class TestAdmissionController:
+    # Tests para AdmissionController
+
+    @pytest.mark.asyncio
+    async def test_admits_under_limits(self):
+        # Test: Se admite la tarea si la cola y las tareas en curso están bajo el límite
+        controller = AdmissionController(
+            redis_client=make_redis(5), max_queue_depth=10, max_in_flight=10, cache_seconds=0
+        )
+
+        await controller.check(make_db(3))
+
+    @pytest.mark.asyncio
+    async def test_rejects_deep_queue_with_503(self):
+        # Test: Cola llena -> 503 con Retry-After
+        controller = AdmissionController(
+            redis_client=make_redis(10), max_queue_depth=10, max_in_flight=0,
+            retry_after=7, cache_seconds=0
+        )
+
+        with pytest.raises(AdmissionRejected) as exc_info:
+            await controller.check(make_db(0))
+
+        assert exc_info.value.status_code == 503
+        assert exc_info.value.retry_after == 7
+
+    @pytest.mark.asyncio
+    async def test_rejects_too_many_in_flight_with_429(self):
+        # Test: Demasiadas tareas en curso -> 429
+        controller = AdmissionController(
+            redis_client=make_redis(0), max_queue_depth=10, max_in_flight=3, cache_seconds=0
+        )
+
+        with pytest.raises(AdmissionRejected) as exc_info:
+            await controller.check(make_db(3))
+
+        assert exc_info.value.status_code == 429
+
+    @pytest.mark.asyncio
+    async def test_fails_open_when_redis_is_down(self):
+        # Test: Si Redis no responde, no se bloquea la API
+        mock_redis = AsyncMock()
+        mock_redis.llen.side_effect = ConnectionError("Redis caído")
+        controller = AdmissionController(
+            redis_client=mock_redis, max_queue_depth=10, max_in_flight=10, cache_seconds=0
+        )
+
+        await controller.check(make_db(0))
+
+    @pytest.mark.asyncio
+    async def test_measurement_is_cached(self):
+        # Test: La medición se reutiliza dentro de la ventana de caché
+        mock_redis = make_redis(1)
+        controller = AdmissionController(
+            redis_client=mock_redis, max_queue_depth=10, max_in_flight=10, cache_seconds=60
+        )
+        mock_db = make_db(1)
+
+        await controller.check(mock_db)
+        await controller.check(mock_db)
+
+        assert mock_redis.llen.await_count == 1
+        assert mock_db.execute.await_count == 1
+
+
+class TestAnalyzeAdmission:
+    # Tests del control de admisión en POST /analyze
+
+    @pytest.mark.asyncio
+    async def test_analyze_rejected_before_upload(self):
+        # Test: Con la cola saturada no se sube nada a MinIO
+        from app.routers.vision import get_async_db, get_minio_service, get_admission_controller
+
+        mock_minio = Mock()
+
+        async def override_get_db():
+            yield make_db(0)
+
+        app.dependency_overrides[get_async_db] = override_get_db
+        app.dependency_overrides[get_minio_service] = lambda: mock_minio
+        app.dependency_overrides[get_admission_controller] = lambda: AdmissionController(
+            redis_client=make_redis(50), max_queue_depth=50, max_in_flight=0,
+            retry_after=12, cache_seconds=0
+        )
+
+        try:
+            # cabecera GIF de 1x1: pasa la validación y llega al control de admisión
+            files = {"file": ("test.gif", BytesIO(b"GIF89a\x01\x00\x01\x00"), "image/gif")}
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                response = await client.post("/api/v1/vision/analyze", files=files)
+
+            assert response.status_code == 503
+            assert response.headers["retry-after"] == "12"
+            mock_minio.upload_file.assert_not_called()
+        finally:
+            app.dependency_overrides.clear()
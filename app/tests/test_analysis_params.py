@@ -0,0 +1,101 @@
+import pytest
+import numpy as np
+import cv2
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import AsyncMock, Mock, patch
+from uuid import uuid4
+from datetime import datetime, timezone
+from io import BytesIO
+from app.main import app
+from app.services.analysis_params import AnalysisParams, build_params
+from app.services.storage import MemoryStorageService
+from app.worker import StageTimer, _detect_edges, _processed_filename
+
+
+def jpeg_bytes(width: int = 640, height: int = 480) -> bytes:
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    cv2.rectangle(image, (width // 4, height // 4), (width // 2, height // 2), (255, 255, 255), -1)
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+class TestAnalysisParams:
+    # Tests para la región de interés, el tamaño máximo y los umbrales de Canny
+
+    def test_build_params_validation(self):
+        # Test: Los parámetros por defecto no se guardan y los incompletos o inválidos se rechazan
+        assert build_params().is_default
+        assert build_params().to_json() is None
+
+        params = build_params(10, 20, 100, 50, max_width=64, canny_low=50)
+        assert AnalysisParams.from_json(params.to_json()) == params
+
+        with pytest.raises(ValueError):
+            build_params(roi_x=10, roi_y=20)
+        with pytest.raises(ValueError):
+            build_params(canny_low=300, canny_high=200)
+
+    def test_region_and_downscale_before_canny(self):
+        # Test: La imagen se decodifica reducida, se recorta y se reduce antes de Canny
+        timer = StageTimer()
+        stats = {}
+        params = AnalysisParams(roi=(0, 0, 400, 300), max_width=100)
+
+        buffer = _detect_edges(jpeg_bytes(), timer, stats, params)
+
+        output = cv2.imdecode(buffer, cv2.IMREAD_GRAYSCALE)
+        assert output.shape == (75, 100)
+        assert (stats["width"], stats["height"]) == (100, 75)
+        assert timer.timings["decode_reduction"] == 4
+        assert (timer.timings["input_width"], timer.timings["input_height"]) == (640, 480)
+        assert (timer.timings["decoded_width"], timer.timings["decoded_height"]) == (160, 120)
+
+    def test_output_name_depends_on_params(self):
+        # Test: El mismo contenido con otros parámetros no comparte el archivo procesado
+        params = AnalysisParams(max_width=100)
+
+        assert _processed_filename("abc.jpg", "png") == "processed_abc.png"
+        assert _processed_filename("abc.jpg", "png", AnalysisParams()) == "processed_abc.png"
+        assert _processed_filename("abc.jpg", "png", params) == f"processed_abc_{params.key()}.png"
+
+    @pytest.mark.asyncio
+    async def test_analyze_stores_params(self):
+        # Test: /analyze guarda los parámetros en la tarea y rechaza un ROI fuera de la imagen
+        from app.routers.vision import get_async_db, get_minio_service, get_admission_controller
+
+        async def refresh(task):
+            task.created_at = datetime.now(timezone.utc)
+
+        added = []
+
+        async def override_get_db():
+            mock_db = AsyncMock()
+            mock_db.add = Mock(side_effect=added.append)
+            mock_db.refresh.side_effect = refresh
+            yield mock_db
+
+        app.dependency_overrides[get_async_db] = override_get_db
+        app.dependency_overrides[get_minio_service] = MemoryStorageService
+        app.dependency_overrides[get_admission_controller] = lambda: AsyncMock()
+        content = jpeg_bytes()
+
+        try:
+            with patch('app.routers.vision.add_to_outbox'):
+                async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                    accepted = await client.post(
+                        "/api/v1/vision/analyze",
+                        data={"roi_x": "0", "roi_y": "0", "roi_width": "320", "roi_height": "240",
+                              "max_width": "64", "canny_low": "50"},
+                        files={"file": ("test.jpg", BytesIO(content), "image/jpeg")}
+                    )
+                    outside = await client.post(
+                        "/api/v1/vision/analyze",
+                        data={"roi_x": "600", "roi_y": "0", "roi_width": "100", "roi_height": "100"},
+                        files={"file": ("test.jpg", BytesIO(content), "image/jpeg")}
+                    )
+        finally:
+            app.dependency_overrides.clear()
+
+        assert accepted.status_code == 202
+        assert accepted.json()["params"] == {"roi": [0, 0, 320, 240], "max_width": 64, "canny_low": 50}
+        assert added[0].params == accepted.json()["params"]
+        assert outside.status_code == 400
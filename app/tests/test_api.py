@@ -1,3 +1,5 @@
+import subprocess
+import sys
 import pytest
 from httpx import AsyncClient
 
@@ -8,3 +10,13 @@ async def test_health_check(client: AsyncClient):
     response = await client.get("/health")
     assert response.status_code == 200
     assert "status" in response.json()
+
+
+def test_api_does_not_import_worker_dependencies():
+    # Prueba que la API arranca sin cargar el worker ni OpenCV/NumPy/boto3 (proceso nuevo)
+    code = (
+        "import sys, app.main; "
+        "print([m for m in ('cv2', 'numpy', 'boto3', 'app.worker') if m in sys.modules])"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert output.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,190 @@
+import json
+import threading
+import pytest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import Mock, patch
+from uuid import uuid4
+from datetime import datetime, timezone
+from io import BytesIO
+from app.main import app
+from app.core.config import settings
+from app.models import Task, TaskStatus
+from app.services.callbacks import (
+    CallbackDeliveryError,
+    enqueue_callback,
+    post_batch,
+    queue_key,
+    scheduled_key,
+    validate_callback_url,
+)
+from app.worker import deliver_callbacks
+
+
+def resolves_to(address: str):
+    # Sustituye la resolución DNS para que cualquier host resuelva a `address`
+    return patch("app.services.callbacks.socket.getaddrinfo", return_value=[(None, None, None, "", (address, 80))])
+
+
+@pytest.fixture
+def stub_endpoint(monkeypatch):
+    # Servidor HTTP local que registra los cuerpos recibidos y responde `status`
+    # (en 127.0.0.1: se permiten destinos en redes privadas)
+    monkeypatch.setattr(settings, "CALLBACK_ALLOW_PRIVATE_NETWORKS", True)
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers["Content-Length"]))
+            server.received.append(json.loads(body))
+            self.send_response(server.status)
+            self.end_headers()
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.received = []
+    server.status = 200
+    server.url = f"http://127.0.0.1:{server.server_port}/hooks/vision"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def finished_task(url: str) -> Task:
+    return Task(
+        id=uuid4(),
+        status=TaskStatus.COMPLETED,
+        result={"processed_file": "processed_abc.png"},
+        finished_at=datetime(2026, 1, 1, tzinfo=timezone.utc),
+        callback_url=url,
+    )
+
+
+class TestCallbackQueue:
+    # Tests para el encolado de callbacks
+
+    def test_one_delivery_scheduled_per_endpoint(self):
+        # Test: Varios eventos del mismo endpoint se acumulan y programan una sola entrega
+        url = "http://integration.local/hook"
+        redis_client = Mock()
+        redis_client.set.side_effect = [True, False]
+
+        with patch("app.services.callbacks.celery_app") as mock_celery_app:
+            assert enqueue_callback(finished_task(url), redis_client)
+            assert enqueue_callback(finished_task(url), redis_client)
+
+        pipe = redis_client.pipeline.return_value
+        assert pipe.rpush.call_count == 2
+        assert pipe.rpush.call_args.args[0] == queue_key(url)
+        mock_celery_app.send_task.assert_called_once_with("deliver_callbacks", args=[url], countdown=1.0)
+
+    def test_task_without_callback_is_ignored(self):
+        # Test: Sin callback_url no se toca Redis
+        redis_client = Mock()
+
+        assert not enqueue_callback(finished_task(None), redis_client)
+        redis_client.pipeline.assert_not_called()
+
+
+class TestDeliverCallbacks:
+    # Tests de la entrega contra un endpoint HTTP local
+
+    def test_batch_delivered_in_one_post(self, stub_endpoint):
+        # Test: Los eventos pendientes salen en un solo POST y se libera la programación
+        events = [{"task_id": "a", "status": "COMPLETED"}, {"task_id": "b", "status": "FAILED"}]
+        redis_client = Mock()
+        redis_client.lpop.return_value = [json.dumps(event) for event in events]
+        redis_client.llen.return_value = 0
+
+        with patch("app.worker.get_sync_redis", return_value=redis_client):
+            assert deliver_callbacks(stub_endpoint.url) == 2
+
+        assert stub_endpoint.received == [{"events": events}]
+        redis_client.delete.assert_called_once_with(scheduled_key(stub_endpoint.url))
+
+    def test_server_error_retries_same_batch(self, stub_endpoint):
+        # Test: Un 503 reintenta el mismo lote (que ya no está en Redis)
+        stub_endpoint.status = 503
+        events = [{"task_id": "a", "status": "COMPLETED"}]
+
+        with patch("app.worker.get_sync_redis", return_value=Mock()), \
+                patch.object(deliver_callbacks, "retry", side_effect=RuntimeError("retry")) as mock_retry:
+            with pytest.raises(RuntimeError):
+                deliver_callbacks(stub_endpoint.url, events)
+
+        assert mock_retry.call_args.kwargs["args"] == [stub_endpoint.url, events]
+
+    def test_client_error_is_not_retryable(self, stub_endpoint):
+        # Test: Un 4xx distinto de 429 no se reintenta
+        stub_endpoint.status = 404
+
+        with pytest.raises(CallbackDeliveryError) as exc_info:
+            post_batch(stub_endpoint.url, [{"task_id": "a"}])
+
+        assert not exc_info.value.retryable
+
+    def test_private_destination_is_not_delivered(self, stub_endpoint, monkeypatch):
+        # Test: Un destino que resuelve a una red interna se descarta antes de enviar y sin reintento
+        monkeypatch.setattr(settings, "CALLBACK_ALLOW_PRIVATE_NETWORKS", False)
+
+        with pytest.raises(CallbackDeliveryError) as exc_info:
+            post_batch(stub_endpoint.url, [{"task_id": "a"}])
+
+        assert not exc_info.value.retryable
+        assert stub_endpoint.received == []
+
+
+class TestCallbackDestinations:
+    # Tests de la validación de destinos de callback (SSRF)
+
+    @pytest.mark.parametrize("url,address", [
+        ("http://localhost/hook", "127.0.0.1"),
+        ("http://169.254.169.254/latest/meta-data/", "169.254.169.254"),
+        ("http://minio:9000/hook", "172.18.0.3"),
+        ("http://[::1]/hook", "::1"),
+        ("http://mapped.example.com/hook", "::ffff:10.0.0.1"),
+    ])
+    def test_internal_destinations_rejected(self, url, address):
+        # Test: Loopback, link-local, hosts internos y direcciones mapeadas se rechazan
+        with resolves_to(address), pytest.raises(ValueError):
+            validate_callback_url(url)
+
+    def test_public_destination_and_allow_list(self, monkeypatch):
+        # Test: Un host público se acepta; con lista de hosts solo se aceptan esos, aunque sean internos
+        with resolves_to("93.184.216.34"):
+            assert validate_callback_url("https://hooks.example.com/vision")
+
+        monkeypatch.setattr(settings, "CALLBACK_ALLOWED_HOSTS", "receiver.internal, Hooks.Example.com")
+        with resolves_to("10.0.0.5"):
+            assert validate_callback_url("http://receiver.internal:8080/hook")
+            assert validate_callback_url("https://hooks.example.com/vision")
+            with pytest.raises(ValueError):
+                validate_callback_url("https://other.example.com/vision")
+
+    @pytest.mark.asyncio
+    async def test_analyze_rejects_invalid_callback_url(self):
+        # Test: Una callback_url que no es http(s) se rechaza antes de almacenar nada
+        from app.routers.vision import get_async_db, get_minio_service
+
+        async def override_get_db():
+            yield Mock()
+
+        storage = Mock()
+        app.dependency_overrides[get_async_db] = override_get_db
+        app.dependency_overrides[get_minio_service] = lambda: storage
+
+        try:
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                response = await client.post(
+                    "/api/v1/vision/analyze",
+                    files={"file": ("test.gif", BytesIO(b"GIF89a\x01\x00\x01\x00"), "image/gif")},
+                    data={"callback_url": "file:///etc/passwd"},
+                )
+
+            assert response.status_code == 400
+            assert "callback" in response.json()["detail"].lower()
+            storage.upload_file.assert_not_called()
+        finally:
+            app.dependency_overrides.clear()
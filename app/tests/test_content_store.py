@@ -0,0 +1,287 @@
+import asyncio
+import hashlib
+import threading
+import pytest
+import numpy as np
+import cv2
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import Mock, AsyncMock, patch
+from uuid import uuid4
+from datetime import datetime, timezone
+from io import BytesIO
+from app.main import app
+from app.models import Task, TaskStatus
+from app.services.content_store import content_key, hash_file, release_content
+from app.services.storage import MemoryStorageService
+
+
+def png_bytes() -> bytes:
+    return cv2.imencode(".png", np.zeros((16, 16, 3), dtype=np.uint8))[1].tobytes()
+
+
+def db_with_references(count: int) -> AsyncMock:
+    # Sesión mock cuya consulta de referencias devuelve `count`
+    mock_db = AsyncMock()
+    mock_result = Mock()
+    mock_result.scalar_one.return_value = count
+    mock_db.execute.return_value = mock_result
+    return mock_db
+
+
+class FakeDatabase:
+    # Tareas confirmadas y bloqueos por contenido compartidos por varias sesiones falsas
+
+    def __init__(self, tasks: list):
+        self.tasks = tasks
+        self.locks: dict = {}
+        # el recuento de referencias del borrado espera a `resume` tras calcularse
+        self.counted = asyncio.Event()
+        self.resume = asyncio.Event()
+
+
+class FakeSession:
+    # Sesión con la semántica de PostgreSQL que importa aquí: pg_advisory_xact_lock bloquea
+    # hasta el commit/rollback y los cambios solo se ven al confirmarlos
+
+    def __init__(self, database: FakeDatabase):
+        self.database = database
+        self.bind = Mock()
+        self.bind.dialect.name = "postgresql"
+        self.held = []
+        self.added = []
+        self.deleted = []
+
+    async def execute(self, statement):
+        sql = str(statement)
+        result = Mock()
+        if "pg_advisory_xact_lock" in sql:
+            lock = self.database.locks.setdefault(statement.compile().params["hashtext_1"], asyncio.Lock())
+            await lock.acquire()
+            self.held.append(lock)
+        elif "count(" in sql:
+            result.scalar_one.return_value = len(self.database.tasks)
+            self.database.counted.set()
+            await self.database.resume.wait()
+        else:
+            result.scalar_one_or_none.return_value = self.database.tasks[0]
+        return result
+
+    def add(self, task):
+        self.added.append(task)
+
+    async def delete(self, task):
+        self.deleted.append(task)
+
+    async def refresh(self, task):
+        task.created_at = datetime.now(timezone.utc)
+
+    async def commit(self):
+        self.database.tasks = [t for t in self.database.tasks if t not in self.deleted] + self.added
+        self.added, self.deleted = [], []
+        await self.rollback()
+
+    async def rollback(self):
+        for lock in self.held:
+            lock.release()
+        self.held = []
+
+
+class TestContentStore:
+    # Tests para el almacenamiento direccionado por contenido
+
+    def test_hash_file_rewinds(self):
+        # Test: El hash de un archivo coincide con el de sus bytes y lo deja al principio
+        fileobj = BytesIO(b"video data" * 1000)
+
+        assert hash_file(fileobj) == hashlib.sha256(b"video data" * 1000).hexdigest()
+        assert fileobj.tell() == 0
+
+    @pytest.mark.asyncio
+    async def test_release_keeps_shared_content(self):
+        # Test: Los archivos solo se eliminan cuando no quedan tareas que los referencien
+        storage = MemoryStorageService()
+        storage.upload_file(b"input", "abc.png")
+        storage.upload_file(b"output", "processed_abc.png")
+        task = Task(filename="abc.png", content_hash="abc", result={"processed_file": "processed_abc.png"})
+
+        assert await release_content(db_with_references(1), storage, task) == []
+        assert storage.exists("abc.png")
+
+        assert await release_content(db_with_references(0), storage, task) == ["abc.png", "processed_abc.png"]
+        assert not storage.exists("abc.png")
+        assert not storage.exists("processed_abc.png")
+
+    @pytest.mark.asyncio
+    async def test_release_unshared_output(self):
+        # Test: Un resultado con parámetros propios se elimina aunque la entrada siga en uso
+        storage = MemoryStorageService()
+        storage.upload_file(b"input", "abc.png")
+        storage.upload_file(b"output", "processed_abc_1f2e3d4c5b6a.png")
+        task = Task(filename="abc.png", content_hash="abc", result={"processed_file": "processed_abc_1f2e3d4c5b6a.png"})
+        db = db_with_references(1)
+        db.execute.return_value.scalar_one.side_effect = [1, 0]
+
+        assert await release_content(db, storage, task) == ["processed_abc_1f2e3d4c5b6a.png"]
+        assert storage.exists("abc.png")
+        assert not storage.exists("processed_abc_1f2e3d4c5b6a.png")
+
+
+class TestDeduplicatedUploads:
+    # Tests de la deduplicación en POST /analyze y DELETE /tasks/{task_id}
+
+    @pytest.mark.asyncio
+    async def test_duplicate_upload_skips_put(self):
+        # Test: Subir dos veces el mismo contenido lo almacena una sola vez con su hash como nombre
+        from app.routers.vision import get_async_db, get_minio_service, get_admission_controller
+
+        async def refresh(task):
+            task.id = uuid4()
+            task.created_at = datetime.now(timezone.utc)
+
+        added = []
+
+        async def override_get_db():
+            mock_db = AsyncMock()
+            mock_db.add = Mock(side_effect=added.append)
+            mock_db.refresh.side_effect = refresh
+            yield mock_db
+
+        storage = MemoryStorageService()
+        storage.upload_file = Mock(wraps=storage.upload_file)
+        app.dependency_overrides[get_async_db] = override_get_db
+        app.dependency_overrides[get_minio_service] = lambda: storage
+        app.dependency_overrides[get_admission_controller] = lambda: AsyncMock()
+        content = png_bytes()
+
+        try:
+            with patch('app.routers.vision.add_to_outbox'):
+                async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                    for _ in range(2):
+                        response = await client.post(
+                            "/api/v1/vision/analyze",
+                            files={"file": ("test.png", BytesIO(content), "image/png")}
+                        )
+                        assert response.status_code == 202
+
+            digest = hashlib.sha256(content).hexdigest()
+            storage.upload_file.assert_called_once_with(content, content_key(digest, "png"))
+            assert [task.content_hash for task in added] == [digest, digest]
+            assert added[0].filename == added[1].filename
+        finally:
+            app.dependency_overrides.clear()
+
+    @pytest.mark.asyncio
+    @pytest.mark.parametrize("filename,mime,extension,upload_method", [
+        ("clip.mp4", "video/mp4", "mp4", "upload_from_file"),
+        ("test.png", "image/png", "png", "upload_file"),
+    ])
+    async def test_upload_off_event_loop(self, filename, mime, extension, upload_method):
+        # Test: La subida de videos e imágenes (con el contenido bloqueado) se hace fuera del
+        # hilo del event loop
+        from app.routers.vision import get_async_db, get_minio_service, get_admission_controller
+
+        async def refresh(task):
+            task.created_at = datetime.now(timezone.utc)
+
+        async def override_get_db():
+            mock_db = AsyncMock()
+            mock_db.add = Mock()
+            mock_db.refresh.side_effect = refresh
+            yield mock_db
+
+        threads = []
+        storage = MemoryStorageService()
+        upload = getattr(storage, upload_method)
+
+        def record_thread(content, file_name):
+            threads.append(threading.get_ident())
+            return upload(content, file_name)
+
+        setattr(storage, upload_method, record_thread)
+        app.dependency_overrides[get_async_db] = override_get_db
+        app.dependency_overrides[get_minio_service] = lambda: storage
+        app.dependency_overrides[get_admission_controller] = lambda: AsyncMock()
+        content = b"video data" * 1000 if extension == "mp4" else png_bytes()
+
+        try:
+            with patch('app.routers.vision.add_to_outbox'):
+                async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                    response = await client.post(
+                        "/api/v1/vision/analyze",
+                        files={"file": (filename, BytesIO(content), mime)}
+                    )
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 202
+        assert threads and threads[0] != threading.get_ident()
+        assert storage.get_file(content_key(hashlib.sha256(content).hexdigest(), extension)) == content
+
+    @pytest.mark.asyncio
+    async def test_delete_running_task_conflict(self):
+        # Test: Una tarea en curso no se puede eliminar
+        from app.routers.vision import get_async_db, get_minio_service
+
+        task = Task(id=uuid4(), status=TaskStatus.PROCESSING, filename="abc.png", content_hash="abc")
+
+        async def override_get_db():
+            mock_db = AsyncMock()
+            mock_result = Mock()
+            mock_result.scalar_one_or_none.return_value = task
+            mock_db.execute.return_value = mock_result
+            yield mock_db
+
+        storage = Mock()
+        app.dependency_overrides[get_async_db] = override_get_db
+        app.dependency_overrides[get_minio_service] = lambda: storage
+
+        try:
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                response = await client.delete(f"/api/v1/vision/tasks/{task.id}")
+
+            assert response.status_code == 409
+            storage.delete_file.assert_not_called()
+        finally:
+            app.dependency_overrides.clear()
+
+    @pytest.mark.asyncio
+    async def test_delete_interleaved_with_duplicate_upload(self):
+        # Test: Si se borra la última tarea de un contenido mientras otra lo reutiliza, la subida
+        # espera al borrado y vuelve a subir el objeto (la nueva tarea no queda sin entrada)
+        from app.routers.vision import get_async_db, get_minio_service, get_admission_controller
+
+        content = png_bytes()
+        key = content_key(hashlib.sha256(content).hexdigest(), "png")
+        storage = MemoryStorageService()
+        storage.upload_file(content, key)
+        old = Task(id=uuid4(), status=TaskStatus.COMPLETED, filename=key,
+                   content_hash=hashlib.sha256(content).hexdigest(), result=None)
+        database = FakeDatabase([old])
+
+        async def override_get_db():
+            yield FakeSession(database)
+
+        app.dependency_overrides[get_async_db] = override_get_db
+        app.dependency_overrides[get_minio_service] = lambda: storage
+        app.dependency_overrides[get_admission_controller] = lambda: AsyncMock()
+
+        try:
+            with patch('app.routers.vision.add_to_outbox'):
+                async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                    delete = asyncio.create_task(client.delete(f"/api/v1/vision/tasks/{old.id}"))
+                    await database.counted.wait()
+                    upload = asyncio.create_task(client.post(
+                        "/api/v1/vision/analyze",
+                        files={"file": ("test.png", BytesIO(content), "image/png")}
+                    ))
+                    await asyncio.sleep(0.1)
+                    assert not upload.done()
+
+                    database.resume.set()
+                    assert (await delete).status_code == 204
+                    assert (await upload).status_code == 202
+        finally:
+            app.dependency_overrides.clear()
+
+        assert storage.exists(key)
+        assert [task.filename for task in database.tasks] == [key]
@@ -0,0 +1,161 @@
+import os
+import zipfile
+import pytest
+import numpy as np
+import cv2
+from unittest.mock import Mock, patch
+from uuid import uuid4
+from app.models import Task, TaskStatus, MEDIA_TYPE_VIDEO, MEDIA_TYPE_IMAGE
+from app.services.frames import (
+    FrameSequenceError,
+    VideoFrameSink,
+    ZipFrameSink,
+    open_multipage,
+    open_video,
+    run_frame_pipeline,
+)
+from app.worker import process_image
+
+
+def make_frames(count: int, width: int = 64, height: int = 48) -> list[np.ndarray]:
+    # Frames sintéticos con un cuadrado que se desplaza
+    frames = []
+    for i in range(count):
+        frame = np.zeros((height, width, 3), dtype=np.uint8)
+        cv2.rectangle(frame, (i * 2, 10), (i * 2 + 20, 30), (255, 255, 255), -1)
+        frames.append(frame)
+    return frames
+
+
+@pytest.fixture
+def video_path(tmp_path):
+    # Video MP4 de prueba con 12 frames
+    path = str(tmp_path / "input.mp4")
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"mp4v"), 10, (64, 48))
+    for frame in make_frames(12):
+        writer.write(frame)
+    writer.release()
+    return path
+
+
+@pytest.fixture
+def tiff_path(tmp_path):
+    # TIFF multipágina de prueba con 5 páginas
+    path = str(tmp_path / "input.tiff")
+    assert cv2.imwritemulti(path, make_frames(5))
+    return path
+
+
+def edges(frame):
+    return cv2.Canny(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), 100, 200)
+
+
+class TestFramePipeline:
+    # Tests para el pipeline de frames
+
+    def test_video_to_video(self, video_path, tmp_path):
+        # Test: Un video se procesa frame a frame y se escribe como video
+        total, fps, frames = open_video(video_path)
+        output = str(tmp_path / "output.mp4")
+        progress = []
+
+        processed = run_frame_pipeline(
+            frames, edges, VideoFrameSink(output, fps), depth=2, on_progress=progress.append
+        )
+
+        assert processed == 12
+        assert total == 12
+        assert progress == list(range(1, 13))
+        _, _, written = open_video(output)
+        assert sum(1 for _ in written) == 12
+
+    def test_multipage_to_zip(self, tiff_path, tmp_path):
+        # Test: Un TIFF multipágina se procesa por bloques y se escribe como ZIP de PNG
+        total, frames = open_multipage(tiff_path, chunk=2)
+        output = str(tmp_path / "output.zip")
+
+        processed = run_frame_pipeline(frames, edges, ZipFrameSink(output), depth=1)
+
+        assert total == processed == 5
+        with zipfile.ZipFile(output) as archive:
+            names = archive.namelist()
+            assert names[0] == "frame_000000.png"
+            assert len(names) == 5
+
+    def test_processing_error_stops_decoder(self, tmp_path):
+        # Test: Un error al procesar detiene el hilo decodificador y se propaga
+        def failing(frame):
+            raise ValueError("fallo de procesamiento")
+
+        sink = ZipFrameSink(str(tmp_path / "output.zip"))
+        with pytest.raises(ValueError):
+            run_frame_pipeline(iter(make_frames(50)), failing, sink, depth=1)
+
+    def test_invalid_video(self, tmp_path):
+        # Test: Un archivo que no es video falla con FrameSequenceError
+        path = tmp_path / "broken.mp4"
+        path.write_bytes(b"no es un video")
+
+        with pytest.raises(FrameSequenceError):
+            open_video(str(path))
+
+
+class TestProcessFrameSequenceWorker:
+    # Tests del worker para videos y TIFF multipágina
+
+    def run_task(self, filename: str, media_type: str, source_path: str):
+        task_id = str(uuid4())
+        mock_task = Mock(spec=Task)
+        mock_task.id = task_id
+        mock_task.filename = filename
+        mock_task.media_type = media_type
+        mock_task.status = TaskStatus.PENDING
+
+        mock_db = Mock()
+        mock_db.query.return_value.filter.return_value.first.return_value = mock_task
+
+        uploaded = {}
+
+        def download_to_file(name, fileobj):
+            with open(source_path, "rb") as f:
+                fileobj.write(f.read())
+
+        def upload_from_file(fileobj, name):
+            uploaded[name] = fileobj.read()
+            return name
+
+        mock_minio = Mock()
+        mock_minio.download_to_file.side_effect = download_to_file
+        mock_minio.upload_from_file.side_effect = upload_from_file
+
+        with patch('app.worker.SessionLocalSync') as mock_session, \
+                patch('app.services.storage.create_storage', return_value=mock_minio):
+            mock_session.return_value.__enter__.return_value = mock_db
+            mock_session.return_value.__exit__.return_value = None
+            result = process_image(task_id)
+
+        return result, mock_task, uploaded
+
+    def test_process_video(self, video_path):
+        # Test: Un video produce un MP4 de bordes y progreso completo
+        result, task, uploaded = self.run_task("clip.mp4", MEDIA_TYPE_VIDEO, video_path)
+
+        assert result is True
+        assert task.status == TaskStatus.COMPLETED
+        assert task.result["processed_file"] == "processed_clip.mp4"
+        assert task.result["frames"] == 12
+        assert (task.result["width"], task.result["height"]) == (64, 48)
+        assert task.result["edge_pixels"] > 0
+        assert task.progress == 1.0
+        assert task.timings["frames"] == 12
+        assert task.timings["input_width"] == 64
+        assert uploaded["processed_clip.mp4"]
+
+    def test_process_multipage_tiff(self, tiff_path):
+        # Test: Un TIFF multipágina produce un ZIP con un PNG por página
+        result, task, uploaded = self.run_task("scan.tiff", MEDIA_TYPE_IMAGE, tiff_path)
+
+        assert result is True
+        assert task.result["processed_file"] == "processed_scan.zip"
+        assert task.result["frames"] == 5
+        assert len(uploaded["processed_scan.zip"]) > 0
@@ -0,0 +1,105 @@
+import pytest
+import numpy as np
+import cv2
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import Mock, AsyncMock
+from io import BytesIO
+from app.main import app
+from app.core.config import settings
+from app.services.image_probe import ImageInfo, InvalidImageError, probe_image
+
+
+def encode(extension: str, width: int = 64, height: int = 48, params=()) -> bytes:
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    return cv2.imencode(extension, image, list(params))[1].tobytes()
+
+
+class TestProbeImage:
+    # Tests para probe_image
+
+    @pytest.mark.parametrize("extension, fmt, params", [
+        (".jpg", "jpeg", ()),
+        (".jpg", "jpeg", (cv2.IMWRITE_JPEG_PROGRESSIVE, 1)),
+        (".png", "png", ()),
+        (".webp", "webp", (cv2.IMWRITE_WEBP_QUALITY, 80)),
+        (".webp", "webp", (cv2.IMWRITE_WEBP_QUALITY, 101)),
+        (".bmp", "bmp", ()),
+        (".tiff", "tiff", ()),
+    ])
+    def test_reads_dimensions_from_header(self, extension, fmt, params):
+        # Test: Formato y dimensiones coinciden con los de la imagen codificada
+        assert probe_image(encode(extension, 64, 48, params)) == ImageInfo(fmt, 64, 48)
+
+    def test_webp_extended_header(self):
+        # Test: WebP extendido (VP8X) guarda las dimensiones menos uno en 24 bits
+        header = b"RIFF" + (22).to_bytes(4, "little") + b"WEBPVP8X" + (10).to_bytes(4, "little")
+        header += b"\x00" * 4 + (4999).to_bytes(3, "little") + (2999).to_bytes(3, "little")
+
+        info = probe_image(header)
+
+        assert (info.format, info.width, info.height) == ("webp", 5000, 3000)
+        assert info.pixels == 15_000_000
+
+    @pytest.mark.parametrize("data", [
+        b"not an image",
+        b"",
+        encode(".png")[:20],
+        encode(".jpg")[:4],
+    ])
+    def test_rejects_invalid_or_truncated(self, data):
+        # Test: Contenido no reconocido o cabeceras truncadas lanzan InvalidImageError
+        with pytest.raises(InvalidImageError):
+            probe_image(data)
+
+
+class TestUploadValidation:
+    # Tests de la validación de subidas en POST /analyze
+
+    @pytest.fixture(autouse=True)
+    def overrides(self):
+        from app.routers.vision import get_async_db, get_minio_service, get_admission_controller
+
+        async def override_get_db():
+            yield AsyncMock()
+
+        self.storage = Mock()
+        app.dependency_overrides[get_async_db] = override_get_db
+        app.dependency_overrides[get_minio_service] = lambda: self.storage
+        app.dependency_overrides[get_admission_controller] = lambda: AsyncMock()
+        yield
+        app.dependency_overrides.clear()
+
+    async def post(self, content: bytes, content_type: str = "image/jpeg"):
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            return await client.post(
+                "/api/v1/vision/analyze",
+                files={"file": ("test.jpg", BytesIO(content), content_type)}
+            )
+
+    @pytest.mark.asyncio
+    async def test_rejects_invalid_image(self):
+        # Test: Un archivo que no es imagen se rechaza con 400 sin almacenarse
+        response = await self.post(b"fake image content")
+
+        assert response.status_code == 400
+        assert "imagen" in response.json()["detail"].lower()
+        self.storage.upload_file.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_rejects_too_many_pixels(self, monkeypatch):
+        # Test: Una imagen con más píxeles que MAX_IMAGE_PIXELS se rechaza con 413
+        monkeypatch.setattr(settings, "MAX_IMAGE_PIXELS", 1000)
+        response = await self.post(encode(".png", 64, 48), "image/png")
+
+        assert response.status_code == 413
+        assert "64x48" in response.json()["detail"]
+        self.storage.upload_file.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_rejects_too_many_bytes(self, monkeypatch):
+        # Test: Un archivo mayor que MAX_UPLOAD_BYTES se rechaza con 413
+        monkeypatch.setattr(settings, "MAX_UPLOAD_BYTES", 100)
+        response = await self.post(encode(".bmp"), "image/bmp")
+
+        assert response.status_code == 413
+        self.storage.upload_file.assert_not_called()
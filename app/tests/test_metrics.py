@@ -0,0 +1,31 @@
+import pytest
+from httpx import AsyncClient
+from sqlalchemy import create_engine, text
+from app.core.metrics import instrument_engine, get_registry
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(client: AsyncClient):
+    # Prueba que /metrics expone las métricas en formato Prometheus
+    response = await client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    body = response.text
+    assert "vision_tasks_total" in body
+    assert "vision_pipeline_stage_seconds" in body
+    assert "vision_storage_operation_seconds" in body
+
+
+def test_instrument_engine_records_queries():
+    # verificar que las consultas instrumentadas se registran en el histograma
+    engine = create_engine("sqlite://")
+    instrument_engine(engine, "test")
+
+    registry = get_registry()
+    before = registry.get_sample_value("vision_db_query_seconds_count", {"engine": "test"}) or 0
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    after = registry.get_sample_value("vision_db_query_seconds_count", {"engine": "test"})
+    assert after == before + 1
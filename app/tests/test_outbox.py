@@ -0,0 +1,68 @@
+import pytest
+from unittest.mock import MagicMock, patch
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.core.database import Base
+from app.models import OutboxMessage
+from app.services.outbox import OutboxDispatcher, add_to_outbox, publish_batch
+
+
+@pytest.fixture
+async def session_factory(tmp_path):
+    # Base de datos SQLite temporal con el esquema de los modelos
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'outbox.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    yield async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    await engine.dispose()
+
+
+async def pending_messages(session_factory) -> int:
+    async with session_factory() as db:
+        return (await db.execute(select(func.count()).select_from(OutboxMessage))).scalar_one()
+
+
+async def enqueue(session_factory, count: int) -> None:
+    async with session_factory() as db:
+        for i in range(count):
+            add_to_outbox(db, "process_image", args=[f"task-{i}"], kwargs={"spooled": False})
+        await db.commit()
+
+
+class TestOutboxDispatcher:
+    # Tests para el dispatcher del outbox
+
+    @pytest.mark.asyncio
+    async def test_drains_in_batches(self, session_factory):
+        # Test: Los mensajes se publican en lotes, en orden, y se borran de la tabla
+        await enqueue(session_factory, 5)
+        dispatcher = OutboxDispatcher(session_factory=session_factory, batch_size=2)
+
+        with patch("app.services.outbox.publish_batch") as mock_publish:
+            assert await dispatcher.drain() == 5
+
+        assert [len(call.args[0]) for call in mock_publish.call_args_list] == [2, 2, 1]
+        assert mock_publish.call_args_list[0].args[0][0] == ("process_image", ["task-0"], {"spooled": False})
+        assert await pending_messages(session_factory) == 0
+
+    @pytest.mark.asyncio
+    async def test_failed_publish_keeps_messages(self, session_factory):
+        # Test: Si el broker falla, los mensajes siguen en el outbox para el siguiente intento
+        await enqueue(session_factory, 3)
+        dispatcher = OutboxDispatcher(session_factory=session_factory)
+
+        with patch("app.services.outbox.publish_batch", side_effect=ConnectionError("redis caído")):
+            with pytest.raises(ConnectionError):
+                await dispatcher.drain_once()
+
+        assert await pending_messages(session_factory) == 3
+
+    def test_publish_batch_uses_one_producer(self):
+        # Test: Todo el lote se publica con el mismo productor (una conexión al broker)
+        with patch("app.services.outbox.celery_app") as mock_celery_app:
+            producer = MagicMock()
+            mock_celery_app.producer_or_acquire.return_value.__enter__.return_value = producer
+            publish_batch([("process_image", ["a"], {}), ("process_image", ["b"], {})])
+
+        mock_celery_app.producer_or_acquire.assert_called_once()
+        assert [call.kwargs["producer"] for call in mock_celery_app.send_task.call_args_list] == [producer, producer]
@@ -0,0 +1,47 @@
+import pytest
+from datetime import datetime, timezone
+from unittest.mock import AsyncMock, MagicMock
+from uuid import uuid4
+from sqlalchemy.dialects import postgresql
+from app.models import task_by_id, uuid7, uuid7_created_at
+from app.services.partitions import PartitionMaintainer
+
+
+class TestTaskPartitions:
+    # Tests para los IDs UUIDv7 y las particiones mensuales de tasks
+
+    def test_uuid7_carries_creation_time(self):
+        # Test: Los IDs son UUID v7, ordenados por tiempo y con el instante de creación
+        before = datetime.now(timezone.utc)
+        first, second = uuid7(), uuid7()
+
+        assert first.version == 7 and first.variant == "specified in RFC 4122"
+        assert first.int >> 80 <= second.int >> 80
+        assert abs((uuid7_created_at(first) - before).total_seconds()) < 1
+        assert uuid7_created_at(uuid4()) is None
+
+    def test_lookup_by_id_prunes_partitions(self):
+        # Test: Buscar por un UUID v7 acota created_at (poda de particiones); un UUID v4 no
+        def where(task_id) -> str:
+            return str(task_by_id(task_id).compile(dialect=postgresql.dialect()))
+
+        assert where(uuid7()).count("tasks.created_at") == 2
+        assert "created_at" not in where(uuid4())
+
+    @pytest.mark.asyncio
+    async def test_ensure_creates_partitions_ahead(self):
+        # Test: El mantenimiento llama a ensure_task_partitions con los meses configurados
+        db = AsyncMock()
+        result = MagicMock()
+        result.scalar_one.return_value = 2
+        db.execute.return_value = result
+        session_factory = MagicMock()
+        session_factory.return_value.__aenter__.return_value = db
+
+        created = await PartitionMaintainer(session_factory, months_ahead=3, interval=60).ensure()
+
+        statement = db.execute.call_args.args[0]
+        assert created == 2
+        assert "ensure_task_partitions" in str(statement)
+        assert 3 in statement.compile().params.values()
+        db.commit.assert_awaited_once()
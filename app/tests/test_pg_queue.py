@@ -0,0 +1,91 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import Mock, patch
+from uuid import uuid4
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import sessionmaker
+from app.core.database import Base
+from app.models import Task, TaskStatus
+from app.services.pg_queue import claim_batch, claim_statement, reclaim_stale
+from app.services.storage import TransientStorageError
+from app.worker import process_claimed_task
+
+
+@pytest.fixture
+def db(tmp_path):
+    # Base de datos SQLite temporal (FOR UPDATE se ignora, el resto de la sentencia es el mismo)
+    engine = create_engine(f"sqlite:///{tmp_path / 'queue.db'}")
+    Base.metadata.create_all(engine)
+    with sessionmaker(bind=engine, expire_on_commit=False)() as session:
+        yield session
+    engine.dispose()
+
+
+def add_task(db, status: TaskStatus, queued_at: datetime | None = None, **fields) -> Task:
+    task = Task(id=uuid4(), status=status, filename="a.png", queued_at=queued_at, **fields)
+    db.add(task)
+    db.commit()
+    return task
+
+
+class TestPgQueue:
+    # Tests para la cola de tareas sobre PostgreSQL
+
+    def test_claim_uses_skip_locked(self):
+        # Test: El lote se bloquea con SKIP LOCKED y se marca PROCESSING en una sola sentencia
+        sql = str(claim_statement(4).compile(dialect=postgresql.dialect()))
+
+        assert "FOR UPDATE SKIP LOCKED" in sql
+        assert sql.startswith("UPDATE tasks SET status=")
+        assert "RETURNING tasks.id" in sql
+
+    def test_claim_batch_takes_available_pending_tasks(self, db):
+        # Test: Se reclaman las PENDING disponibles en orden, sin las que esperan un reintento
+        now = datetime.now(timezone.utc)
+        first = add_task(db, TaskStatus.PENDING, now - timedelta(minutes=2))
+        second = add_task(db, TaskStatus.PENDING, now - timedelta(minutes=1))
+        add_task(db, TaskStatus.PENDING, now + timedelta(minutes=5))
+        add_task(db, TaskStatus.COMPLETED, now - timedelta(minutes=3))
+
+        assert claim_batch(db, 1) == [first.id]
+        assert claim_batch(db, 10) == [second.id]
+        assert claim_batch(db, 10) == []
+        db.refresh(first)
+        assert first.status == TaskStatus.PROCESSING
+
+    def test_reclaim_stale_processing_tasks(self, db):
+        # Test: Las tareas PROCESSING abandonadas vuelven a PENDING o fallan si agotaron los reintentos
+        old = datetime.now(timezone.utc) - timedelta(hours=1)
+        abandoned = add_task(db, TaskStatus.PROCESSING, started_at=old)
+        exhausted = add_task(db, TaskStatus.PROCESSING, started_at=old, result={"retries": 2})
+        active = add_task(db, TaskStatus.PROCESSING, started_at=datetime.now(timezone.utc))
+
+        reclaimed = reclaim_stale(db, stale_seconds=600, max_retries=2)
+
+        assert {task.id for task in reclaimed} == {abandoned.id, exhausted.id}
+        assert abandoned.status == TaskStatus.PENDING
+        assert abandoned.result["retries"] == 1
+        assert exhausted.status == TaskStatus.FAILED
+        db.refresh(active)
+        assert active.status == TaskStatus.PROCESSING
+
+    @patch('app.worker.SessionLocalSync')
+    @patch('app.services.storage.create_storage')
+    def test_transient_error_delays_task(self, mock_minio_service, mock_session):
+        # Test: Un error transitorio devuelve la tarea a PENDING con queued_at en el futuro
+        mock_task = Mock(spec=Task)
+        mock_task.id = uuid4()
+        mock_task.filename = "test_image.jpg"
+        mock_task.result = None
+        mock_db = Mock()
+        mock_db.query.return_value.filter.return_value.first.return_value = mock_task
+        mock_session.return_value.__enter__.return_value = mock_db
+        mock_minio_service.return_value.get_file.side_effect = TransientStorageError("503 Service Unavailable")
+
+        with patch('app.worker.get_exponential_backoff_interval', return_value=30):
+            assert process_claimed_task(mock_task.id) is False
+
+        assert mock_task.status == TaskStatus.PENDING
+        assert mock_task.result["retries"] == 1
+        assert mock_task.queued_at > datetime.now(timezone.utc) + timedelta(seconds=20)
@@ -0,0 +1,159 @@
+import json
+import pytest
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import Mock, AsyncMock, patch
+from uuid import uuid4
+from datetime import datetime, timezone
+from app.main import app
+from app.models import Task, TaskStatus
+from app.core.config import settings
+from app.services.progress import ProgressReporter, progress_key, read_progress
+
+
+@pytest.fixture
+def fake_redis():
+    # Cliente Redis síncrono mock que registra lo publicado
+    client = Mock()
+    client.published = []
+    pipe = Mock()
+    pipe.publish.side_effect = lambda key, message: client.published.append(json.loads(message))
+    client.pipeline.return_value = pipe
+    return client
+
+
+class TestProgressReporter:
+    # Tests para ProgressReporter
+
+    def test_throttles_redis_updates(self, fake_redis, monkeypatch):
+        # Test: Las actualizaciones dentro del intervalo se descartan salvo las forzadas
+        monkeypatch.setattr(settings, "PROGRESS_UPDATE_INTERVAL_SECONDS", 60.0)
+        reporter = ProgressReporter("task-1", redis_client=fake_redis)
+
+        reporter.report(0.1)
+        reporter.report(0.2)
+        reporter.report(1.0, TaskStatus.COMPLETED.value, force=True)
+
+        assert [m["progress"] for m in fake_redis.published] == [0.1, 1.0]
+        assert fake_redis.published[-1]["status"] == "COMPLETED"
+        fake_redis.pipeline.return_value.set.assert_called_with(
+            progress_key("task-1"), json.dumps(fake_redis.published[-1]), ex=settings.PROGRESS_TTL_SECONDS
+        )
+
+    def test_db_written_only_after_interval(self, fake_redis, monkeypatch):
+        # Test: La base de datos no se escribe en cada actualización
+        monkeypatch.setattr(settings, "PROGRESS_UPDATE_INTERVAL_SECONDS", 0.0)
+        monkeypatch.setattr(settings, "PROGRESS_DB_INTERVAL_SECONDS", 60.0)
+        mock_db = Mock()
+        mock_task = Mock(spec=Task)
+        mock_task.progress = None
+        reporter = ProgressReporter("task-1", db=mock_db, task=mock_task, redis_client=fake_redis)
+
+        for processed in range(1, 11):
+            reporter.frames(processed, 10)
+
+        assert len(fake_redis.published) == 10
+        assert fake_redis.published[-1]["progress"] == 0.99
+        mock_db.commit.assert_not_called()
+
+        monkeypatch.setattr(settings, "PROGRESS_DB_INTERVAL_SECONDS", 0.0)
+        reporter.report(0.5)
+        assert mock_task.progress == 0.5
+        mock_db.commit.assert_called_once()
+
+    def test_redis_failure_does_not_raise(self, fake_redis, monkeypatch):
+        # Test: Si Redis falla, la tarea continúa y no se reintenta en cada frame
+        monkeypatch.setattr(settings, "PROGRESS_UPDATE_INTERVAL_SECONDS", 0.0)
+        fake_redis.pipeline.return_value.execute.side_effect = ConnectionError("redis caído")
+        reporter = ProgressReporter("task-1", redis_client=fake_redis)
+
+        reporter.report(0.1)
+        reporter.report(0.2)
+
+        fake_redis.pipeline.return_value.execute.assert_called_once()
+
+
+class TestReadProgress:
+    # Tests para read_progress y GET /tasks/{task_id}
+
+    @pytest.mark.asyncio
+    async def test_read_progress_fail_safe(self):
+        # Test: Un error de Redis devuelve None
+        client = AsyncMock()
+        client.get.side_effect = ConnectionError("redis caído")
+
+        assert await read_progress("task-1", client) is None
+
+    @pytest.mark.asyncio
+    @pytest.mark.filterwarnings("error::UserWarning")
+    async def test_get_task_overlays_live_progress(self):
+        # Test: El progreso de Redis reemplaza al de la base de datos mientras la tarea está en curso
+        # (y la fecha se serializa como datetime, sin avisos de Pydantic)
+        from app.routers.vision import get_async_db
+
+        task = Task(
+            id=uuid4(),
+            status=TaskStatus.PROCESSING,
+            filename="clip.mp4",
+            progress=0.1,
+            result=None,
+            created_at=datetime.now(timezone.utc),
+        )
+
+        async def override_get_db():
+            mock_db = AsyncMock()
+            mock_result = Mock()
+            mock_result.scalar_one_or_none.return_value = task
+            mock_db.execute.return_value = mock_result
+            yield mock_db
+
+        app.dependency_overrides[get_async_db] = override_get_db
+        live = {"task_id": str(task.id), "progress": 0.42, "updated_at": "2026-01-01T00:00:00+00:00"}
+
+        try:
+            with patch("app.routers.vision.read_progress", AsyncMock(return_value=live)):
+                async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                    response = await client.get(f"/api/v1/vision/tasks/{task.id}")
+
+            assert response.status_code == 200
+            data = response.json()
+            assert data["progress"] == 0.42
+            assert data["progress_updated_at"].startswith("2026-01-01T00:00:00")
+        finally:
+            app.dependency_overrides.clear()
+
+    @pytest.mark.asyncio
+    async def test_events_for_finished_task(self):
+        # Test: El stream de una tarea terminada envía su estado y se cierra
+        from app.routers.vision import get_async_db
+
+        task = Task(
+            id=uuid4(),
+            status=TaskStatus.COMPLETED,
+            filename="test_image.jpg",
+            progress=1.0,
+            result={"processed_file": "processed_test_image.png"},
+            created_at=datetime.now(timezone.utc),
+        )
+
+        async def override_get_db():
+            mock_db = AsyncMock()
+            mock_result = Mock()
+            mock_result.scalar_one_or_none.return_value = task
+            mock_db.execute.return_value = mock_result
+            yield mock_db
+
+        app.dependency_overrides[get_async_db] = override_get_db
+        subscription = AsyncMock()
+
+        try:
+            with patch("app.routers.vision.ProgressSubscription", return_value=subscription):
+                async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                    response = await client.get(f"/api/v1/vision/tasks/{task.id}/events")
+
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/event-stream")
+            assert response.text.startswith("event: status\n")
+            assert '"status": "COMPLETED"' in response.text
+            subscription.__aexit__.assert_awaited_once()
+        finally:
+            app.dependency_overrides.clear()
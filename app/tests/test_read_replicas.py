@@ -0,0 +1,96 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import AsyncMock, Mock
+from uuid import uuid4
+from sqlalchemy.exc import OperationalError
+from app.main import app
+from app.models import Task, TaskStatus
+from app.routers.vision import _read_task
+
+
+def make_task(status: TaskStatus, written_seconds_ago: float) -> Task:
+    return Task(
+        id=uuid4(), status=status, filename="a.png", media_type="image",
+        created_at=datetime.now(timezone.utc) - timedelta(seconds=written_seconds_ago),
+    )
+
+
+def make_db(task=None, error: Exception | None = None) -> AsyncMock:
+    # Sesión mock que devuelve `task` (o lanza `error`) en cada consulta
+    db = AsyncMock()
+    result = Mock()
+    result.scalar_one_or_none.return_value = task
+    db.execute.side_effect = error
+    db.execute.return_value = result
+    return db
+
+
+class TestReadReplicas:
+    # Tests para las lecturas desde réplicas con vuelta al primario
+
+    @pytest.mark.asyncio
+    async def test_settled_task_read_from_replica(self):
+        # Test: Una tarea terminada se sirve desde la réplica sin tocar el primario
+        replica, primary = make_db(make_task(TaskStatus.COMPLETED, 1)), make_db()
+
+        task = await _read_task(replica, primary, uuid4())
+
+        assert task.status == TaskStatus.COMPLETED
+        primary.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_quiet_task_read_from_replica(self):
+        # Test: Una tarea en curso sin escrituras recientes también se sirve desde la réplica
+        replica, primary = make_db(make_task(TaskStatus.PROCESSING, 600)), make_db()
+
+        await _read_task(replica, primary, uuid4())
+
+        primary.execute.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_recent_or_missing_task_read_from_primary(self):
+        # Test: Una tarea recién escrita o que la réplica aún no tiene se lee del primario
+        completed = make_task(TaskStatus.COMPLETED, 0)
+
+        for replica_task in (make_task(TaskStatus.PENDING, 0), None):
+            primary = make_db(completed)
+            task = await _read_task(make_db(replica_task), primary, uuid4())
+
+            assert task is completed
+            primary.execute.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_unavailable_replica_falls_back_to_primary(self):
+        # Test: Si la réplica no responde se lee del primario
+        replica = make_db(error=OperationalError("SELECT", {}, Exception("connection refused")))
+        primary = make_db(make_task(TaskStatus.PENDING, 0))
+
+        task = await _read_task(replica, primary, uuid4())
+
+        assert task.status == TaskStatus.PENDING
+
+    @pytest.mark.asyncio
+    async def test_get_task_uses_read_session(self):
+        # Test: GET /tasks/{id} consulta la réplica y solo vuelve al primario para leer lo propio
+        from app.routers.vision import get_async_db, get_async_read_db
+        replica = make_db(make_task(TaskStatus.PENDING, 0))
+        primary = make_db(make_task(TaskStatus.COMPLETED, 0))
+
+        async def override_read_db():
+            yield replica
+
+        async def override_get_db():
+            yield primary
+
+        app.dependency_overrides[get_async_read_db] = override_read_db
+        app.dependency_overrides[get_async_db] = override_get_db
+        try:
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                response = await client.get(f"/api/v1/vision/tasks/{uuid4()}")
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "COMPLETED"
+        replica.execute.assert_called_once()
@@ -0,0 +1,93 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import AsyncMock, Mock
+from uuid import uuid4
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.core.database import Base
+from app.main import app
+from app.models import Task, TaskStatus
+from app.services.scaling import ScalingMonitor
+
+
+@pytest.fixture
+async def db(tmp_path):
+    # Base de datos SQLite temporal con el esquema de los modelos
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'scaling.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+def make_admission(depth: int):
+    admission = Mock()
+    admission.queue_depth = AsyncMock(return_value=depth)
+    return admission
+
+
+async def add_tasks(db, status: TaskStatus, count: int, worker: str | None = None, age_seconds: float = 10):
+    finished_at = datetime.now(timezone.utc) - timedelta(seconds=age_seconds) if worker else None
+    for _ in range(count):
+        db.add(Task(
+            id=uuid4(), status=status, filename="a.png", finished_at=finished_at,
+            timings={"worker": worker} if worker else None,
+        ))
+    await db.commit()
+
+
+class TestScalingMonitor:
+    # Tests para las señales de autoescalado
+
+    @pytest.mark.asyncio
+    async def test_drain_estimate_from_recent_throughput(self, db):
+        # Test: El tiempo de vaciado sale del trabajo pendiente y del ritmo en la ventana
+        await add_tasks(db, TaskStatus.PENDING, 8)
+        await add_tasks(db, TaskStatus.PROCESSING, 2)
+        await add_tasks(db, TaskStatus.COMPLETED, 20, worker="worker-a")
+        await add_tasks(db, TaskStatus.FAILED, 10, worker="worker-b")
+        await add_tasks(db, TaskStatus.COMPLETED, 50, worker="worker-a", age_seconds=3600)
+        monitor = ScalingMonitor(make_admission(7), window_seconds=60, cache_seconds=0)
+
+        signals = await monitor.snapshot(db)
+
+        assert signals["queue_depth"] == 7
+        assert (signals["pending"], signals["processing"]) == (8, 2)
+        assert signals["finished_in_window"] == 30
+        assert signals["throughput_per_second"] == 0.5
+        assert [w["worker"] for w in signals["workers"]] == ["worker-a", "worker-b"]
+        assert signals["estimated_drain_seconds"] == 20.0
+
+    @pytest.mark.asyncio
+    async def test_backlog_without_throughput_has_no_estimate(self, db):
+        # Test: Con trabajo pendiente y sin tareas terminadas no hay estimación; sin broker la cola es null
+        await add_tasks(db, TaskStatus.PENDING, 3)
+        admission = Mock()
+        admission.queue_depth = AsyncMock(side_effect=ConnectionError("redis caído"))
+        monitor = ScalingMonitor(admission, window_seconds=60, cache_seconds=0)
+
+        signals = await monitor.snapshot(db)
+
+        assert signals["queue_depth"] is None
+        assert signals["estimated_drain_seconds"] is None
+
+    @pytest.mark.asyncio
+    async def test_scaling_endpoint(self, db):
+        # Test: GET /scaling devuelve las señales medidas
+        from app.routers.vision import get_async_db, get_scaling_monitor
+
+        async def override_get_db():
+            yield db
+
+        app.dependency_overrides[get_async_db] = override_get_db
+        app.dependency_overrides[get_scaling_monitor] = lambda: ScalingMonitor(make_admission(0), cache_seconds=0)
+        try:
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                response = await client.get("/api/v1/vision/scaling")
+        finally:
+            app.dependency_overrides.clear()
+
+        assert response.status_code == 200
+        assert response.json()["estimated_drain_seconds"] == 0.0
+        assert response.json()["workers"] == []
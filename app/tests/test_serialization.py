@@ -0,0 +1,49 @@
+import json
+from fastapi.datastructures import DefaultPlaceholder
+from app.core import serialization
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.serialization import ORJSONResponse, api_response_class, celery_serializer
+from app.worker import deliver_callbacks, process_image
+
+
+class TestSerialization:
+    # Tests para la serialización de respuestas y mensajes
+
+    def test_default_keeps_fastapi_response(self):
+        # Test: Por defecto se deja la respuesta de FastAPI (serialización directa con pydantic)
+        assert isinstance(api_response_class(), DefaultPlaceholder)
+
+    def test_orjson_response(self, monkeypatch):
+        # Test: Con API_JSON_RESPONSE=orjson las respuestas se renderizan con orjson
+        monkeypatch.setattr(settings, "API_JSON_RESPONSE", "orjson")
+
+        response_class = api_response_class()
+        body = response_class({"id": "a", "result": {"frames": 3}}).body
+
+        assert response_class is ORJSONResponse
+        assert json.loads(body) == {"id": "a", "result": {"frames": 3}}
+
+    def test_missing_libraries_fall_back_to_json(self, monkeypatch):
+        # Test: Si orjson o msgpack no están instalados se usa JSON estándar
+        monkeypatch.setattr(settings, "API_JSON_RESPONSE", "orjson")
+        monkeypatch.setattr(settings, "CELERY_SERIALIZER", "msgpack")
+        monkeypatch.setattr(serialization, "orjson", None)
+        monkeypatch.setattr(serialization, "msgpack", None)
+
+        assert isinstance(api_response_class(), DefaultPlaceholder)
+        assert celery_serializer() == "json"
+
+    def test_msgpack_serializer(self, monkeypatch):
+        # Test: Con CELERY_SERIALIZER=msgpack los mensajes se serializan con msgpack
+        monkeypatch.setattr(settings, "CELERY_SERIALIZER", "msgpack")
+        monkeypatch.setattr(serialization, "msgpack", object())
+
+        assert celery_serializer() == "msgpack"
+        assert "msgpack" in celery_app.conf.accept_content
+
+    def test_task_results_not_stored(self):
+        # Test: Las tareas no escriben su valor de retorno en el backend de resultados
+        assert celery_app.conf.task_ignore_result is True
+        assert process_image.ignore_result is True
+        assert deliver_callbacks.ignore_result is True
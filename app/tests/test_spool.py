@@ -0,0 +1,182 @@
+import os
+import time
+import pytest
+import numpy as np
+import cv2
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import Mock, AsyncMock, patch
+from uuid import uuid4
+from datetime import datetime, timezone
+from io import BytesIO
+from app.main import app
+from app.core.config import settings
+from app.models import Task, TaskStatus, MEDIA_TYPE_IMAGE
+from app.services.spool import Spool, get_spool
+from app.worker import process_image
+
+
+@pytest.fixture
+def spool_dir(tmp_path, monkeypatch):
+    # Activa el spool local en un directorio temporal
+    path = tmp_path / "spool"
+    monkeypatch.setattr(settings, "SPOOL_DIR", str(path))
+    monkeypatch.setattr(settings, "STORAGE_BACKEND", "minio")
+    monkeypatch.setattr(settings, "SPOOL_LOCAL_WORKER", True)
+    return path
+
+
+def png_bytes() -> bytes:
+    image = np.zeros((48, 64, 3), dtype=np.uint8)
+    cv2.rectangle(image, (10, 10), (40, 30), (255, 255, 255), -1)
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+class TestSpool:
+    # Tests para el spool local
+
+    def test_sweep_removes_expired_files(self, tmp_path):
+        # Test: El barrido elimina solo los archivos vencidos
+        spool = Spool(str(tmp_path), max_age_seconds=60, max_file_bytes=1024)
+        spool.upload_file(b"old", "old.jpg")
+        spool.upload_file(b"new", "new.jpg")
+        expired = time.time() - 120
+        os.utime(spool.path("old.jpg"), (expired, expired))
+
+        assert spool.sweep(force=True) == 1
+        assert spool.find("old.jpg") is None
+        assert spool.find("new.jpg") is not None
+
+    def test_limits_and_invalid_names(self, tmp_path):
+        # Test: Archivos vacíos o demasiado grandes no se aceptan; nombres inválidos no se encuentran
+        spool = Spool(str(tmp_path), max_age_seconds=60, max_file_bytes=1024)
+
+        assert spool.accepts(1024)
+        assert not spool.accepts(1025)
+        assert not spool.accepts(None)
+        assert spool.find("../etc/passwd") is None
+
+    def test_disabled_with_local_storage(self, spool_dir, monkeypatch):
+        # Test: Con almacenamiento local el spool no aporta nada y se desactiva
+        assert isinstance(get_spool(), Spool)
+
+        monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+        assert get_spool() is None
+
+
+class TestSpoolHandoff:
+    # Tests del traspaso API -> worker a través del spool
+
+    def test_worker_reads_spooled_input(self, spool_dir):
+        # Test: El worker lee la entrada del spool, deja el resultado ahí y libera la entrada
+        task_id = str(uuid4())
+        get_spool().upload_file(png_bytes(), "input.png")
+
+        mock_task = Mock(spec=Task)
+        mock_task.id = task_id
+        mock_task.filename = "input.png"
+        mock_task.media_type = MEDIA_TYPE_IMAGE
+        mock_task.status = TaskStatus.PENDING
+        mock_db = Mock()
+        mock_db.query.return_value.filter.return_value.first.return_value = mock_task
+        mock_storage = Mock()
+
+        with patch('app.worker.SessionLocalSync') as mock_session, \
+                patch('app.services.storage.create_storage', return_value=mock_storage):
+            mock_session.return_value.__enter__.return_value = mock_db
+            result = process_image(task_id, spooled=True)
+
+        assert result is True
+        assert mock_task.timings["input_source"] == "spool"
+        mock_storage.get_file.assert_not_called()
+        mock_storage.upload_file.assert_called_once()
+        assert not (spool_dir / "input.png").exists()
+        assert (spool_dir / "processed_input.png").exists()
+
+    @pytest.mark.asyncio
+    async def test_analyze_spools_input(self, spool_dir):
+        # Test: La API deja la entrada en el spool e indica spooled=True al encolar
+        from app.routers.vision import get_async_db, get_minio_service, get_admission_controller
+
+        async def refresh(task):
+            task.id = uuid4()
+            task.created_at = datetime.now(timezone.utc)
+
+        async def override_get_db():
+            mock_db = AsyncMock()
+            mock_db.add = Mock()
+            mock_db.refresh.side_effect = refresh
+            yield mock_db
+
+        mock_storage = Mock()
+        mock_storage.upload_file.side_effect = lambda content, name: name
+        app.dependency_overrides[get_async_db] = override_get_db
+        app.dependency_overrides[get_minio_service] = lambda: mock_storage
+        app.dependency_overrides[get_admission_controller] = lambda: AsyncMock()
+
+        try:
+            with patch('app.routers.vision.add_to_outbox') as mock_add_to_outbox:
+                async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                    response = await client.post(
+                        "/api/v1/vision/analyze",
+                        files={"file": ("test.png", BytesIO(png_bytes()), "image/png")}
+                    )
+
+            assert response.status_code == 202
+            filename = response.json()["filename"]
+            assert (spool_dir / filename).read_bytes() == png_bytes()
+            assert mock_add_to_outbox.call_args.kwargs["kwargs"] == {"spooled": True}
+        finally:
+            app.dependency_overrides.clear()
+
+    def test_api_spool_requires_local_worker_and_sweeps(self, spool_dir, monkeypatch):
+        # Test: Sin worker local la API no usa el spool; con él, barre los archivos vencidos
+        from app.routers.vision import _spool_input
+        spool = Spool(str(spool_dir), max_age_seconds=60, max_file_bytes=1024)
+        spool.upload_file(b"old", "old.jpg")
+        expired = time.time() - 120
+        os.utime(spool.path("old.jpg"), (expired, expired))
+        write = lambda target: target.upload_file(b"new", "new.jpg")
+
+        monkeypatch.setattr(settings, "SPOOL_LOCAL_WORKER", False)
+        assert _spool_input(spool, write, 3) is False
+        assert spool.find("new.jpg") is None
+
+        monkeypatch.setattr(settings, "SPOOL_LOCAL_WORKER", True)
+        assert _spool_input(spool, write, 3) is True
+        assert spool.find("new.jpg") is not None
+        assert spool.find("old.jpg") is None
+
+    @pytest.mark.asyncio
+    async def test_download_served_from_spool(self, spool_dir):
+        # Test: Si el resultado está en el spool del nodo, no se descarga de MinIO
+        from app.routers.vision import get_async_db, get_minio_service
+
+        task = Task(
+            id=uuid4(),
+            status=TaskStatus.COMPLETED,
+            filename="input.png",
+            result={"processed_file": "processed_input.png"},
+            created_at=datetime.now(timezone.utc),
+        )
+        get_spool().upload_file(b"processed image data", "processed_input.png")
+
+        async def override_get_db():
+            mock_db = AsyncMock()
+            mock_result = Mock()
+            mock_result.scalar_one_or_none.return_value = task
+            mock_db.execute.return_value = mock_result
+            yield mock_db
+
+        mock_storage = Mock()
+        app.dependency_overrides[get_async_db] = override_get_db
+        app.dependency_overrides[get_minio_service] = lambda: mock_storage
+
+        try:
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                response = await client.get(f"/api/v1/vision/tasks/{task.id}/result")
+
+            assert response.status_code == 200
+            assert response.content == b"processed image data"
+            mock_storage.get_file.assert_not_called()
+        finally:
+            app.dependency_overrides.clear()
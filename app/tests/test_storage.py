@@ -1,13 +1,26 @@
 import pytest
 from unittest.mock import Mock, patch, MagicMock
-from botocore.exceptions import ClientError, BotoCoreError
-from app.services.storage import MinioService, MinioServiceError
+from botocore.exceptions import ClientError, BotoCoreError, EndpointConnectionError
+import io
+import numpy as np
+from app.core.config import settings
+from app.services.storage import (
+    LocalStorageService,
+    MemoryStorageService,
+    MinioService,
+    MinioServiceError,
+    StorageService,
+    TransientStorageError,
+    create_storage,
+    ReusableBuffer,
+    MemoryviewReader,
+)
 
 
 class TestMinioService:
     # Tests para la clase MinioService
     
-    @patch('app.services.storage.boto3.client')
+    @patch('boto3.client')
     def test_init_success(self, mock_boto3_client):
         # Test: Inicialización exitosa con bucket existente
         # Arrange
@@ -23,7 +36,7 @@ class TestMinioService:
         assert service.bucket_name is not None
         mock_s3_client.head_bucket.assert_called_once()
     
-    @patch('app.services.storage.boto3.client')
+    @patch('boto3.client')
     def test_init_bucket_not_exists(self, mock_boto3_client):
         # Test: Falla cuando el bucket no existe (404)
         # Arrange
@@ -42,7 +55,7 @@ class TestMinioService:
         assert "no existe" in str(exc_info.value)
         assert "infraestructura" in str(exc_info.value)
     
-    @patch('app.services.storage.boto3.client')
+    @patch('boto3.client')
     def test_init_connection_error(self, mock_boto3_client):
         # Test: Error de conexión al inicializar
         # Arrange
@@ -56,7 +69,7 @@ class TestMinioService:
         
         assert "Error de conexión" in str(exc_info.value)
     
-    @patch('app.services.storage.boto3.client')
+    @patch('boto3.client')
     def test_init_client_error_non_404(self, mock_boto3_client):
         # Test: Error de cliente (no 404) al verificar bucket
         # Arrange
@@ -74,7 +87,7 @@ class TestMinioService:
         
         assert "Error al verificar el bucket" in str(exc_info.value)
     
-    @patch('app.services.storage.boto3.client')
+    @patch('boto3.client')
     def test_init_unexpected_error(self, mock_boto3_client):
         # Test: Error inesperado al inicializar
         # Arrange
@@ -86,7 +99,7 @@ class TestMinioService:
         
         assert "Error inesperado" in str(exc_info.value)
     
-    @patch('app.services.storage.boto3.client')
+    @patch('boto3.client')
     def test_upload_file_success(self, mock_boto3_client):
         # Test: Subida exitosa de archivo
         # Arrange
@@ -109,7 +122,7 @@ class TestMinioService:
         assert call_args.kwargs['Key'] == file_name
         assert call_args.kwargs['Body'] == file_content
     
-    @patch('app.services.storage.boto3.client')
+    @patch('boto3.client')
     def test_upload_file_client_error(self, mock_boto3_client):
         # Test: Error de cliente al subir archivo
         # Arrange
@@ -130,7 +143,7 @@ class TestMinioService:
         
         assert "Error al subir el archivo" in str(exc_info.value)
     
-    @patch('app.services.storage.boto3.client')
+    @patch('boto3.client')
     def test_upload_file_connection_error(self, mock_boto3_client):
         # Test: Error de conexión al subir archivo
         # Arrange
@@ -147,7 +160,7 @@ class TestMinioService:
         
         assert "Error de conexión" in str(exc_info.value)
     
-    @patch('app.services.storage.boto3.client')
+    @patch('boto3.client')
     def test_upload_file_unexpected_error(self, mock_boto3_client):
         # Test: Error inesperado al subir archivo
         # Arrange
@@ -163,3 +176,207 @@ class TestMinioService:
             service.upload_file(b"test", "test.jpg")
         
         assert "Error inesperado" in str(exc_info.value)
+    
+    @patch('boto3.client')
+    def test_upload_file_from_buffer_without_copy(self, mock_boto3_client):
+        # Test: Un array de NumPy se sube como stream sobre el mismo buffer
+        # Arrange
+        mock_s3_client = Mock()
+        mock_boto3_client.return_value = mock_s3_client
+        mock_s3_client.head_bucket.return_value = {}
+        
+        service = MinioService()
+        encoded = np.arange(256, dtype=np.uint8).reshape(-1, 1)
+        
+        # Act
+        service.upload_file(encoded, "processed.png")
+        
+        # Assert
+        call_args = mock_s3_client.put_object.call_args
+        body = call_args.kwargs['Body']
+        assert isinstance(body, MemoryviewReader)
+        assert call_args.kwargs['ContentLength'] == 256
+        assert body.read() == encoded.tobytes()
+    
+    @patch('boto3.client')
+    def test_get_file_into_reusable_buffer(self, mock_boto3_client):
+        # Test: La descarga se lee dentro del buffer reutilizable
+        # Arrange
+        mock_s3_client = Mock()
+        mock_boto3_client.return_value = mock_s3_client
+        mock_s3_client.head_bucket.return_value = {}
+        mock_s3_client.get_object.side_effect = lambda **kwargs: {
+            'Body': io.BytesIO(b"contenido de prueba"),
+            'ContentLength': len(b"contenido de prueba"),
+        }
+        
+        service = MinioService()
+        buffer = ReusableBuffer()
+        
+        # Act
+        first = service.get_file("a.jpg", buffer=buffer)
+        first_address = np.frombuffer(first, np.uint8).ctypes.data
+        second = service.get_file("b.jpg", buffer=buffer)
+        
+        # Assert
+        assert bytes(second) == b"contenido de prueba"
+        assert np.frombuffer(second, np.uint8).ctypes.data == first_address
+
+    @patch('boto3.client')
+    def test_truncated_download_is_transient(self, mock_boto3_client):
+        # Test: Un cuerpo más corto que ContentLength se reintenta (TransientStorageError)
+        # Arrange
+        mock_s3_client = Mock()
+        mock_boto3_client.return_value = mock_s3_client
+        mock_s3_client.head_bucket.return_value = {}
+        mock_s3_client.get_object.return_value = {
+            'Body': io.BytesIO(b"contenido"),
+            'ContentLength': 100,
+        }
+        service = MinioService()
+
+        # Act & Assert
+        with pytest.raises(TransientStorageError):
+            service.get_file("a.jpg", buffer=ReusableBuffer())
+
+    @patch('boto3.client')
+    def test_transient_errors_are_classified(self, mock_boto3_client):
+        # Test: 503/SlowDown y errores de conexión son transitorios; NoSuchKey es permanente
+        # Arrange
+        mock_s3_client = Mock()
+        mock_boto3_client.return_value = mock_s3_client
+        mock_s3_client.head_bucket.return_value = {}
+        service = MinioService()
+
+        unavailable = ClientError(
+            {'Error': {'Code': 'SlowDown'}, 'ResponseMetadata': {'HTTPStatusCode': 503}}, 'GetObject'
+        )
+        missing = ClientError({'Error': {'Code': 'NoSuchKey'}}, 'GetObject')
+
+        # Act & Assert
+        mock_s3_client.get_object.side_effect = unavailable
+        with pytest.raises(TransientStorageError):
+            service.get_file("a.jpg")
+
+        mock_s3_client.put_object.side_effect = EndpointConnectionError(endpoint_url="http://minio:9000")
+        with pytest.raises(TransientStorageError):
+            service.upload_file(b"data", "a.png")
+
+        mock_s3_client.get_object.side_effect = missing
+        with pytest.raises(MinioServiceError) as exc_info:
+            service.get_file("a.jpg")
+        assert not isinstance(exc_info.value, TransientStorageError)
+
+
+    @patch('boto3.client')
+    def test_exists_uses_head_object(self, mock_boto3_client):
+        # Test: exists consulta con HEAD; un 404 es False y otros errores se propagan
+        # Arrange
+        mock_s3_client = Mock()
+        mock_boto3_client.return_value = mock_s3_client
+        mock_s3_client.head_bucket.return_value = {}
+        service = MinioService()
+
+        # Act & Assert
+        assert service.exists("a.jpg") is True
+        mock_s3_client.head_object.assert_called_once_with(Bucket=service.bucket_name, Key="a.jpg")
+
+        mock_s3_client.head_object.side_effect = ClientError({'Error': {'Code': '404'}}, 'HeadObject')
+        assert service.exists("a.jpg") is False
+
+        mock_s3_client.head_object.side_effect = ClientError(
+            {'Error': {'Code': '503'}, 'ResponseMetadata': {'HTTPStatusCode': 503}}, 'HeadObject'
+        )
+        with pytest.raises(TransientStorageError):
+            service.exists("a.jpg")
+
+class TestReusableBuffer:
+    # Tests para ReusableBuffer
+    
+    def test_buffer_grows_and_is_reused(self):
+        # Test: El buffer crece al tamaño necesario y luego se reutiliza
+        buffer = ReusableBuffer()
+        
+        big = buffer.view(1024)
+        small = buffer.view(10)
+        
+        assert len(big) == 1024
+        assert len(small) == 10
+        assert big.obj is small.obj
+    
+    def test_buffer_over_limit_is_not_retained(self):
+        # Test: Objetos por encima del máximo usan un buffer de un solo uso
+        buffer = ReusableBuffer(max_bytes=100)
+        
+        retained = buffer.view(50)
+        oversized = buffer.view(500)
+        
+        assert len(oversized) == 500
+        assert buffer.view(50).obj is retained.obj
+
+
+class TestLocalStorageService:
+    # Tests para el backend de almacenamiento en disco local
+
+    def test_upload_and_get_file_without_copy(self, tmp_path):
+        # Test: Un buffer de NumPy se guarda y se lee con mmap como vista de solo lectura
+        storage = LocalStorageService(str(tmp_path))
+        encoded = np.arange(256, dtype=np.uint8).reshape(256, 1)
+
+        storage.upload_file(encoded, "a.png")
+        data = storage.get_file("a.png")
+
+        assert isinstance(data, memoryview)
+        assert data.readonly
+        assert bytes(data) == encoded.tobytes()
+        assert [p.name for p in tmp_path.iterdir()] == ["a.png"]
+
+    def test_file_copies_with_sendfile(self, tmp_path):
+        # Test: download_to_file / upload_from_file copian el contenido completo entre archivos
+        storage = LocalStorageService(str(tmp_path / "storage"))
+        source = tmp_path / "source.bin"
+        source.write_bytes(b"x" * 1024 + b"y" * 10)
+
+        with open(source, "rb") as f:
+            f.seek(1024)
+            storage.upload_from_file(f, "tail.bin")
+        with open(tmp_path / "copy.bin", "wb") as f:
+            storage.download_to_file("tail.bin", f)
+
+        assert (tmp_path / "copy.bin").read_bytes() == b"y" * 10
+
+    def test_missing_and_invalid_names(self, tmp_path):
+        # Test: Archivo inexistente o nombre fuera del directorio -> MinioServiceError
+        storage = LocalStorageService(str(tmp_path))
+
+        with pytest.raises(MinioServiceError):
+            storage.get_file("missing.png")
+        with pytest.raises(MinioServiceError):
+            storage.upload_file(b"data", "../escape.png")
+
+    def test_create_storage_uses_configured_backend(self, tmp_path, monkeypatch):
+        # Test: STORAGE_BACKEND elige el backend
+        monkeypatch.setattr(settings, "STORAGE_BACKEND", "local")
+        monkeypatch.setattr(settings, "STORAGE_LOCAL_PATH", str(tmp_path))
+        assert isinstance(create_storage(), LocalStorageService)
+
+        monkeypatch.setattr(settings, "STORAGE_BACKEND", "memory")
+        storage = create_storage()
+        assert isinstance(storage, MemoryStorageService)
+        storage.upload_file(memoryview(b"abc"), "a.bin")
+        assert storage.get_file("a.bin") == b"abc"
+
+        monkeypatch.setattr(settings, "STORAGE_BACKEND", "ftp")
+        with pytest.raises(MinioServiceError):
+            create_storage()
+
+    def test_backend_must_implement_every_operation(self):
+        # Test: La interfaz no se instancia y un backend incompleto falla al crearse, no al usarse
+        class PartialStorage(StorageService):
+            def upload_file(self, file_content, file_name: str) -> str:
+                return file_name
+
+        with pytest.raises(TypeError):
+            StorageService()
+        with pytest.raises(TypeError):
+            PartialStorage()
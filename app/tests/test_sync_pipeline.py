@@ -0,0 +1,137 @@
+import asyncio
+import threading
+import pytest
+import numpy as np
+import cv2
+from httpx import AsyncClient, ASGITransport
+from unittest.mock import Mock, AsyncMock, patch
+from uuid import uuid4
+from datetime import datetime, timezone
+from io import BytesIO
+from app.main import app
+from app.core.config import settings
+from concurrent.futures import ThreadPoolExecutor
+from app.services.sync_pipeline import SyncPipeline, SyncPipelineTimeout, SyncPipelineUnavailable
+
+
+def png_bytes(width: int = 64, height: int = 48) -> bytes:
+    image = np.zeros((height, width, 3), dtype=np.uint8)
+    cv2.rectangle(image, (10, 10), (40, 30), (255, 255, 255), -1)
+    return cv2.imencode(".png", image)[1].tobytes()
+
+
+class TestSyncPipeline:
+    # Tests para el pool de procesos del modo síncrono
+
+    @pytest.mark.asyncio
+    async def test_process_in_pool(self):
+        # Test: El pool ejecuta el pipeline del worker y devuelve el PNG de bordes
+        pipeline = SyncPipeline(workers=1, max_pending=1, timeout=60)
+        try:
+            png, timings = await pipeline.process(png_bytes())
+            with pytest.raises(ValueError):
+                await pipeline.process(b"not an image")
+        finally:
+            pipeline.shutdown()
+
+        edges = cv2.imdecode(np.frombuffer(png, np.uint8), cv2.IMREAD_GRAYSCALE)
+        assert edges.shape == (48, 64)
+        assert edges.max() == 255
+        assert timings["input_width"] == 64
+        assert "canny_ms" in timings
+
+    @pytest.mark.asyncio
+    async def test_timed_out_image_keeps_its_slot(self):
+        # Test: Tras un timeout la imagen sigue ocupando su hueco hasta que el pool la termina
+        finish = threading.Event()
+        pipeline = SyncPipeline(workers=1, max_pending=1, timeout=0.05)
+        pipeline._executor = ThreadPoolExecutor(max_workers=1)
+
+        def slow_pipeline(image_data, params=None):
+            finish.wait(5)
+            return b"png", {}
+
+        try:
+            with patch("app.services.sync_pipeline._run_pipeline", slow_pipeline):
+                with pytest.raises(SyncPipelineTimeout):
+                    await pipeline.process(b"image")
+                with pytest.raises(SyncPipelineUnavailable):
+                    await pipeline.process(b"image")
+
+                finish.set()
+                await asyncio.sleep(0.1)
+                assert await pipeline.process(b"image") == (b"png", {})
+        finally:
+            finish.set()
+            pipeline.shutdown()
+
+
+class TestAnalyzeSyncMode:
+    # Tests de POST /analyze?mode=sync
+
+    @pytest.fixture(autouse=True)
+    def overrides(self):
+        from app.routers.vision import (
+            get_async_db, get_minio_service, get_admission_controller, get_sync_pipeline_service
+        )
+
+        async def refresh(task):
+            task.id = uuid4()
+            task.created_at = datetime.now(timezone.utc)
+
+        async def override_get_db():
+            mock_db = AsyncMock()
+            mock_db.add = Mock()
+            mock_db.refresh.side_effect = refresh
+            yield mock_db
+
+        self.storage = Mock()
+        self.storage.exists.return_value = False
+        self.pipeline = Mock()
+        self.pipeline.process = AsyncMock(return_value=(b"png data", {"worker": "api", "decode_ms": 1.5}))
+        app.dependency_overrides[get_async_db] = override_get_db
+        app.dependency_overrides[get_minio_service] = lambda: self.storage
+        app.dependency_overrides[get_admission_controller] = lambda: AsyncMock()
+        app.dependency_overrides[get_sync_pipeline_service] = lambda: self.pipeline
+        yield
+        app.dependency_overrides.clear()
+
+    async def post(self, content: bytes):
+        with patch('app.routers.vision.add_to_outbox') as self.add_to_outbox:
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                return await client.post(
+                    "/api/v1/vision/analyze?mode=sync",
+                    files={"file": ("test.png", BytesIO(content), "image/png")}
+                )
+
+    @pytest.mark.asyncio
+    async def test_small_image_returned_inline(self):
+        # Test: Una imagen pequeña se devuelve procesada sin almacenarse ni encolarse
+        response = await self.post(png_bytes())
+
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/png"
+        assert response.headers["server-timing"] == "decode;dur=1.5"
+        assert response.content == b"png data"
+        self.storage.upload_file.assert_not_called()
+        self.add_to_outbox.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_large_image_goes_through_queue(self, monkeypatch):
+        # Test: Una imagen por encima de SYNC_MAX_PIXELS se encola como siempre
+        monkeypatch.setattr(settings, "SYNC_MAX_PIXELS", 1000)
+        response = await self.post(png_bytes())
+
+        assert response.status_code == 202
+        self.pipeline.process.assert_not_called()
+        self.add_to_outbox.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_full_pool_falls_back_to_queue(self):
+        # Test: Con el pool lleno la imagen se encola en lugar de esperar
+        self.pipeline.process.side_effect = SyncPipelineUnavailable("lleno")
+        response = await self.post(png_bytes())
+
+        assert response.status_code == 202
+        self.storage.upload_file.assert_called_once()
+        self.add_to_outbox.assert_called_once()
@@ -0,0 +1,112 @@
+import pytest
+import numpy as np
+import cv2
+from datetime import datetime, timedelta, timezone
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from app.core.database import Base
+from app.main import app
+from app.models import Task, TaskStatus, result_value, uuid7
+from app.routers.vision import get_async_read_db
+from app.worker import _edge_stats
+
+
+@pytest.fixture
+async def db(tmp_path):
+    # Base de datos SQLite temporal con el esquema de los modelos
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'listing.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    async with async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)() as session:
+        yield session
+    await engine.dispose()
+
+
+async def add_task(db, edge_pixels: int, contour_count: int, age_seconds: float = 0) -> Task:
+    task = Task(
+        id=uuid7(), status=TaskStatus.COMPLETED, filename="a.png",
+        created_at=datetime.now(timezone.utc) - timedelta(seconds=age_seconds),
+        result={
+            "processed_file": "processed_a.png", "width": 64, "height": 48,
+            "edge_pixels": edge_pixels, "edge_density": edge_pixels / (64 * 48),
+            "contour_count": contour_count,
+        },
+    )
+    db.add(task)
+    await db.commit()
+    return task
+
+
+async def list_tasks(db, **params) -> dict:
+    async def override_read_db():
+        yield db
+
+    app.dependency_overrides[get_async_read_db] = override_read_db
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            response = await client.get("/api/v1/vision/tasks", params=params)
+    finally:
+        app.dependency_overrides.clear()
+    assert response.status_code == 200
+    return response.json()
+
+
+class TestTaskListing:
+    # Tests para el listado de tareas con filtros sobre el resultado del análisis
+
+    @pytest.mark.asyncio
+    async def test_filters_on_analysis_result(self, db):
+        # Test: Los filtros por píxeles de borde y contornos se aplican en la base de datos
+        await add_task(db, edge_pixels=10, contour_count=1)
+        busy = await add_task(db, edge_pixels=500, contour_count=12)
+        db.add(Task(id=uuid7(), status=TaskStatus.FAILED, filename="b.png", result={"error": "x"}))
+        await db.commit()
+
+        page = await list_tasks(db, min_edge_pixels=100, min_contours=5)
+
+        assert [item["id"] for item in page["items"]] == [str(busy.id)]
+        assert page["items"][0]["result"]["contour_count"] == 12
+        assert page["next_before"] is None
+
+    @pytest.mark.asyncio
+    async def test_cursor_pagination(self, db):
+        # Test: Las páginas van de la tarea más reciente a la más antigua sin repetir ni saltar tareas
+        tasks = [await add_task(db, edge_pixels=i, contour_count=i, age_seconds=10 - i) for i in range(5)]
+
+        first = await list_tasks(db, limit=2)
+        second = await list_tasks(db, limit=2, before=first["next_before"])
+        last = await list_tasks(db, limit=2, before=second["next_before"])
+
+        ids = [item["id"] for page in (first, second, last) for item in page["items"]]
+        assert ids == [str(task.id) for task in reversed(tasks)]
+        assert last["next_before"] is None
+
+    def test_result_filters_are_indexed(self):
+        # Test: Cada filtro por rango sobre result coincide con un índice de expresión de PostgreSQL
+        def render(expression):
+            return str(expression.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": True}))
+
+        indexed = {render(expression) for index in Task.__table__.indexes for expression in index.expressions}
+        filters = [
+            result_value("edge_pixels").as_float(),
+            result_value("edge_density").as_float(),
+            result_value("contour_count").as_integer(),
+            result_value("width").as_integer(),
+            result_value("height").as_integer(),
+        ]
+
+        assert {render(expression) for expression in filters} <= indexed
+
+    def test_edge_stats(self):
+        # Test: El worker guarda dimensiones, píxeles de borde y estadísticas de contornos
+        image = np.zeros((48, 64), dtype=np.uint8)
+        cv2.rectangle(image, (10, 10), (30, 30), 255, -1)
+        edges = cv2.Canny(image, 100, 200)
+
+        stats = _edge_stats(edges)
+
+        assert (stats["width"], stats["height"]) == (64, 48)
+        assert stats["edge_pixels"] == int(np.count_nonzero(edges)) > 0
+        assert stats["contour_count"] == 1
+        assert stats["largest_contour_area"] > 0
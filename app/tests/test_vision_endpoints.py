@@ -1,11 +1,19 @@
+import hashlib
 import pytest
 from httpx import AsyncClient, ASGITransport
-from unittest.mock import Mock, patch, AsyncMock
+from unittest.mock import ANY, Mock, patch, AsyncMock
 from uuid import uuid4
 from datetime import datetime, timezone
 from app.main import app
 from app.models import Task, TaskStatus
 from io import BytesIO
+import numpy as np
+import cv2
+
+
+def jpeg_bytes() -> bytes:
+    # JPEG real: la API valida la cabecera antes de almacenar
+    return cv2.imencode(".jpg", np.zeros((32, 32, 3), dtype=np.uint8))[1].tobytes()
 
 
 @pytest.fixture
@@ -40,19 +48,17 @@ class TestAnalyzeEndpoint:
     # Tests para el endpoint POST /analyze
     
     @pytest.mark.asyncio
-    @patch('app.routers.vision.MinioService')
-    @patch('app.routers.vision.process_image')
-    async def test_analyze_image_success(self, mock_process_image, mock_minio_service):
+    @patch('app.services.storage.create_storage')
+    @patch('app.routers.vision.add_to_outbox')
+    async def test_analyze_image_success(self, mock_add_to_outbox, mock_minio_service):
         # Test: Subir imagen exitosamente
         # Arrange
         mock_minio_instance = Mock()
-        mock_minio_instance.upload_file.return_value = "stored_filename.jpg"
+        mock_minio_instance.exists.return_value = False
         mock_minio_service.return_value = mock_minio_instance
         
-        mock_process_image.delay = Mock()
-        
         # Crear imagen de prueba
-        image_content = b"fake image content"
+        image_content = jpeg_bytes()
         files = {"file": ("test.jpg", BytesIO(image_content), "image/jpeg")}
         
         # Act
@@ -67,9 +73,11 @@ class TestAnalyzeEndpoint:
         data = response.json()
         assert "id" in data
         assert data["status"] == "PENDING"
-        assert data["filename"] == "stored_filename.jpg"
-        mock_minio_instance.upload_file.assert_called_once()
-        mock_process_image.delay.assert_called_once()
+        assert data["filename"] == f"{hashlib.sha256(image_content).hexdigest()}.jpg"
+        mock_minio_instance.upload_file.assert_called_once_with(image_content, data["filename"])
+        mock_add_to_outbox.assert_called_once_with(
+            ANY, "process_image", args=[data["id"]], kwargs={"spooled": False}
+        )
     
     @pytest.mark.asyncio
     async def test_analyze_invalid_file_type(self):
@@ -89,23 +97,33 @@ class TestAnalyzeEndpoint:
         assert "imagen" in response.json()["detail"].lower()
     
     @pytest.mark.asyncio
-    @patch('app.routers.vision.MinioService')
+    @patch('app.services.storage.create_storage')
     async def test_analyze_minio_error(self, mock_minio_service):
         # Test: Error al subir a MinIO
         # Arrange
         from app.services.storage import MinioServiceError
         mock_minio_instance = Mock()
+        mock_minio_instance.exists.return_value = False
         mock_minio_instance.upload_file.side_effect = MinioServiceError("Connection failed")
         mock_minio_service.return_value = mock_minio_instance
         
-        files = {"file": ("test.jpg", BytesIO(b"image"), "image/jpeg")}
+        from app.routers.vision import get_async_db
+        
+        async def override_get_db():
+            yield AsyncMock()
+        
+        app.dependency_overrides[get_async_db] = override_get_db
+        files = {"file": ("test.jpg", BytesIO(jpeg_bytes()), "image/jpeg")}
         
         # Act
-        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
-            response = await client.post(
-                "/api/v1/vision/analyze",
-                files=files
-            )
+        try:
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                response = await client.post(
+                    "/api/v1/vision/analyze",
+                    files=files
+                )
+        finally:
+            app.dependency_overrides.clear()
         
         # Assert
         assert response.status_code == 500
@@ -215,6 +233,71 @@ class TestDownloadResultEndpoint:
         finally:
             app.dependency_overrides.clear()
     
+    @pytest.mark.asyncio
+    async def test_download_result_from_local_storage(self, completed_task, tmp_path):
+        # Test: Con almacenamiento local el resultado se sirve directamente desde disco
+        # Arrange
+        from app.routers.vision import get_async_db, get_minio_service
+        from app.services.storage import LocalStorageService
+        
+        async def override_get_db():
+            mock_db = AsyncMock()
+            mock_result = Mock()
+            mock_result.scalar_one_or_none.return_value = completed_task
+            mock_db.execute.return_value = mock_result
+            yield mock_db
+        
+        storage = LocalStorageService(str(tmp_path))
+        storage.upload_file(b"processed image data", "processed_test_image.png")
+        app.dependency_overrides[get_async_db] = override_get_db
+        app.dependency_overrides[get_minio_service] = lambda: storage
+        
+        try:
+            # Act
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                response = await client.get(
+                    f"/api/v1/vision/tasks/{completed_task.id}/result"
+                )
+            
+            # Assert
+            assert response.status_code == 200
+            assert response.content == b"processed image data"
+            assert response.headers["content-length"] == str(len(b"processed image data"))
+            assert "attachment" in response.headers["content-disposition"]
+        finally:
+            app.dependency_overrides.clear()
+    
+    @pytest.mark.asyncio
+    async def test_download_result_missing_local_file(self, completed_task, tmp_path):
+        # Test: Si el resultado ya no está en disco se responde 404 en lugar de fallar al enviarlo
+        # Arrange
+        from app.routers.vision import get_async_db, get_minio_service
+        from app.services.storage import LocalStorageService
+        
+        async def override_get_db():
+            mock_db = AsyncMock()
+            mock_result = Mock()
+            mock_result.scalar_one_or_none.return_value = completed_task
+            mock_db.execute.return_value = mock_result
+            yield mock_db
+        
+        storage = LocalStorageService(str(tmp_path))
+        app.dependency_overrides[get_async_db] = override_get_db
+        app.dependency_overrides[get_minio_service] = lambda: storage
+        
+        try:
+            # Act
+            async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+                response = await client.get(
+                    f"/api/v1/vision/tasks/{completed_task.id}/result"
+                )
+            
+            # Assert
+            assert response.status_code == 404
+            assert "processed_test_image.png" in response.json()["detail"]
+        finally:
+            app.dependency_overrides.clear()
+    
     @pytest.mark.asyncio
     async def test_download_result_task_not_completed(self, mock_task):
         # Test: Intentar descargar de tarea no completada
@@ -4,13 +4,15 @@ from uuid import uuid4
 import numpy as np
 from app.worker import process_image
 from app.models import Task, TaskStatus
+from app.core.config import settings
+from app.services.storage import TransientStorageError
 
 
 class TestProcessImageWorker:
     """Tests para la función process_image del worker"""
     
     @patch('app.worker.SessionLocalSync')
-    @patch('app.worker.MinioService')
+    @patch('app.services.storage.create_storage')
     @patch('app.worker.cv2')
     def test_process_image_success(self, mock_cv2, mock_minio_service, mock_session):
         """Test: Procesamiento exitoso de imagen"""
@@ -78,7 +80,7 @@ class TestProcessImageWorker:
         assert result is False
     
     @patch('app.worker.SessionLocalSync')
-    @patch('app.worker.MinioService')
+    @patch('app.services.storage.create_storage')
     def test_process_image_minio_download_error(self, mock_minio_service, mock_session):
         """Test: Error al descargar de MinIO"""
         # Arrange
@@ -113,7 +115,7 @@ class TestProcessImageWorker:
         mock_db.commit.assert_called()
     
     @patch('app.worker.SessionLocalSync')
-    @patch('app.worker.MinioService')
+    @patch('app.services.storage.create_storage')
     @patch('app.worker.cv2')
     def test_process_image_opencv_decode_error(self, mock_cv2, mock_minio_service, mock_session):
         """Test: Error al decodificar imagen con OpenCV"""
@@ -152,7 +154,7 @@ class TestProcessImageWorker:
         mock_db.commit.assert_called()
     
     @patch('app.worker.SessionLocalSync')
-    @patch('app.worker.MinioService')
+    @patch('app.services.storage.create_storage')
     @patch('app.worker.cv2')
     def test_process_image_opencv_encode_error(self, mock_cv2, mock_minio_service, mock_session):
         """Test: Error al codificar imagen con OpenCV"""
@@ -198,7 +200,7 @@ class TestProcessImageWorker:
         mock_db.commit.assert_called()
     
     @patch('app.worker.SessionLocalSync')
-    @patch('app.worker.MinioService')
+    @patch('app.services.storage.create_storage')
     @patch('app.worker.cv2')
     def test_process_image_minio_upload_error(self, mock_cv2, mock_minio_service, mock_session):
         """Test: Error al subir imagen procesada a MinIO"""
@@ -246,7 +248,7 @@ class TestProcessImageWorker:
         mock_db.commit.assert_called()
     
     @patch('app.worker.SessionLocalSync')
-    @patch('app.worker.MinioService')
+    @patch('app.services.storage.create_storage')
     @patch('app.worker.cv2')
     def test_process_image_updates_status_to_processing(self, mock_cv2, mock_minio_service, mock_session):
         """Test: Verifica que el status se actualiza a PROCESSING al inicio"""
@@ -290,3 +292,175 @@ class TestProcessImageWorker:
         assert mock_db.commit.call_count >= 2  # Al menos 2 commits: PROCESSING y COMPLETED
         # El status final debe ser COMPLETED
         assert mock_task.status == TaskStatus.COMPLETED
+
+    @patch('app.worker.SessionLocalSync')
+    @patch('app.services.storage.create_storage')
+    @patch('app.worker.cv2')
+    def test_process_image_records_timings(self, mock_cv2, mock_minio_service, mock_session):
+        """Test: Se persiste el desglose de tiempos, dimensiones y tamaños"""
+        # Arrange
+        task_id = str(uuid4())
+        
+        # Mock de la tarea
+        mock_task = Mock(spec=Task)
+        mock_task.id = task_id
+        mock_task.filename = "test_image.jpg"
+        mock_task.status = TaskStatus.PENDING
+        
+        # Mock de la sesión de BD
+        mock_db = Mock()
+        mock_db.query.return_value.filter.return_value.first.return_value = mock_task
+        mock_session.return_value.__enter__.return_value = mock_db
+        mock_session.return_value.__exit__.return_value = None
+        
+        # Mock de MinIO
+        mock_minio_instance = Mock()
+        mock_minio_instance.get_file.return_value = b"fake image data"
+        mock_minio_service.return_value = mock_minio_instance
+        
+        # Mock de OpenCV
+        fake_image = np.zeros((120, 160, 3), dtype=np.uint8)
+        fake_gray = np.zeros((120, 160), dtype=np.uint8)
+        fake_edges = np.zeros((120, 160), dtype=np.uint8)
+        fake_buffer = np.zeros((1000, 1), dtype=np.uint8)
+        
+        mock_cv2.imdecode.return_value = fake_image
+        mock_cv2.cvtColor.return_value = fake_gray
+        mock_cv2.Canny.return_value = fake_edges
+        mock_cv2.imencode.return_value = (True, fake_buffer)
+        
+        # Act
+        result = process_image(task_id)
+        
+        # Assert
+        assert result is True
+        assert mock_task.started_at is not None
+        assert mock_task.finished_at >= mock_task.started_at
+        timings = mock_task.timings
+        assert timings["input_width"] == 160
+        assert timings["input_height"] == 120
+        assert timings["input_bytes"] == len(b"fake image data")
+        assert timings["output_bytes"] == 1000
+        for stage in ("download", "decode", "process", "encode", "upload"):
+            assert f"{stage}_ms" in timings
+
+
+class TestProcessImageRetries:
+    """Tests para los reintentos ante errores transitorios"""
+
+    def make_task(self, mock_session):
+        task_id = str(uuid4())
+        mock_task = Mock(spec=Task)
+        mock_task.id = task_id
+        mock_task.filename = "test_image.jpg"
+        mock_task.status = TaskStatus.PENDING
+
+        mock_db = Mock()
+        mock_db.query.return_value.filter.return_value.first.return_value = mock_task
+        mock_session.return_value.__enter__.return_value = mock_db
+        mock_session.return_value.__exit__.return_value = None
+        return task_id, mock_task, mock_db
+
+    def mock_opencv(self, mock_cv2):
+        mock_cv2.imdecode.return_value = np.zeros((100, 100, 3), dtype=np.uint8)
+        mock_cv2.cvtColor.return_value = np.zeros((100, 100), dtype=np.uint8)
+        mock_cv2.Canny.return_value = np.zeros((100, 100), dtype=np.uint8)
+        mock_cv2.imencode.return_value = (True, np.zeros((1000, 1), dtype=np.uint8))
+
+    @patch('app.worker.SessionLocalSync')
+    @patch('app.services.storage.create_storage')
+    def test_transient_error_schedules_retry(self, mock_minio_service, mock_session):
+        """Test: Un error transitorio deja la tarea en PENDING y se relanza para el autoretry"""
+        # Arrange
+        task_id, mock_task, mock_db = self.make_task(mock_session)
+        mock_minio_instance = Mock()
+        mock_minio_instance.get_file.side_effect = TransientStorageError("503 Service Unavailable")
+        mock_minio_service.return_value = mock_minio_instance
+
+        # Act & Assert
+        with pytest.raises(TransientStorageError):
+            process_image(task_id)
+
+        assert mock_task.status == TaskStatus.PENDING
+        assert mock_task.result["retries"] == 1
+        mock_db.rollback.assert_called()
+
+    @patch('app.worker.SessionLocalSync')
+    @patch('app.services.storage.create_storage')
+    @patch('app.worker.cv2')
+    def test_retry_reuses_encoded_output(self, mock_cv2, mock_minio_service, mock_session):
+        """Test: Si falla la subida, el reintento en el mismo proceso solo repite la subida"""
+        # Arrange
+        task_id, mock_task, _ = self.make_task(mock_session)
+        self.mock_opencv(mock_cv2)
+        mock_minio_instance = Mock()
+        mock_minio_instance.get_file.return_value = b"fake image data"
+        mock_minio_instance.upload_file.side_effect = [TransientStorageError("timeout"), "processed_test_image.png"]
+        mock_minio_service.return_value = mock_minio_instance
+
+        # Act
+        with pytest.raises(TransientStorageError):
+            process_image(task_id)
+        result = process_image(task_id)
+
+        # Assert
+        assert result is True
+        assert mock_task.status == TaskStatus.COMPLETED
+        assert mock_task.timings["reused_output"] is True
+        mock_minio_instance.get_file.assert_called_once_with("test_image.jpg")
+        mock_cv2.imdecode.assert_called_once()
+        assert mock_minio_instance.upload_file.call_count == 2
+
+    @patch('app.worker.SessionLocalSync')
+    @patch('app.services.storage.create_storage')
+    def test_retries_exhausted_marks_failed(self, mock_minio_service, mock_session):
+        """Test: Agotados los reintentos la tarea queda FAILED"""
+        # Arrange
+        task_id, mock_task, _ = self.make_task(mock_session)
+        mock_minio_instance = Mock()
+        mock_minio_instance.get_file.side_effect = TransientStorageError("503 Service Unavailable")
+        mock_minio_service.return_value = mock_minio_instance
+
+        # Act
+        result = process_image.apply(args=(task_id,), retries=settings.TASK_MAX_RETRIES).get()
+
+        # Assert
+        assert result is False
+        assert mock_task.status == TaskStatus.FAILED
+        assert "503" in mock_task.result["error"]
+
+
+class TestWorkerWarmStart:
+    """Tests para la preparación de cada proceso del worker"""
+
+    @patch('app.worker.engine_sync')
+    @patch('app.services.storage.create_storage')
+    def test_warm_up_prepares_process_resources(self, mock_minio_service, mock_engine):
+        """Test: Se preparan pool, cliente de MinIO y OpenCV, y el cliente se reutiliza en las tareas"""
+        from app import worker
+
+        # Act
+        worker.warm_up_worker_process()
+
+        # Assert
+        mock_engine.dispose.assert_called_once_with(close=False)
+        mock_engine.connect.assert_called_once()
+        mock_minio_service.assert_called_once()
+        assert worker.get_storage() is mock_minio_service.return_value
+        mock_minio_service.assert_called_once()
+
+    @patch('app.worker.engine_sync')
+    @patch('app.services.storage.create_storage')
+    def test_warm_up_tolerates_unavailable_storage(self, mock_minio_service, mock_engine):
+        """Test: Si MinIO no responde el proceso arranca igual y el cliente se crea en la primera tarea"""
+        from app import worker
+        from app.services import storage
+        from app.services.storage import MinioServiceError
+        mock_minio_service.side_effect = [MinioServiceError("sin conexión"), Mock()]
+
+        # Act
+        worker.warm_up_worker_process()
+
+        # Assert
+        assert storage._storage is None
+        assert worker.get_storage() is not None
@@ -1,91 +1,779 @@
-from app.core.celery_app import celery_app
-from app.core.database import SessionLocalSync
-from app.services.storage import MinioService
-from app.models import Task, TaskStatus
+from app.core.celery_app import celery_app, DELIVER_CALLBACKS_TASK, PROCESS_IMAGE_TASK
+from app.core.config import settings
+from app.core.database import SessionLocalSync, engine_sync
+from app.core.metrics import (
+    CALLBACKS_TOTAL,
+    PIPELINE_STAGE_SECONDS,
+    QUEUE_WAIT_SECONDS,
+    TASK_END_TO_END_SECONDS,
+    TASKS_TOTAL,
+    get_registry,
+)
+from app.services.storage import (
+    MinioServiceError,
+    ReusableBuffer,
+    StorageService,
+    TransientStorageError,
+    get_storage,
+)
+from app.services.spool import get_spool
+from app.services.analysis_params import AnalysisParams
+from app.services.image_probe import ImageInfo, InvalidImageError, probe_image
+from app.services.frames import (
+    MULTIPAGE_EXTENSIONS,
+    VideoFrameSink,
+    ZipFrameSink,
+    count_pages,
+    open_multipage,
+    open_video,
+    run_frame_pipeline,
+)
+from app.services.progress import ProgressReporter
+from app.services.callbacks import (
+    CallbackDeliveryError,
+    enqueue_callback,
+    finish_batch,
+    post_batch,
+    take_batch,
+)
+from app.core.redis_client import get_sync_redis
+from app.services.pg_queue import TaskNotifications, claim_batch, reclaim_stale
+from app.models import Task, TaskStatus, MEDIA_TYPE_VIDEO, task_by_id
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown
+from celery.utils.time import get_exponential_backoff_interval
+from collections import OrderedDict
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from prometheus_client import start_http_server, multiprocess
+from sqlalchemy import text
+from sqlalchemy.exc import InterfaceError, OperationalError
 from uuid import UUID
 import numpy as np
 import cv2
+import os
+import socket
+import tempfile
+import time
+
+
+# buffer de lectura reutilizable del proceso (solo si WORKER_REUSE_READ_BUFFER está activo)
+_read_buffer = ReusableBuffer(settings.WORKER_READ_BUFFER_MAX_BYTES) if settings.WORKER_REUSE_READ_BUFFER else None
+
+
+# Errores transitorios: la tarea se reintenta con backoff exponencial y jitter.
+# Cualquier otro error (p. ej. una imagen que no se puede decodificar) falla de inmediato.
+TRANSIENT_ERRORS = (TransientStorageError, OperationalError, InterfaceError)
+
+# salidas codificadas cuya subida falló de forma transitoria, por ID de tarea
+# (si el reintento llega al mismo proceso solo se repite la subida)
+_pending_outputs: OrderedDict = OrderedDict()
+
+
+# Conserva la salida de una tarea para el reintento, respetando WORKER_RETRY_OUTPUT_CACHE_BYTES
+def _keep_output(task_id: str, result: dict, buffer: np.ndarray, timings: dict) -> None:
+    limit = settings.WORKER_RETRY_OUTPUT_CACHE_BYTES
+    if buffer.nbytes > limit:
+        return
+    _pending_outputs[task_id] = (result, buffer, dict(timings))
+    while sum(entry[1].nbytes for entry in _pending_outputs.values()) > limit:
+        _pending_outputs.popitem(last=False)
+
+
+# Segundos transcurridos desde un timestamp de la base de datos (None si no hay timestamp)
+def _seconds_since(timestamp) -> float | None:
+    if not isinstance(timestamp, datetime):
+        return None
+    # algunos drivers (p. ej. SQLite) devuelven timestamps sin zona horaria: se asume UTC
+    if timestamp.tzinfo is None:
+        timestamp = timestamp.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - timestamp).total_seconds()
+
+
+# Registra la transición de estado de la tarea en las métricas
+def _record_status(task: Task, status: TaskStatus) -> None:
+    TASKS_TOTAL.labels(status.value).inc()
+    if status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+        elapsed = _seconds_since(task.created_at)
+        if elapsed is not None:
+            TASK_END_TO_END_SECONDS.labels(status.value).observe(elapsed)
+
+
+class StageTimer:
+    # Mide las etapas del pipeline de una tarea.
+    # Guarda cada etapa en milisegundos (se persiste en Task.timings)
+    # y la observa en el histograma de Prometheus.
+
+    def __init__(self):
+        self.timings: dict = {"worker": socket.gethostname()}
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[f"{name}_ms"] = round(elapsed * 1000, 3)
+            PIPELINE_STAGE_SECONDS.labels(name).observe(elapsed)
+
+
+# Inicia el exportador de métricas en el proceso principal del worker
+@worker_init.connect
+def start_metrics_exporter(**kwargs):
+    if settings.WORKER_METRICS_PORT <= 0:
+        return
+    start_http_server(settings.WORKER_METRICS_PORT, registry=get_registry())
+    print(f"Métricas del worker expuestas en el puerto {settings.WORKER_METRICS_PORT}")
+
+
+# Pasa una imagen sintética por el pipeline de OpenCV (decode -> gris -> Canny -> PNG)
+# para que la primera tarea real no pague la inicialización de códecs y buffers
+def _warm_up_opencv(size: int) -> None:
+    image = np.zeros((size, size, 3), dtype=np.uint8)
+    cv2.rectangle(image, (size // 4, size // 4), (3 * size // 4, 3 * size // 4), (255, 255, 255), -1)
+    for extension in (".jpg", ".png"):
+        success, encoded = cv2.imencode(extension, image)
+        if success:
+            decoded = cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+            cv2.imencode(".png", _edges(decoded))
+
+
+# Prepara cada proceso hijo del worker al crearlo (tras el fork o tras reciclarlo):
+# pool de la base de datos, almacenamiento y OpenCV. Un fallo aquí no impide arrancar,
+# el recurso se crea igualmente en la primera tarea.
+@worker_process_init.connect
+def warm_up_worker_process(**kwargs):
+    if not settings.WORKER_WARM_START:
+        return
+    start = time.perf_counter()
+
+    # las conexiones heredadas del proceso padre no deben usarse después del fork
+    engine_sync.dispose(close=False)
+    try:
+        with engine_sync.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        print(f"No se pudo preparar el pool de la base de datos: {str(e)}")
+
+    try:
+        get_storage()
+    except Exception as e:
+        print(f"No se pudo preparar el almacenamiento: {str(e)}")
+
+    if settings.WORKER_WARMUP_IMAGE_SIZE > 0:
+        _warm_up_opencv(settings.WORKER_WARMUP_IMAGE_SIZE)
+
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"Proceso del worker {os.getpid()} preparado en {elapsed_ms:.1f} ms")
+
+
+# En modo multiproceso, descarta las métricas de procesos hijos que terminan
+@worker_process_shutdown.connect
+def mark_metrics_process_dead(pid=None, **kwargs):
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid or os.getpid())
+
+
+# Nombre del archivo procesado a partir del archivo original. Con parámetros de análisis
+# distintos de los por defecto se añade su clave (el mismo contenido da otro resultado).
+def _processed_filename(filename: str, extension: str, params: AnalysisParams | None = None) -> str:
+    filename_parts = filename.rsplit('.', 1)
+    stem = filename_parts[0] if len(filename_parts) == 2 else filename
+    if params is not None and not params.is_default:
+        stem = f"{stem}_{params.key()}"
+    return f"processed_{stem}.{extension}"
+
+
+# Una tarea es una secuencia de frames si es un video o un TIFF (posiblemente multipágina)
+def _is_frame_sequence(task: Task) -> bool:
+    if task.media_type == MEDIA_TYPE_VIDEO:
+        return True
+    return task.filename.rsplit('.', 1)[-1].lower() in MULTIPAGE_EXTENSIONS
+
+
+# Flags de decodificación reducida de OpenCV por factor (JPEG se decodifica directamente a
+# 1/2, 1/4 o 1/8 del tamaño; el resto de formatos se decodifica completo y se reduce)
+_REDUCED_DECODE_FLAGS = {
+    2: cv2.IMREAD_REDUCED_COLOR_2,
+    4: cv2.IMREAD_REDUCED_COLOR_4,
+    8: cv2.IMREAD_REDUCED_COLOR_8,
+}
+
+
+# Cabecera de la imagen si hace falta para decodificarla reducida (None si no se pide reducir
+# o el formato no se reconoce)
+def _reduction_header(image_data, params: AnalysisParams) -> ImageInfo | None:
+    if params.max_width is None and params.max_height is None:
+        return None
+    try:
+        return probe_image(image_data)
+    except InvalidImageError:
+        return None
+
+
+# Factor de reducción con el que decodificar: el mayor que aún deja la región de interés por
+# encima del tamaño de salida pedido (1 si no hay cabecera)
+def _decode_reduction(info: ImageInfo | None, params: AnalysisParams) -> int:
+    if info is None:
+        return 1
+    width, height = params.region_size(info.width, info.height)
+    if not width or not height:
+        return 1
+    output_width, output_height = params.output_size(width, height)
+    for factor in sorted(_REDUCED_DECODE_FLAGS, reverse=True):
+        if width // factor >= output_width and height // factor >= output_height:
+            return factor
+    return 1
+
+
+# Recorta la región de interés (vista sin copia) y la reduce al tamaño máximo.
+# `factor` es la reducción ya aplicada al decodificar: el ROI está en píxeles de la imagen original.
+# Raises: ValueError: Si la región de interés queda fuera de la imagen
+def _apply_region(image: np.ndarray, params: AnalysisParams, factor: int = 1) -> np.ndarray:
+    if params.roi is not None:
+        x, y, width, height = params.roi
+        image = image[y // factor:-(-(y + height) // factor), x // factor:-(-(x + width) // factor)]
+        if image.size == 0:
+            raise ValueError("La región de interés queda fuera de la imagen")
+    height, width = image.shape[:2]
+    output_width, output_height = params.output_size(width * factor, height * factor)
+    output_size = (min(output_width, width), min(output_height, height))
+    if output_size != (width, height):
+        image = cv2.resize(image, output_size, interpolation=cv2.INTER_AREA)
+    return image
+
+
+# Detección de bordes de un frame BGR (misma operación que para imágenes individuales)
+def _edges(frame: np.ndarray, params: AnalysisParams | None = None) -> np.ndarray:
+    params = params or AnalysisParams()
+    if params.changes_region:
+        frame = _apply_region(frame, params)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    return cv2.Canny(gray, params.canny_low, params.canny_high)
+
+
+# Estadísticas de un mapa de bordes que se guardan en el resultado de la tarea (claves planas
+# para poder filtrarlas e indexarlas en el listado): dimensiones, píxeles de borde y contornos externos
+def _edge_stats(edges: np.ndarray) -> dict:
+    height, width = edges.shape[:2]
+    edge_pixels = int(np.count_nonzero(edges))
+    contours = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[-2]
+    areas = [cv2.contourArea(contour) for contour in contours]
+    return {
+        "width": int(width),
+        "height": int(height),
+        "edge_pixels": edge_pixels,
+        "edge_density": round(edge_pixels / (width * height), 6) if width and height else 0.0,
+        "contour_count": len(areas),
+        "largest_contour_area": float(max(areas, default=0.0)),
+        "mean_contour_area": round(sum(areas) / len(areas), 3) if areas else 0.0,
+    }
+
+
+# Origen de la entrada: el spool local si la API la dejó ahí en este mismo nodo, si no el almacenamiento
+def _input_source(task: Task, minio_service: StorageService, spooled: bool, timer: StageTimer) -> StorageService:
+    spool = get_spool() if spooled else None
+    if spool is not None and spool.find(task.filename) is not None:
+        timer.timings["input_source"] = "spool"
+        return spool
+    return minio_service
+
+
+# Descarga la entrada con `download(origen)`. Las tareas con el mismo contenido comparten
+# el archivo del spool: si otra tarea ya lo liberó, la entrada se descarga del almacenamiento.
+def _download_input(download, minio_service: StorageService, source: StorageService | None, timer: StageTimer):
+    if source is None or source is minio_service:
+        return download(minio_service)
+    try:
+        return download(source)
+    except MinioServiceError:
+        timer.timings.pop("input_source", None)
+        return download(minio_service)
+
+
+# Deja una copia del resultado en el spool local para que la API del nodo lo sirva sin MinIO
+def _spool_output(file_name: str, write, size: int) -> None:
+    spool = get_spool()
+    if spool is None or not spool.accepts(size):
+        return
+    try:
+        write(spool)
+    except MinioServiceError as e:
+        print(f"No se pudo copiar el resultado '{file_name}' al spool local: {str(e)}")
+
+
+# Libera la entrada del spool cuando la tarea termina (con éxito o con un error permanente)
+def _release_spooled_input(task: Task) -> None:
+    spool = get_spool()
+    if spool is not None:
+        spool.discard(task.filename)
+        spool.sweep()
+
+
+# Procesa una imagen individual en memoria y sube el PNG de bordes
+# Returns: dict: resultado de la tarea
+def _process_single_image(task: Task, minio_service: StorageService, timer: StageTimer,
+                          reporter: ProgressReporter | None = None,
+                          source: StorageService | None = None) -> dict:
+    # Reintento de una subida fallida: el PNG ya está codificado en este proceso
+    pending = _pending_outputs.pop(str(task.id), None)
+    if pending is not None:
+        result, buffer, timings = pending
+        processed_filename = result["processed_file"]
+        timer.timings.update(timings)
+        timer.timings["reused_output"] = True
+        with timer.stage("upload"):
+            minio_service.upload_file(buffer, processed_filename)
+        _spool_output(processed_filename, lambda spool: spool.upload_file(buffer, processed_filename), buffer.nbytes)
+        return result
+
+    # Descargar la imagen
+    print(f"Descargando imagen: {task.filename}")
+    with timer.stage("download"):
+        if _read_buffer is not None:
+            read = lambda storage: storage.get_file(task.filename, buffer=_read_buffer)
+        else:
+            read = lambda storage: storage.get_file(task.filename)
+        image_data = _download_input(read, minio_service, source, timer)
+
+    return _process_image_bytes(task, image_data, minio_service, timer, reporter)
+
+
+# Pipeline de OpenCV sobre los bytes de una imagen: decodifica, detecta bordes y codifica
+# el resultado como PNG. Lo usan las tareas del worker y el modo síncrono de la API.
+# Si se pasa `stats`, se completa con las estadísticas de los bordes (_edge_stats).
+# Con `params` la imagen se decodifica reducida cuando basta, se recorta y se reduce antes de
+# la escala de grises y Canny.
+# Returns: np.ndarray: buffer con el PNG codificado
+# Raises: ValueError: Si la imagen no se puede decodificar o codificar, o el ROI queda fuera
+def _detect_edges(image_data, timer: StageTimer, stats: dict | None = None,
+                  params: AnalysisParams | None = None) -> np.ndarray:
+    params = params or AnalysisParams()
+    timer.timings["input_bytes"] = len(image_data)
+    header = _reduction_header(image_data, params)
+    factor = _decode_reduction(header, params)
+
+    # Procesamiento con OpenCV (in-memory)
+    print(f"Procesando imagen con OpenCV...")
+
+    with timer.stage("decode"):
+        # Paso 1: Convertir bytes a numpy array (vista sin copia)
+        nparr = np.frombuffer(image_data, np.uint8)
+
+        # Paso 2: Decodificar a imagen BGR (reducida si el tamaño de salida lo permite)
+        image = cv2.imdecode(nparr, _REDUCED_DECODE_FLAGS.get(factor, cv2.IMREAD_COLOR))
+
+    if image is None:
+        raise ValueError("No se pudo decodificar la imagen")
+
+    # input_* es siempre el tamaño original; con una decodificación reducida sale de la cabecera
+    # y lo decodificado se registra aparte en decoded_*
+    decoded_height, decoded_width = image.shape[:2]
+    if factor > 1:
+        timer.timings["input_width"], timer.timings["input_height"] = header.width, header.height
+    else:
+        timer.timings["input_width"], timer.timings["input_height"] = decoded_width, decoded_height
+
+    # Recortar la región de interés y reducir antes de los pasos costosos
+    if params.changes_region:
+        timer.timings["decode_reduction"] = factor
+        timer.timings["decoded_width"], timer.timings["decoded_height"] = decoded_width, decoded_height
+        with timer.stage("region"):
+            image = _apply_region(image, params, factor)
+
+    # Paso 3: Convertir a escala de grises
+    with timer.stage("grayscale"):
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+    # Paso 4: Aplicar detección de bordes Canny
+    with timer.stage("canny"):
+        edges = cv2.Canny(gray, params.canny_low, params.canny_high)
+
+    # tiempo de procesamiento (escala de grises + Canny)
+    timer.timings["process_ms"] = round(
+        timer.timings["grayscale_ms"] + timer.timings["canny_ms"], 3
+    )
+
+    if stats is not None:
+        with timer.stage("stats"):
+            stats.update(_edge_stats(edges))
+
+    # Paso 5: Codificar de vuelta a bytes (como PNG)
+    # cv2.imencode devuelve (success, buffer) donde buffer es un array numpy
+    with timer.stage("encode"):
+        success, buffer = cv2.imencode('.png', edges)
+
+    if not success:
+        raise ValueError("No se pudo codificar la imagen procesada")
+
+    timer.timings["output_bytes"] = int(buffer.nbytes)
+    return buffer
+
+
+# Pipeline de OpenCV sobre los bytes de una imagen ya descargada
+# Returns: dict: resultado de la tarea
+def _process_image_bytes(task: Task, image_data, minio_service: StorageService, timer: StageTimer,
+                         reporter: ProgressReporter | None = None) -> dict:
+    if reporter is not None:
+        reporter.report(0.25)
+
+    params = AnalysisParams.from_json(task.params)
+    stats = {}
+    buffer = _detect_edges(image_data, timer, stats, params)
+    if reporter is not None:
+        reporter.report(0.7)
+
+    # El buffer numpy del PNG se sube directamente, sin copiarlo a bytes
+    # Transformar el nombre del archivo
+    processed_filename = _processed_filename(task.filename, "png", params)
+    result = {"processed_file": processed_filename, **stats}
+
+    # Subir el archivo procesado
+    try:
+        with timer.stage("upload"):
+            minio_service.upload_file(buffer, processed_filename)
+    except TransientStorageError:
+        _keep_output(str(task.id), result, buffer, timer.timings)
+        raise
+    _spool_output(processed_filename, lambda spool: spool.upload_file(buffer, processed_filename), buffer.nbytes)
+
+    return result
+
+
+# Procesa un video o TIFF multipágina frame a frame, sin cargarlo completo en memoria.
+# El archivo se descarga a disco por bloques, los frames se decodifican de forma
+# incremental en un pipeline acotado y la salida se escribe a disco antes de subirla.
+# Returns: dict: resultado de la tarea
+def _process_frame_sequence(task: Task, minio_service: StorageService, timer: StageTimer,
+                            reporter: ProgressReporter, source: StorageService | None = None) -> dict:
+    extension = task.filename.rsplit('.', 1)[-1].lower() if '.' in task.filename else "bin"
+
+    with tempfile.TemporaryDirectory(dir=settings.WORKER_TMP_DIR) as tmp:
+        input_path = os.path.join(tmp, f"input.{extension}")
+
+        print(f"Descargando secuencia: {task.filename}")
+        with timer.stage("download"):
+            with open(input_path, "wb") as f:
+                def read(storage: StorageService):
+                    f.seek(0)
+                    f.truncate()
+                    storage.download_to_file(task.filename, f)
+                _download_input(read, minio_service, source, timer)
+        timer.timings["input_bytes"] = os.path.getsize(input_path)
+
+        if task.media_type == MEDIA_TYPE_VIDEO:
+            total, fps, frames = open_video(input_path)
+            output_path = os.path.join(tmp, "output.mp4")
+            sink = VideoFrameSink(output_path, fps)
+        else:
+            if count_pages(input_path) <= 1:
+                # TIFF de una sola página: mismo camino que cualquier imagen
+                with open(input_path, "rb") as f:
+                    return _process_image_bytes(task, f.read(), minio_service, timer, reporter)
+            total, frames = open_multipage(input_path)
+            output_path = os.path.join(tmp, "output.zip")
+            sink = ZipFrameSink(output_path)
+
+        params = AnalysisParams.from_json(task.params)
+        first_frame_shape = []
+        output_shape = []
+        # píxeles de borde de todos los frames (los contornos se calculan solo en imágenes)
+        edge_pixels = [0]
+
+        def process(frame: np.ndarray) -> np.ndarray:
+            if not first_frame_shape:
+                first_frame_shape.extend(frame.shape[:2])
+            edges = _edges(frame, params)
+            if not output_shape:
+                output_shape.extend(edges.shape[:2])
+            edge_pixels[0] += int(np.count_nonzero(edges))
+            return edges
+
+        print(f"Procesando {total or 'desconocido'} frames con OpenCV...")
+        with timer.stage("process"):
+            processed = run_frame_pipeline(
+                frames, process, sink,
+                depth=settings.FRAME_PIPELINE_DEPTH,
+                on_progress=lambda count: reporter.frames(count, total),
+            )
+
+        if processed == 0:
+            raise ValueError("No se pudo decodificar ningún frame")
+
+        timer.timings["frames"] = processed
+        timer.timings["input_height"], timer.timings["input_width"] = first_frame_shape
+        timer.timings["output_bytes"] = os.path.getsize(output_path)
+
+        processed_filename = _processed_filename(task.filename, sink.extension, params)
+        with timer.stage("upload"):
+            with open(output_path, "rb") as f:
+                minio_service.upload_from_file(f, processed_filename)
+
+        def write_output(spool):
+            with open(output_path, "rb") as f:
+                spool.upload_from_file(f, processed_filename)
+        _spool_output(processed_filename, write_output, timer.timings["output_bytes"])
+
+    height, width = output_shape
+    return {
+        "processed_file": processed_filename,
+        "frames": processed,
+        "width": int(width),
+        "height": int(height),
+        "edge_pixels": edge_pixels[0],
+        "edge_density": round(edge_pixels[0] / (width * height * processed), 6) if width and height else 0.0,
+    }
+
+
+# Marca la tarea como fallida de forma definitiva
+def _mark_failed(db, task: Task, error: Exception, timer: StageTimer, reporter: ProgressReporter) -> None:
+    task.status = TaskStatus.FAILED
+    task.result = {"error": str(error)}
+    task.finished_at = datetime.now(timezone.utc)
+    task.timings = timer.timings
+    db.commit()
+    _record_status(task, TaskStatus.FAILED)
+    reporter.report(reporter.progress, TaskStatus.FAILED.value, force=True)
+    enqueue_callback(task)
+
+
+# Devuelve la tarea a PENDING mientras espera el reintento (disponible de nuevo tras `delay` segundos).
+# Si la base de datos sigue caída no se puede registrar, pero el reintento se programa igual.
+def _mark_retrying(db, task: Task, error: Exception, attempt: int, reporter: ProgressReporter,
+                   delay: float = 0.0) -> None:
+    try:
+        db.rollback()
+        task.status = TaskStatus.PENDING
+        task.result = {"error": str(error), "retries": attempt}
+        task.queued_at = datetime.now(timezone.utc) + timedelta(seconds=delay)
+        db.commit()
+    except Exception as e:
+        print(f"No se pudo registrar el reintento de la tarea {task.id}: {str(e)}")
+    TASKS_TOTAL.labels("RETRY").inc()
+    reporter.report(0.0, TaskStatus.PENDING.value, force=True)
+
+
+# Procesa una tarea ya cargada: la pasa a PROCESSING, ejecuta el pipeline y registra el resultado.
+# Lo comparten la tarea de Celery y el consumidor de la cola de PostgreSQL.
+# Args:
+#      attempt: número de intento (1 para la primera ejecución)
+#      max_retries: reintentos permitidos ante errores transitorios
+#      retry_delay: segundos hasta que la tarea vuelva a estar disponible si se reintenta
+# Returns: bool: True si el procesamiento fue exitoso
+# Raises: TRANSIENT_ERRORS: Si el error es transitorio y quedan reintentos (tarea ya en PENDING)
+def _run_task(db, task: Task, spooled: bool, attempt: int, max_retries: int, retry_delay: float = 0.0) -> bool:
+    task_id = str(task.id)
+
+    # Actualizar status a PROCESSING
+    task.status = TaskStatus.PROCESSING
+    task.started_at = datetime.now(timezone.utc)
+    db.commit()
+    _record_status(task, TaskStatus.PROCESSING)
+    queue_wait = _seconds_since(task.queued_at)
+    if queue_wait is None:
+        queue_wait = _seconds_since(task.created_at)
+    if queue_wait is not None:
+        QUEUE_WAIT_SECONDS.observe(queue_wait)
+
+    timer = StageTimer()
+    reporter = ProgressReporter(task_id, db=db, task=task)
+    reporter.report(0.0, TaskStatus.PROCESSING.value, force=True)
+
+    # Bloque try/except para el procesamiento
+    try:
+        # Almacenamiento del proceso (preparado en worker_process_init)
+        minio_service = get_storage()
+        source = _input_source(task, minio_service, spooled, timer)
+
+        if _is_frame_sequence(task):
+            result = _process_frame_sequence(task, minio_service, timer, reporter, source)
+        else:
+            result = _process_single_image(task, minio_service, timer, reporter, source)
+
+        # Actualizar la tarea como completada
+        task.status = TaskStatus.COMPLETED
+        task.result = result
+        task.progress = 1.0
+        task.finished_at = datetime.now(timezone.utc)
+        task.timings = timer.timings
+        db.commit()
+        _record_status(task, TaskStatus.COMPLETED)
+        reporter.report(1.0, TaskStatus.COMPLETED.value, force=True)
+        _release_spooled_input(task)
+        enqueue_callback(task)
+
+        print(f"Tarea {task_id} completada exitosamente")
+        return True
+
+    except TRANSIENT_ERRORS as e:
+        if attempt <= max_retries:
+            print(f"Error transitorio en la tarea {task_id} (reintento {attempt}/{max_retries}): {str(e)}")
+            _mark_retrying(db, task, e, attempt, reporter, retry_delay)
+            raise
+
+        print(f"Error procesando tarea {task_id} tras {max_retries} reintentos: {str(e)}")
+        db.rollback()
+        _mark_failed(db, task, e, timer, reporter)
+        _release_spooled_input(task)
+        return False
+
+    except Exception as e:
+        # Actualizar la tarea como fallida
+        print(f"Error procesando tarea {task_id}: {str(e)}")
+        _mark_failed(db, task, e, timer, reporter)
+        _release_spooled_input(task)
+        return False
+
 
 # Procesa una imagen de forma asíncrona
-# Args: task_id: ID de la tarea a procesar (UUID como string)
+# Los errores transitorios (TRANSIENT_ERRORS) se reintentan con autoretry de Celery:
+# backoff exponencial con jitter, hasta TASK_MAX_RETRIES reintentos.
+# Args:
+#      task_id: ID de la tarea a procesar (UUID como string)
+#      spooled: la API dejó la entrada en el spool local de su nodo
 # Returns: bool: True si el procesamiento fue exitoso
-@celery_app.task(name="process_image")
-def process_image(task_id: str) -> bool:
+@celery_app.task(
+    name=PROCESS_IMAGE_TASK,
+    bind=True,
+    ignore_result=True,
+    autoretry_for=TRANSIENT_ERRORS,
+    max_retries=settings.TASK_MAX_RETRIES,
+    retry_backoff=settings.TASK_RETRY_BACKOFF_SECONDS,
+    retry_backoff_max=settings.TASK_RETRY_BACKOFF_MAX_SECONDS,
+    retry_jitter=True,
+)
+def process_image(self, task_id: str, spooled: bool = False) -> bool:
     print(f"Procesando tarea {task_id}")
-    
+
     # Abrir sesión síncrona de base de datos
     with SessionLocalSync() as db:
         # Buscar la tarea por ID
-        task = db.query(Task).filter(Task.id == UUID(task_id)).first()
-        
+        task = db.query(Task).filter(task_by_id(UUID(task_id))).first()
+
         if not task:
             print(f"Tarea {task_id} no encontrada")
             return False
-        
-        # Actualizar status a PROCESSING
-        task.status = TaskStatus.PROCESSING
-        db.commit()
-        
-        # Bloque try/except para el procesamiento
+
+        # El outbox entrega al menos una vez: un mensaje repetido de una tarea terminada se ignora
+        if task.status in (TaskStatus.COMPLETED, TaskStatus.FAILED):
+            print(f"Tarea {task_id} ya terminada ({task.status.value}), se ignora")
+            return task.status == TaskStatus.COMPLETED
+
+        # autoretry_for vuelve a encolar la tarea con backoff si _run_task relanza el error
+        return _run_task(db, task, spooled, self.request.retries + 1, self.max_retries)
+
+
+# Procesa una tarea reclamada de la cola de PostgreSQL (ya en PROCESSING).
+# Un error transitorio la devuelve a PENDING con queued_at en el futuro (backoff con jitter),
+# así que ningún worker la vuelve a reclamar antes de tiempo.
+# Returns: bool: True si el procesamiento fue exitoso
+def process_claimed_task(task_id: UUID) -> bool:
+    print(f"Procesando tarea {task_id} (cola de PostgreSQL)")
+
+    with SessionLocalSync() as db:
+        task = db.query(Task).filter(task_by_id(task_id)).first()
+        if not task:
+            print(f"Tarea {task_id} no encontrada")
+            return False
+
+        retries = (task.result or {}).get("retries", 0)
+        retry_delay = get_exponential_backoff_interval(
+            settings.TASK_RETRY_BACKOFF_SECONDS,
+            retries,
+            settings.TASK_RETRY_BACKOFF_MAX_SECONDS,
+            full_jitter=True,
+        )
+        # la entrada puede estar en el spool si la API corre en este nodo (si no, se usa MinIO)
         try:
-            # Instanciar MinioService
-            minio_service = MinioService()
-            
-            # Descargar la imagen
-            print(f"Descargando imagen: {task.filename}")
-            image_data = minio_service.get_file(task.filename)
-            
-            # Procesamiento con OpenCV (in-memory)
-            print(f"Procesando imagen con OpenCV...")
-            
-            # Paso 1: Convertir bytes a numpy array
-            nparr = np.frombuffer(image_data, np.uint8)
-            
-            # Paso 2: Decodificar a imagen BGR
-            image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
-            
-            if image is None:
-                raise ValueError("No se pudo decodificar la imagen")
-            
-            # Paso 3: Convertir a escala de grises
-            gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-            
-            # Paso 4: Aplicar detección de bordes Canny
-            edges = cv2.Canny(gray, 100, 200)
-            
-            # Paso 5: Codificar de vuelta a bytes (como PNG)
-            # cv2.imencode devuelve (success, buffer) donde buffer es un array numpy
-            success, buffer = cv2.imencode('.png', edges)
-            
-            if not success:
-                raise ValueError("No se pudo codificar la imagen procesada")
-            
-            # Convertir el buffer numpy a bytes del PNG
-            processed_image_data = bytes(buffer)
-            
-            # Transformar el nombre del archivo
-            filename_parts = task.filename.rsplit('.', 1)
-            if len(filename_parts) == 2:
-                processed_filename = f"processed_{filename_parts[0]}.png"
-            else:
-                processed_filename = f"processed_{task.filename}.png"
-            
-            # Subir el archivo procesado
-            minio_service.upload_file(processed_image_data, processed_filename)
-            
-            # Actualizar la tarea como completada
-            task.status = TaskStatus.COMPLETED
-            task.result = {"processed_file": processed_filename}
-            db.commit()
-            
-            print(f"Tarea {task_id} completada exitosamente")
-            return True
-            
-        except Exception as e:
-            # Actualizar la tarea como fallida
-            print(f"Error procesando tarea {task_id}: {str(e)}")
-            task.status = TaskStatus.FAILED
-            task.result = {"error": str(e)}
-            db.commit()
-            
+            return _run_task(db, task, True, retries + 1, settings.TASK_MAX_RETRIES, retry_delay)
+        except TRANSIENT_ERRORS:
             return False
+
+
+# Bucle del worker de la cola de PostgreSQL: reclama lotes de PG_QUEUE_BATCH_SIZE tareas y
+# las procesa en este proceso. Entre lotes espera un NOTIFY o PG_QUEUE_POLL_INTERVAL_SECONDS.
+# Args:
+#      max_batches: para tras este número de lotes no vacíos (None: sin límite)
+def run_pg_queue(max_batches: int | None = None) -> None:
+    notifications = TaskNotifications(engine_sync)
+    last_reclaim = 0.0
+    batches = 0
+    print(f"Worker de la cola de PostgreSQL escuchando en '{notifications.channel}'")
+
+    try:
+        while max_batches is None or batches < max_batches:
+            try:
+                # se escucha antes de reclamar para no perder los avisos del lote en curso
+                if not notifications.listening:
+                    notifications.listen()
+
+                now = time.monotonic()
+                if now - last_reclaim >= settings.PG_QUEUE_STALE_SECONDS / 2:
+                    last_reclaim = now
+                    with SessionLocalSync() as db:
+                        for task in reclaim_stale(db, settings.PG_QUEUE_STALE_SECONDS, settings.TASK_MAX_RETRIES):
+                            print(f"Tarea {task.id} recuperada de un worker inactivo ({task.status.value})")
+
+                with SessionLocalSync() as db:
+                    task_ids = claim_batch(db, settings.PG_QUEUE_BATCH_SIZE)
+            except TRANSIENT_ERRORS as e:
+                print(f"Base de datos no disponible para la cola: {str(e)}")
+                notifications.close()
+                time.sleep(settings.PG_QUEUE_POLL_INTERVAL_SECONDS)
+                continue
+
+            for task_id in task_ids:
+                try:
+                    process_claimed_task(task_id)
+                except Exception as e:
+                    # la tarea queda PROCESSING y se recupera al vencer PG_QUEUE_STALE_SECONDS
+                    print(f"Error inesperado en la tarea {task_id}: {str(e)}")
+
+            if task_ids:
+                batches += 1
+            # con un lote completo probablemente quedan más tareas: no se espera
+            if len(task_ids) < settings.PG_QUEUE_BATCH_SIZE:
+                try:
+                    notifications.wait(settings.PG_QUEUE_POLL_INTERVAL_SECONDS)
+                except Exception as e:
+                    print(f"Se perdió la conexión de LISTEN: {str(e)}")
+                    notifications.close()
+    finally:
+        notifications.close()
+
+
+# Entrega los callbacks acumulados para un endpoint en un solo POST.
+# Solo hay una entrega programada por endpoint: los eventos que llegan mientras tanto
+# esperan en Redis y salen en el siguiente lote. Un lote que falla viaja en los argumentos
+# del reintento (ya no está en Redis) con backoff exponencial y jitter.
+# Args:
+#      url: endpoint de callback
+#      events: lote pendiente de un intento anterior (None para tomar uno nuevo de Redis)
+# Returns: int: número de eventos entregados
+@celery_app.task(name=DELIVER_CALLBACKS_TASK, bind=True, ignore_result=True, max_retries=settings.CALLBACK_MAX_RETRIES)
+def deliver_callbacks(self, url: str, events: list | None = None) -> int:
+    redis_client = get_sync_redis()
+    if events is None:
+        events = take_batch(url, redis_client)
+
+    delivered = 0
+    if events:
+        try:
+            post_batch(url, events)
+            delivered = len(events)
+            CALLBACKS_TOTAL.labels("delivered").inc(delivered)
+        except CallbackDeliveryError as e:
+            if e.retryable and self.request.retries < self.max_retries:
+                CALLBACKS_TOTAL.labels("retried").inc(len(events))
+                countdown = get_exponential_backoff_interval(
+                    settings.CALLBACK_RETRY_BACKOFF_SECONDS,
+                    self.request.retries,
+                    settings.CALLBACK_RETRY_BACKOFF_MAX_SECONDS,
+                    full_jitter=True,
+                )
+                raise self.retry(args=[url, events], countdown=countdown, exc=e)
+            print(f"Se descartan {len(events)} callbacks para '{url}': {str(e)}")
+            CALLBACKS_TOTAL.labels("dropped").inc(len(events))
+
+    finish_batch(url, redis_client)
+    return delivered
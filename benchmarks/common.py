@@ -0,0 +1,128 @@
+import json
+import platform
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+import numpy as np
+import cv2
+
+# Utilidades compartidas por los benchmarks: estadísticas, imágenes sintéticas
+# y guardado/comparación de resultados.
+
+RESULTS_DIR = Path(__file__).parent / "results"
+
+
+# Resume una lista de latencias (segundos) en throughput y percentiles (ms)
+# Args:
+#      latencies: latencia de cada operación en segundos
+#      wall_seconds: tiempo total de la fase (para el throughput)
+def summarize(latencies: list[float], wall_seconds: float) -> dict:
+    if not latencies:
+        return {"count": 0}
+    values = np.asarray(latencies) * 1000
+    return {
+        "count": len(latencies),
+        "seconds": round(wall_seconds, 4),
+        "throughput": round(len(latencies) / wall_seconds, 2) if wall_seconds > 0 else None,
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p95_ms": round(float(np.percentile(values, 95)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+    }
+
+
+# Genera una imagen sintética con bordes (figuras + ruido) para que Canny tenga trabajo real
+# Args:
+#      width, height: dimensiones en píxeles
+#      seed: semilla para que la imagen sea reproducible
+def synthetic_image(width: int, height: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    image = rng.integers(0, 40, size=(height, width, 3), dtype=np.uint8)
+    for _ in range(max(4, (width * height) // 40000)):
+        x, y = int(rng.integers(0, width)), int(rng.integers(0, height))
+        radius = int(rng.integers(4, max(5, min(width, height) // 6)))
+        color = tuple(int(c) for c in rng.integers(60, 255, size=3))
+        cv2.circle(image, (x, y), radius, color, -1)
+        cv2.rectangle(image, (x, y), (x + radius, y + radius // 2), color[::-1], 2)
+    return image
+
+
+# Codifica una imagen sintética en el formato indicado (extensión sin punto)
+def synthetic_image_bytes(width: int, height: int, fmt: str = "jpg", seed: int = 0) -> bytes:
+    success, buffer = cv2.imencode(f".{fmt}", synthetic_image(width, height, seed))
+    if not success:
+        raise ValueError(f"No se pudo codificar la imagen sintética como {fmt}")
+    return buffer.tobytes()
+
+
+# Hash corto del commit actual (con sufijo -dirty si hay cambios sin commitear)
+def git_revision() -> str:
+    try:
+        sha = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+        return f"{sha}-dirty" if dirty else sha
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+# Metadatos del entorno para poder comparar resultados entre máquinas y commits
+def environment_metadata(extra: dict | None = None) -> dict:
+    meta = {
+        "commit": git_revision(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "opencv": cv2.__version__,
+        "numpy": np.__version__,
+    }
+    meta.update(extra or {})
+    return meta
+
+
+# Guarda los resultados en benchmarks/results/<suite>-<commit>-<fecha>.json
+# Returns: Path: ruta del archivo guardado
+def save_results(suite: str, meta: dict, results: dict, output: str | None = None) -> Path:
+    if output:
+        path = Path(output)
+    else:
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+        path = RESULTS_DIR / f"{suite}-{meta['commit']}-{stamp}.json"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps({"suite": suite, "meta": meta, "results": results}, indent=2))
+    return path
+
+
+# Aplana {"fase": {"metrica": valor}} (con anidamiento) a {"fase.metrica": valor}
+def _flatten(results: dict, prefix: str = "") -> dict:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+# Compara dos archivos de resultados e imprime la variación de cada métrica
+def compare_results(baseline_path: str, candidate_path: str) -> None:
+    baseline = json.loads(Path(baseline_path).read_text())
+    candidate = json.loads(Path(candidate_path).read_text())
+    base = _flatten(baseline["results"])
+    cand = _flatten(candidate["results"])
+
+    print(f"baseline:  {baseline['meta']['commit']} ({baseline_path})")
+    print(f"candidato: {candidate['meta']['commit']} ({candidate_path})")
+    print(f"{'métrica':<48} {'baseline':>12} {'candidato':>12} {'cambio':>9}")
+    for name in sorted(base.keys() & cand.keys()):
+        if name.endswith(".count") or name.endswith(".seconds"):
+            continue
+        old, new = base[name], cand[name]
+        change = f"{(new - old) / old * 100:+.1f}%" if old else "-"
+        print(f"{name:<48} {old:>12} {new:>12} {change:>9}")
@@ -0,0 +1,173 @@
+import argparse
+import time
+import tracemalloc
+import numpy as np
+import cv2
+from benchmarks.common import (
+    compare_results,
+    environment_metadata,
+    save_results,
+    synthetic_image_bytes,
+)
+
+# Microbenchmark del camino en memoria de process_image:
+#   np.frombuffer -> imdecode -> cvtColor -> Canny -> imencode -> salida
+#
+# La etapa "output" prepara el buffer para la subida igual que el worker (vista sin copia);
+# con --copy-output mide la copia bytes(buffer) anterior para comparar.
+#
+# Para cada resolución y formato mide el tiempo de cada etapa (varias iteraciones,
+# sin tracemalloc) y el pico de memoria asignada por etapa (una pasada con tracemalloc,
+# que registra los arrays de NumPy/OpenCV).
+#
+# Uso:
+#   uv run python -m benchmarks.opencv_hotpath
+#   uv run python -m benchmarks.opencv_hotpath --resolutions 1920x1080 3840x2160 --formats jpg png
+#   uv run python -m benchmarks.opencv_hotpath --compare results/a.json results/b.json
+
+
+# Etapas en el mismo orden que process_image. Cada etapa recibe el estado y lo actualiza.
+def _stage_frombuffer(state):
+    state["nparr"] = np.frombuffer(state["data"], np.uint8)
+
+
+def _stage_imdecode(state):
+    state["image"] = cv2.imdecode(state["nparr"], cv2.IMREAD_COLOR)
+
+
+def _stage_cvtcolor(state):
+    state["gray"] = cv2.cvtColor(state["image"], cv2.COLOR_BGR2GRAY)
+
+
+def _stage_canny(state):
+    state["edges"] = cv2.Canny(state["gray"], 100, 200)
+
+
+def _stage_imencode(state):
+    state["success"], state["buffer"] = cv2.imencode(".png", state["edges"])
+
+
+def _stage_output(state):
+    state["output"] = memoryview(state["buffer"]).cast("B")
+
+
+def _stage_output_copy(state):
+    state["output"] = bytes(state["buffer"])
+
+
+STAGES = [
+    ("frombuffer", _stage_frombuffer),
+    ("imdecode", _stage_imdecode),
+    ("cvtcolor", _stage_cvtcolor),
+    ("canny", _stage_canny),
+    ("imencode", _stage_imencode),
+    ("output", _stage_output),
+]
+
+
+# Mide el tiempo de cada etapa en `iterations` pasadas
+# Returns: dict: {etapa: {"median_ms", "p95_ms"}}
+def time_stages(data: bytes, iterations: int) -> dict:
+    samples = {name: [] for name, _ in STAGES}
+    for _ in range(iterations):
+        state = {"data": data}
+        for name, stage in STAGES:
+            start = time.perf_counter()
+            stage(state)
+            samples[name].append(time.perf_counter() - start)
+
+    result = {}
+    for name, values in samples.items():
+        values_ms = np.asarray(values) * 1000
+        result[name] = {
+            "median_ms": round(float(np.median(values_ms)), 4),
+            "p95_ms": round(float(np.percentile(values_ms, 95)), 4),
+        }
+    result["total_median_ms"] = round(sum(v["median_ms"] for v in result.values()), 4)
+    return result
+
+
+# Mide el pico de memoria asignada por cada etapa (una pasada con tracemalloc)
+# Returns: dict: {etapa: bytes pico asignados durante la etapa}
+def trace_stage_allocations(data: bytes) -> dict:
+    peaks = {}
+    state = {"data": data}
+    tracemalloc.start()
+    try:
+        for name, stage in STAGES:
+            tracemalloc.reset_peak()
+            before, _ = tracemalloc.get_traced_memory()
+            stage(state)
+            _, peak = tracemalloc.get_traced_memory()
+            peaks[name] = max(0, peak - before)
+    finally:
+        tracemalloc.stop()
+    return peaks
+
+
+def parse_resolution(value: str) -> tuple[int, int]:
+    width, height = value.lower().split("x")
+    return int(width), int(height)
+
+
+def run(resolutions: list[str], formats: list[str], iterations: int) -> dict:
+    results = {}
+    for resolution in resolutions:
+        width, height = parse_resolution(resolution)
+        for fmt in formats:
+            data = synthetic_image_bytes(width, height, fmt, seed=width + height)
+            # calentamiento: la primera llamada inicializa códecs y buffers de OpenCV
+            time_stages(data, 1)
+
+            key = f"{resolution}.{fmt}"
+            results[key] = {
+                "input_bytes": len(data),
+                "time": time_stages(data, iterations),
+                "peak_alloc_bytes": trace_stage_allocations(data),
+            }
+            print_row(key, results[key])
+    return results
+
+
+def print_row(key: str, result: dict) -> None:
+    stages = " ".join(
+        f"{name}={result['time'][name]['median_ms']:.2f}ms/{result['peak_alloc_bytes'][name] / 1024:.0f}KB"
+        for name, _ in STAGES
+    )
+    print(f"{key:<16} total={result['time']['total_median_ms']:.2f}ms  {stages}")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Microbenchmark del camino OpenCV de process_image")
+    parser.add_argument("--resolutions", nargs="+", default=["640x480", "1920x1080", "3840x2160"], help="resoluciones ANCHOxALTO")
+    parser.add_argument("--formats", nargs="+", default=["jpg", "png", "webp"], help="formatos de entrada")
+    parser.add_argument("--iterations", type=int, default=20, help="iteraciones de tiempo por caso")
+    parser.add_argument("--copy-output", action="store_true", help="medir la salida con la copia bytes(buffer)")
+    parser.add_argument("--threads", type=int, default=None, help="hilos de OpenCV (cv2.setNumThreads)")
+    parser.add_argument("--output", default=None, help="archivo de resultados (por defecto benchmarks/results/)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATO"), help="comparar dos archivos de resultados")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.compare:
+        compare_results(*args.compare)
+        return
+
+    if args.threads is not None:
+        cv2.setNumThreads(args.threads)
+    if args.copy_output:
+        STAGES[-1] = ("output", _stage_output_copy)
+
+    results = run(args.resolutions, args.formats, args.iterations)
+    meta = environment_metadata({
+        "opencv_threads": cv2.getNumThreads(),
+        "args": {k: v for k, v in vars(args).items() if k not in ("compare", "output")},
+    })
+    path = save_results("opencv_hotpath", meta, results, args.output)
+    print(f"Resultados guardados en {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import argparse
+import asyncio
+import tempfile
+import time
+from contextlib import ExitStack
+from pathlib import Path
+from unittest.mock import patch
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+from sqlalchemy.orm import sessionmaker
+from app.core.celery_app import celery_app
+from app.core.config import settings
+from app.core.database import Base
+from app.main import app
+from app.models import Task, TaskStatus
+from app.routers.vision import get_async_db, get_minio_service, get_admission_controller
+from app.services.admission import AdmissionController
+from app.services import outbox as outbox_module
+from app.services import storage as storage_module
+from app.services.outbox import OutboxDispatcher
+from app.services.storage import LocalStorageService, MemoryStorageService, MinioService
+from app import worker
+from benchmarks.common import (
+    compare_results,
+    environment_metadata,
+    save_results,
+    summarize,
+    synthetic_image_bytes,
+)
+
+# Benchmark reproducible del pipeline completo contra sustitutos locales:
+#   - almacenamiento en memoria (o en disco con --storage local, o MinIO real con --storage minio)
+#   - SQLite temporal (o PostgreSQL con --database-url)
+#   - Celery en proceso (el worker se ejecuta directamente o al encolar la tarea)
+#
+# Fases:
+#   analyze: POST /analyze sin procesar la tarea (req/s y latencias de la API)
+#   status:  GET /tasks/{id} sobre las tareas creadas
+#   worker:  process_image en proceso para varios tamaños de imagen (imágenes/s)
+#   e2e:     POST /analyze procesando la tarea al encolarla + GET /tasks/{id} (subida a resultado)
+#
+# Uso:
+#   uv run python -m benchmarks.pipeline
+#   uv run python -m benchmarks.pipeline --requests 500 --concurrency 32 --sizes 512 2048
+#   uv run python -m benchmarks.pipeline --compare results/a.json results/b.json
+
+API_PREFIX = "/api/v1/vision"
+
+
+# Deriva la URL síncrona (worker) a partir de la asíncrona (API)
+def sync_url(async_url: str) -> str:
+    return async_url.replace("+aiosqlite", "").replace("+asyncpg", "+psycopg2")
+
+
+class PipelineBenchmark:
+    # Prepara la base de datos, el almacenamiento y los overrides de la app
+
+    def __init__(self, database_url: str, storage: str, image_format: str, storage_path: str):
+        self.database_url = database_url
+        self.image_format = image_format
+        if storage == "minio":
+            self.storage = MinioService()
+        elif storage == "local":
+            self.storage = LocalStorageService(storage_path)
+        else:
+            self.storage = MemoryStorageService()
+
+        self.engine = create_async_engine(database_url)
+        self.session_factory = async_sessionmaker(
+            self.engine, class_=AsyncSession, expire_on_commit=False
+        )
+        self.engine_sync = create_engine(sync_url(database_url))
+        self.session_factory_sync = sessionmaker(bind=self.engine_sync, expire_on_commit=False)
+        Base.metadata.create_all(self.engine_sync)
+
+        self._stack = ExitStack()
+
+    def __enter__(self):
+        async def override_get_db():
+            async with self.session_factory() as session:
+                yield session
+
+        app.dependency_overrides[get_async_db] = override_get_db
+        app.dependency_overrides[get_minio_service] = lambda: self.storage
+        # sin límites de admisión: se mide el camino feliz
+        app.dependency_overrides[get_admission_controller] = lambda: AdmissionController(
+            max_queue_depth=0, max_in_flight=0
+        )
+        # el worker usa la misma base de datos y almacenamiento que la API
+        self._stack.enter_context(patch.object(worker, "SessionLocalSync", self.session_factory_sync))
+        self._stack.enter_context(patch.object(storage_module, "_storage", self.storage))
+        # sin Redis: el progreso en vivo no forma parte de lo que se mide
+        self._stack.enter_context(patch.object(settings, "PROGRESS_REDIS_ENABLED", False))
+        return self
+
+    def __exit__(self, *exc):
+        self._stack.close()
+        app.dependency_overrides.clear()
+        self.engine_sync.dispose()
+
+    # Ejecuta `count` corutinas con un máximo de `concurrency` simultáneas
+    # Returns: (latencias en segundos, resultados, tiempo total)
+    async def _run_concurrently(self, factory, count: int, concurrency: int):
+        semaphore = asyncio.Semaphore(concurrency)
+        latencies: list[float] = []
+        results: list = []
+
+        async def one(i: int):
+            async with semaphore:
+                start = time.perf_counter()
+                results.append(await factory(i))
+                latencies.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(count)))
+        return latencies, results, time.perf_counter() - start
+
+    # Fase analyze: solo la API (la tarea se registra pero no se procesa)
+    async def bench_analyze(self, client: AsyncClient, payload: bytes, count: int, concurrency: int):
+        content_type = "image/png" if self.image_format == "png" else "image/jpeg"
+
+        async def post(i: int):
+            files = {"file": (f"bench_{i}.{self.image_format}", payload, content_type)}
+            response = await client.post(f"{API_PREFIX}/analyze", files=files)
+            response.raise_for_status()
+            return response.json()["id"]
+
+        # las tareas quedan en el outbox: el request no publica en el broker
+        latencies, task_ids, wall = await self._run_concurrently(post, count, concurrency)
+        return summarize(latencies, wall), task_ids
+
+    # Fase status: lecturas de estado sobre las tareas creadas
+    async def bench_status(self, client: AsyncClient, task_ids: list[str], count: int, concurrency: int):
+        async def get(i: int):
+            response = await client.get(f"{API_PREFIX}/tasks/{task_ids[i % len(task_ids)]}")
+            response.raise_for_status()
+
+        latencies, _, wall = await self._run_concurrently(get, count, concurrency)
+        return summarize(latencies, wall)
+
+    # Fase worker: process_image en proceso para un tamaño de imagen
+    def bench_worker(self, width: int, height: int, count: int) -> dict:
+        payload = synthetic_image_bytes(width, height, self.image_format, seed=width)
+        task_ids = []
+        with self.session_factory_sync() as db:
+            for i in range(count):
+                filename = self.storage.upload_file(payload, f"worker_{width}x{height}_{i}.{self.image_format}")
+                task = Task(status=TaskStatus.PENDING, filename=filename)
+                db.add(task)
+                db.flush()
+                task_ids.append(str(task.id))
+            db.commit()
+
+        latencies = []
+        start = time.perf_counter()
+        for task_id in task_ids:
+            t0 = time.perf_counter()
+            if not worker.process_image(task_id):
+                raise RuntimeError(f"La tarea {task_id} falló durante el benchmark")
+            latencies.append(time.perf_counter() - t0)
+        stats = summarize(latencies, time.perf_counter() - start)
+        stats["input_bytes"] = len(payload)
+        return stats
+
+    # Fase e2e: la API deja la tarea en el outbox; tras cada request se drena el outbox
+    # ejecutando en proceso las tareas publicadas (el worker corre dentro del request)
+    async def bench_e2e(self, client: AsyncClient, payload: bytes, count: int) -> dict:
+        content_type = "image/png" if self.image_format == "png" else "image/jpeg"
+        dispatcher = OutboxDispatcher(session_factory=self.session_factory)
+        # descarta los mensajes de las fases anteriores
+        with patch.object(outbox_module, "publish_batch"):
+            await dispatcher.drain()
+
+        def run_inline(messages):
+            for name, args, kwargs in messages:
+                celery_app.tasks[name].apply(args=args, kwargs=kwargs)
+
+        async def roundtrip(i: int):
+            files = {"file": (f"e2e_{i}.{self.image_format}", payload, content_type)}
+            response = await client.post(f"{API_PREFIX}/analyze", files=files)
+            response.raise_for_status()
+            await dispatcher.drain()
+            status = await client.get(f"{API_PREFIX}/tasks/{response.json()['id']}")
+            if status.json()["status"] != TaskStatus.COMPLETED.value:
+                raise RuntimeError(f"Tarea no completada: {status.json()}")
+
+        with patch.object(outbox_module, "publish_batch", run_inline):
+            latencies, _, wall = await self._run_concurrently(roundtrip, count, 1)
+        return summarize(latencies, wall)
+
+    async def run(self, args) -> dict:
+        results: dict = {}
+        payload = synthetic_image_bytes(args.upload_size, args.upload_size, self.image_format)
+
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://bench") as client:
+            # calentamiento: imports perezosos, conexiones del pool, JIT de OpenCV
+            await self.bench_analyze(client, payload, min(10, args.requests), 1)
+
+            results["analyze"], task_ids = await self.bench_analyze(
+                client, payload, args.requests, args.concurrency
+            )
+            print(f"analyze: {results['analyze']}")
+
+            results["status"] = await self.bench_status(
+                client, task_ids, args.requests, args.concurrency
+            )
+            print(f"status:  {results['status']}")
+
+            results["worker"] = {}
+            for size in args.sizes:
+                stats = self.bench_worker(size, size, args.worker_images)
+                results["worker"][f"{size}x{size}"] = stats
+                print(f"worker {size}x{size}: {stats}")
+
+            if args.e2e:
+                results["e2e"] = await self.bench_e2e(client, payload, args.worker_images)
+                print(f"e2e:     {results['e2e']}")
+
+        await self.engine.dispose()
+        return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark del pipeline completo de Vision Async API")
+    parser.add_argument("--requests", type=int, default=200, help="requests por fase de la API")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests simultáneos")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[256, 1024, 2048], help="lados de imagen (px) para la fase worker")
+    parser.add_argument("--worker-images", type=int, default=20, help="imágenes por tamaño en la fase worker")
+    parser.add_argument("--upload-size", type=int, default=512, help="lado (px) de la imagen usada en /analyze")
+    parser.add_argument("--format", default="jpg", choices=["jpg", "png"], help="formato de las imágenes sintéticas")
+    parser.add_argument("--database-url", default=None, help="URL async de la base (por defecto SQLite temporal)")
+    parser.add_argument("--storage", default="memory", choices=["memory", "local", "minio"], help="almacenamiento a usar")
+    parser.add_argument("--no-e2e", dest="e2e", action="store_false", help="omitir la fase e2e")
+    parser.add_argument("--output", default=None, help="archivo de resultados (por defecto benchmarks/results/)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATO"), help="comparar dos archivos de resultados")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.compare:
+        compare_results(*args.compare)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = args.database_url or f"sqlite+aiosqlite:///{Path(tmp) / 'bench.db'}"
+        storage_path = str(Path(tmp) / "storage")
+        with PipelineBenchmark(database_url, args.storage, args.format, storage_path) as bench:
+            results = asyncio.run(bench.run(args))
+
+    meta = environment_metadata({
+        "database": database_url.split("://")[0],
+        "storage": args.storage,
+        "args": {k: v for k, v in vars(args).items() if k not in ("compare", "output")},
+    })
+    path = save_results("pipeline", meta, results, args.output)
+    print(f"Resultados guardados en {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+import argparse
+import json
+import subprocess
+import sys
+import numpy as np
+from benchmarks.common import compare_results, environment_metadata, save_results
+
+# Benchmark de arranque en frío: cada medición se hace en un proceso Python nuevo.
+#
+# Para cada objetivo mide:
+#   import_ms:        tiempo de importar el módulo (app.main para la API, app.worker para el worker)
+#   first_request_ms: (solo API) tiempo hasta responder el primer GET /health en proceso
+#   max_rss_mb:       memoria residente máxima del proceso
+#   heavy_modules:    módulos pesados cargados (cv2, numpy, boto3, app.worker)
+#
+# Uso:
+#   uv run python -m benchmarks.startup
+#   uv run python -m benchmarks.startup --runs 20 --targets api
+#   uv run python -m benchmarks.startup --compare results/a.json results/b.json
+
+HEAVY_MODULES = ["cv2", "numpy", "boto3", "app.worker"]
+
+# Código que se ejecuta en el proceso hijo; imprime un JSON con las mediciones
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import {module}
+import_ms = (time.perf_counter() - start) * 1000
+result = {{"import_ms": import_ms}}
+if {first_request}:
+    import asyncio
+    from httpx import AsyncClient, ASGITransport
+
+    async def first_request():
+        async with AsyncClient(transport=ASGITransport(app=app.main.app), base_url="http://startup") as client:
+            response = await client.get("/health")
+            response.raise_for_status()
+
+    asyncio.run(first_request())
+    result["first_request_ms"] = (time.perf_counter() - start) * 1000
+result["max_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+result["heavy_modules"] = [name for name in {heavy} if name in sys.modules]
+print(json.dumps(result))
+"""
+
+TARGETS = {
+    "api": ("app.main", True),
+    "worker": ("app.worker", False),
+}
+
+
+# Ejecuta una medición en un proceso nuevo
+def probe(target: str) -> dict:
+    module, first_request = TARGETS[target]
+    code = PROBE.format(module=module, first_request=first_request, heavy=HEAVY_MODULES)
+    output = subprocess.run(
+        [sys.executable, "-c", code], capture_output=True, text=True, check=True
+    ).stdout
+    # la última línea es el JSON (los módulos pueden imprimir al importarse)
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def summarize_runs(samples: list[dict]) -> dict:
+    result = {"runs": len(samples), "heavy_modules": samples[-1]["heavy_modules"]}
+    for key in ("import_ms", "first_request_ms", "max_rss_mb"):
+        values = [s[key] for s in samples if key in s]
+        if values:
+            result[key] = {
+                "median": round(float(np.median(values)), 2),
+                "p95": round(float(np.percentile(values, 95)), 2),
+            }
+    return result
+
+
+def run(targets: list[str], runs: int) -> dict:
+    results = {}
+    for target in targets:
+        # calentamiento: la primera ejecución compila los .pyc
+        probe(target)
+        results[target] = summarize_runs([probe(target) for _ in range(runs)])
+        print(f"{target}: {results[target]}")
+    return results
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark de arranque en frío de la API y el worker")
+    parser.add_argument("--runs", type=int, default=10, help="procesos nuevos por objetivo")
+    parser.add_argument("--targets", nargs="+", default=list(TARGETS), choices=list(TARGETS), help="objetivos a medir")
+    parser.add_argument("--output", default=None, help="archivo de resultados (por defecto benchmarks/results/)")
+    parser.add_argument("--compare", nargs=2, metavar=("BASELINE", "CANDIDATO"), help="comparar dos archivos de resultados")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.compare:
+        compare_results(*args.compare)
+        return
+
+    results = run(args.targets, args.runs)
+    meta = environment_metadata({
+        "args": {k: v for k, v in vars(args).items() if k not in ("compare", "output")},
+    })
+    path = save_results("startup", meta, results, args.output)
+    print(f"Resultados guardados en {path}")
+
+
+if __name__ == "__main__":
+    main()
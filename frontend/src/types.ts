@@ -6,11 +6,20 @@ export interface Task {
   id: string;
   status: TaskStatus;
   filename: string;
+  media_type?: 'image' | 'video';
+  progress?: number | null;
+  progress_updated_at?: string | null;
   result: {
     processed_file?: string;
+    frames?: number;
     error?: string;
   } | null;
   created_at: string;
+  queued_at?: string | null;
+  started_at?: string | null;
+  finished_at?: string | null;
+  timings?: Record<string, number | string> | null;
+  callback_url?: string | null;
 }
 
 export interface UploadResponse extends Task {}